@@ -9,6 +9,9 @@ class ASRInterface(metaclass=abc.ABCMeta):
     SAMPLE_RATE = 16000
     NUM_CHANNELS = 1
     SAMPLE_WIDTH = 2
+    # True if `transcribe_np` can run in several threads at once (like a network client).
+    # The engine pool runs the others one call at a time.
+    thread_safe: bool = False
 
     def transcribe_with_local_vad(self) -> str:
         """Activate the microphone on this device, transcribe audio when a pause in speech is detected using VAD, and return the transcription.
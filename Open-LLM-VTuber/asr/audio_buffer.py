@@ -0,0 +1,110 @@
+import numpy as np
+
+# Sample formats a client can use for binary mic audio frames (mono, little endian).
+MIC_AUDIO_FORMATS = {
+    "float32": np.dtype("<f4"),
+    "int16": np.dtype("<i2"),
+}
+
+
+def pcm_bytes_to_float32(data: bytes, sample_format: str = "float32") -> np.ndarray:
+    """
+    Convert a binary PCM frame into a float32 numpy array in the range [-1, 1].
+
+    Parameters:
+        data (bytes): The raw PCM bytes (mono, little endian).
+        sample_format (str): One of the keys of MIC_AUDIO_FORMATS.
+
+    Returns:
+        np.ndarray: The samples as float32.
+
+    Raises:
+        ValueError if the sample format is unknown or the frame is not a whole number of samples.
+    """
+    dtype = MIC_AUDIO_FORMATS.get(sample_format)
+    if dtype is None:
+        raise ValueError(f"Unknown mic audio format: {sample_format}")
+    if len(data) % dtype.itemsize != 0:
+        raise ValueError(
+            f"Audio frame of {len(data)} bytes is not a whole number of {sample_format} samples."
+        )
+    samples = np.frombuffer(data, dtype=dtype)
+    if sample_format == "int16":
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32, copy=False)
+
+
+class AudioChunkBuffer:
+    """
+    A growable buffer for the mic audio of one utterance.
+
+    Samples are copied into preallocated float32 blocks. When a block is full, a new one is
+    allocated (or an old one is reused), so appending a frame never copies the samples that
+    are already in the buffer. `consume` builds the utterance with a single concatenation.
+    """
+
+    def __init__(self, block_size: int = 16000 * 5):
+        """
+        Parameters:
+            block_size (int): Number of samples per block. Defaults to 5 seconds at 16kHz.
+        """
+        self.block_size: int = block_size
+        self._blocks: list[np.ndarray] = [np.empty(block_size, dtype=np.float32)]
+        self._block_index: int = 0  # index of the block being filled
+        self._fill: int = 0  # number of samples in the block being filled
+
+    def __len__(self) -> int:
+        return self._block_index * self.block_size + self._fill
+
+    def append(self, samples: np.ndarray) -> None:
+        """
+        Append float32 samples to the buffer.
+
+        Parameters:
+            samples (np.ndarray): The samples to append.
+        """
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        offset = 0
+        while offset < len(samples):
+            if self._fill == self.block_size:
+                self._next_block()
+            count = min(self.block_size - self._fill, len(samples) - offset)
+            block = self._blocks[self._block_index]
+            block[self._fill : self._fill + count] = samples[offset : offset + count]
+            self._fill += count
+            offset += count
+
+    def append_pcm_bytes(self, data: bytes, sample_format: str = "float32") -> None:
+        """
+        Append a binary PCM frame to the buffer.
+
+        Parameters:
+            data (bytes): The raw PCM bytes.
+            sample_format (str): One of the keys of MIC_AUDIO_FORMATS.
+        """
+        self.append(pcm_bytes_to_float32(data, sample_format))
+
+    def consume(self) -> np.ndarray:
+        """
+        Return all the samples in the buffer as one array and empty the buffer.
+        The blocks are kept and reused for the next utterance.
+
+        Returns:
+            np.ndarray: The float32 samples of the utterance.
+        """
+        parts = self._blocks[: self._block_index]
+        parts.append(self._blocks[self._block_index][: self._fill])
+        audio = np.concatenate(parts)
+        self.clear()
+        return audio
+
+    def clear(self) -> None:
+        """Empty the buffer without freeing the blocks."""
+        self._block_index = 0
+        self._fill = 0
+
+    def _next_block(self) -> None:
+        self._block_index += 1
+        self._fill = 0
+        if self._block_index == len(self._blocks):
+            self._blocks.append(np.empty(self.block_size, dtype=np.float32))
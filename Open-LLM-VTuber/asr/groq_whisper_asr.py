@@ -7,6 +7,9 @@ from .asr_interface import ASRInterface
 
 class VoiceRecognition(ASRInterface):
 
+    # a request to the Groq API per call
+    thread_safe = True
+
     # sample_rate, n_channels, and sampwidth are defined in asr_interface.py
 
     def __init__(
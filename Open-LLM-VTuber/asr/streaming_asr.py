@@ -0,0 +1,186 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import numpy as np
+from loguru import logger
+
+from .vad import VAD, SAMPLE_RATE
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# The model used by asr_with_vad, and the copy the frontend loads as a fallback.
+VAD_MODEL_PATHS = [
+    os.path.join(current_dir, "models", "silero_vad.onnx"),
+    os.path.join(current_dir, "..", "static", "libs", "silero_vad.onnx"),
+]
+
+
+def default_vad_model_path() -> str:
+    for path in VAD_MODEL_PATHS:
+        if os.path.exists(path):
+            return path
+    return VAD_MODEL_PATHS[0]
+
+
+class StreamingTranscriber:
+    """
+    Transcribes the mic audio of an utterance while it is still coming in.
+
+    The audio fed in is segmented with the Silero VAD (asr/vad.py). When the speaker pauses for
+    `min_silence_ms`, the audio up to the middle of the pause is a closed segment and is transcribed
+    right away. At the end of the utterance, `finish` only has to transcribe the audio after the
+    last pause, then joins the text of all the segments in order.
+
+    VAD and transcription run on one background thread per transcriber, so `feed` returns
+    immediately and never blocks the event loop. Create one transcriber per session.
+    """
+
+    def __init__(
+        self,
+        transcribe: Callable[[np.ndarray], str],
+        vad_model_path: str | None = None,
+        vad_threshold: float = 0.5,
+        min_silence_ms: int = 400,
+        max_segment_seconds: float = 15,
+        window_size_samples: int = 512,
+        on_partial: Callable[[str], None] | None = None,
+    ):
+        """
+        Parameters:
+            transcribe (Callable[[np.ndarray], str]): The ASR function, like `ASRInterface.transcribe_np`.
+            vad_model_path (str | None): Path to the Silero VAD onnx model. Defaults to asr/models/silero_vad.onnx
+                (or static/libs/silero_vad.onnx if that one doesn't exist).
+            vad_threshold (float): VAD probability above which a window counts as speech.
+            min_silence_ms (int): Length of the pause that closes a segment.
+            max_segment_seconds (float): Segments are cut at this length even without a pause.
+            window_size_samples (int): Samples per VAD window (512, 1024 or 1536 at 16kHz).
+            on_partial (Callable[[str], None] | None): Called on the background thread with the
+                transcript so far each time a segment has been transcribed (after a pause).
+        """
+        self.transcribe = transcribe
+        self.on_partial = on_partial
+        self.vad = VAD(
+            vad_model_path or default_vad_model_path(),
+            window_size_samples=window_size_samples,
+        )
+        self.vad_threshold = vad_threshold
+        self.window_size_samples = window_size_samples
+        self.min_silence_windows = max(
+            1, int(min_silence_ms / 1000 * SAMPLE_RATE / window_size_samples)
+        )
+        self.max_segment_windows = int(max_segment_seconds * SAMPLE_RATE / window_size_samples)
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="streaming-asr")
+        self._lock = threading.Lock()  # guards _generation
+        self._generation = 0  # bumped by reset, stale work is skipped
+        self._reset_state()
+
+    def feed(self, samples: np.ndarray) -> None:
+        """
+        Add float32 mic samples (16kHz, mono) of the current utterance.
+        Returns immediately, the samples are processed in the background.
+        """
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        if len(samples) == 0:
+            return
+        with self._lock:
+            generation = self._generation
+        self._executor.submit(self._process, samples, generation)
+
+    def finish(self) -> str:
+        """
+        End the utterance: wait for the audio fed so far to be processed, transcribe the
+        remaining audio and return the transcript of the whole utterance.
+        The transcriber is then ready for the next utterance.
+
+        Returns:
+            str: The transcript.
+        """
+        with self._lock:
+            generation = self._generation
+        return self._executor.submit(self._finish, generation).result()
+
+    def reset(self) -> None:
+        """Drop the current utterance without transcribing the rest of it."""
+        with self._lock:
+            self._generation += 1
+        self._executor.submit(self._reset_state)
+
+    def close(self) -> None:
+        """Stop the background thread. Work that hasn't started yet is dropped."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # everything below runs on the background thread
+
+    def _reset_state(self) -> None:
+        self.vad.reset()
+        self._windows: List[np.ndarray] = []  # windows of the open segment
+        self._speech_in_segment = False
+        self._silent_windows = 0  # consecutive non-speech windows at the end of _windows
+        self._remainder = np.empty(0, dtype=np.float32)  # samples shorter than a window
+        self._texts: List[str] = []
+
+    def _stale(self, generation: int) -> bool:
+        with self._lock:
+            return generation != self._generation
+
+    def _process(self, samples: np.ndarray, generation: int) -> None:
+        if self._stale(generation):
+            return
+        if len(self._remainder):
+            samples = np.concatenate((self._remainder, samples))
+        full = len(samples) // self.window_size_samples * self.window_size_samples
+        self._remainder = samples[full:]
+
+        for start in range(0, full, self.window_size_samples):
+            window = samples[start : start + self.window_size_samples]
+            is_speech = self.vad.process_chunk(window) > self.vad_threshold
+            self._windows.append(window)
+            if is_speech:
+                self._speech_in_segment = True
+                self._silent_windows = 0
+            else:
+                self._silent_windows += 1
+
+            if self._speech_in_segment and self._silent_windows >= self.min_silence_windows:
+                # cut in the middle of the pause, the rest of it starts the next segment
+                self._close_segment(len(self._windows) - self._silent_windows // 2)
+            elif len(self._windows) >= self.max_segment_windows:
+                self._close_segment(len(self._windows))
+
+    def _close_segment(self, cut: int) -> None:
+        segment, self._windows = self._windows[:cut], self._windows[cut:]
+        had_speech = self._speech_in_segment
+        self._speech_in_segment = False
+        self._silent_windows = len(self._windows)
+        if had_speech and segment:
+            self._transcribe_segment(np.concatenate(segment))
+            if self.on_partial is not None and self._texts:
+                try:
+                    self.on_partial(" ".join(self._texts))
+                except Exception as e:
+                    logger.error(f"Error in partial transcript callback: {e}")
+
+    def _transcribe_segment(self, audio: np.ndarray) -> None:
+        try:
+            text = self.transcribe(audio)
+        except Exception as e:
+            logger.error(f"Streaming ASR failed on a segment: {e}")
+            return
+        if text and text.strip():
+            self._texts.append(text.strip())
+
+    def _finish(self, generation: int) -> str:
+        if self._stale(generation):
+            return ""
+        tail = self._windows
+        if len(self._remainder):
+            tail = tail + [self._remainder]
+        # if the VAD heard nothing at all, let the ASR decide (the client already did its own VAD)
+        if tail and (self._speech_in_segment or not self._texts):
+            self._transcribe_segment(np.concatenate(tail))
+        text = " ".join(self._texts)
+        self._reset_state()
+        return text
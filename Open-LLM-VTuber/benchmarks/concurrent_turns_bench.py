@@ -0,0 +1,156 @@
+"""
+Concurrent conversation turns in one process, with the threaded chain and with ASYNC_PIPELINE.
+
+Starts `--sessions` turns at the same time through the TurnScheduler (with as many workers as
+sessions), each on its own OpenLLMVTuberMain with a simulated network LLM and TTS, and measures
+the time until all of them are done and the most threads the process had while they ran.
+
+Run from the project root:
+    python benchmarks/concurrent_turns_bench.py --sessions 50 --token-delay 0.02 --tts-base 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import OpenLLMVTuberMain
+from scheduler import TurnPriority, TurnScheduler
+from tts.tts_interface import TTSInterface
+
+RESPONSE = (
+    "Well, that is honestly one of the most interesting questions anyone has asked me on stream. "
+    "Let me think about it for a second. I would say yes, but only on weekends."
+)
+
+
+class SimulatedTTS(TTSInterface):
+    """A network TTS stand-in: takes a fixed latency plus a per character time, writes no audio."""
+
+    def __init__(self, base_latency: float, per_char: float):
+        self.base_latency = base_latency
+        self.per_char = per_char
+
+    def generate_audio(self, text: str, file_name_no_ext=None) -> str:
+        time.sleep(self.base_latency + self.per_char * len(text))
+        return f"{file_name_no_ext}.wav"
+
+    def remove_file(self, filepath: str, verbose: bool = True) -> None:
+        pass
+
+
+def new_session(config: dict, args) -> OpenLLMVTuberMain:
+    vtuber = OpenLLMVTuberMain(config, custom_tts=SimulatedTTS(args.tts_base, args.tts_per_char))
+
+    def chat_iter(prompt: str, cancel_token=None) -> Iterator[str]:
+        for word in RESPONSE.split(" "):
+            time.sleep(args.token_delay)
+            yield word + " "
+
+    async def achat_iter(prompt: str, cancel_token=None):
+        # an LLM with an async client
+        for word in RESPONSE.split(" "):
+            await asyncio.sleep(args.token_delay)
+            yield word + " "
+
+    vtuber.llm.chat_iter = chat_iter
+    vtuber.llm.achat_iter = achat_iter
+
+    def play_audio(sentence: str | None, filepath: str | None) -> None:
+        time.sleep(args.playback)
+
+    async def aplay_audio(sentence: str | None, filepath: str | None) -> None:
+        await asyncio.sleep(args.playback)
+
+    vtuber.set_audio_output_func(play_audio)
+    vtuber.set_async_audio_output_func(aplay_audio)
+    return vtuber
+
+
+async def run_turns(config: dict, args) -> tuple[float, int]:
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=args.blocking_workers))
+    scheduler = TurnScheduler(max_workers=args.sessions)
+    sessions = [new_session(config, args) for _ in range(args.sessions)]
+
+    peak_threads = threading.active_count()
+    done = False
+
+    async def watch_threads():
+        nonlocal peak_threads
+        while not done:
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    watcher = asyncio.create_task(watch_threads())
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            scheduler.run(
+                TurnPriority.CHAT,
+                str(i),
+                vtuber.aconversation_chain if config["ASYNC_PIPELINE"] else vtuber.conversation_chain,
+                user_input="hello",
+            )
+            for i, vtuber in enumerate(sessions)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    done = True
+    await watcher
+    return elapsed, peak_threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="Turns running at the same time")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between LLM tokens (words)")
+    parser.add_argument("--tts-base", type=float, default=0.2, help="Fixed TTS latency per request, seconds")
+    parser.add_argument("--tts-per-char", type=float, default=0.002, help="TTS time per character, seconds")
+    parser.add_argument("--playback", type=float, default=0.05, help="Time to hand one sentence to the client, seconds")
+    parser.add_argument("--blocking-workers", type=int, default=32, help="BLOCKING_WORKERS")
+    parser.add_argument("--lookahead", type=int, default=2, help="TTS_LOOKAHEAD")
+    args = parser.parse_args()
+
+    with open("conf.yaml", "r", encoding="utf-8") as f:
+        base_config = yaml.safe_load(f)
+    base_config.update(
+        {
+            "LLM_PROVIDER": "fakellm",
+            "TTS_ON": True,
+            "VOICE_INPUT_ON": False,
+            "LIVE2D": False,
+            "TRANSLATE_AUDIO": False,
+            "SPECULATIVE_LLM": False,
+            "TTS_CACHE_ON": False,
+            "TTS_IN_MEMORY": False,
+            "TTS_STREAMING": False,
+            "VERBOSE": False,
+            "TTS_LOOKAHEAD": args.lookahead,
+        }
+    )
+
+    results = {}
+    for async_pipeline in (False, True):
+        config = dict(base_config, ASYNC_PIPELINE=async_pipeline)
+        results[async_pipeline] = asyncio.run(run_turns(config, args))
+
+    print(f"\n\n ======= {args.sessions} concurrent turns =======")
+    for async_pipeline, (elapsed, peak_threads) in results.items():
+        print(
+            f"ASYNC_PIPELINE={str(async_pipeline):5}  "
+            f"all turns done in: {elapsed:6.2f}s  "
+            f"peak threads: {peak_threads:4d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
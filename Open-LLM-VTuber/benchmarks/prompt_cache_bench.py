@@ -0,0 +1,110 @@
+"""
+Time to first token of the LLM with the prompt cache, and without it.
+
+Talks to the LLM of conf.yaml (LLM_PROVIDER, "claude" or "ollama") with the persona prompt and
+the Live2D expression prompt of the config, for `--turns` turns of one conversation. With the cache,
+the prompt starts the same way on every turn, so the server reads all of it but the new messages
+from its cache. Without it, a different line is put before the system prompt on every turn (and
+PROMPT_CACHE is off for Claude), so the whole prompt is processed every time. Prints the time to
+first token of the turns after the first one (the first one fills the cache) and the prompt tokens
+read from the cache, as reported by the server.
+
+Claude only caches prompts of at least 1024 tokens (2048 for the Haiku models), OpenAI of at least
+1024 tokens. Ollama reuses the KV cache of the last request of the model as long as it stays
+loaded (KEEP_ALIVE).
+
+Run from the project root:
+    python benchmarks/prompt_cache_bench.py --turns 6
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from live2d_model import Live2dModel
+from llm.llm_factory import LLMFactory
+from prompts import prompt_loader
+
+QUESTIONS = [
+    "Hi! What did you do today?",
+    "What is your favorite game to play on stream?",
+    "Can you tell me a short story about a cat?",
+    "What would you cook for dinner tonight?",
+    "Do you prefer mornings or evenings, and why?",
+    "What is the weirdest thing a viewer ever asked you?",
+    "If you could visit any city, which one would it be?",
+    "Say goodbye to the chat!",
+]
+
+
+def system_prompt(config: dict) -> str:
+    """The system prompt of `OpenLLMVTuberMain.get_system_prompt`, with the Live2D expression prompt."""
+    if config.get("PERSONA_CHOICE"):
+        prompt = prompt_loader.load_persona(config.get("PERSONA_CHOICE"))
+    else:
+        prompt = config.get("DEFAULT_PERSONA_PROMPT_IN_YAML")
+    live2d = Live2dModel(config.get("LIVE2D_MODEL"))
+    return prompt + prompt_loader.load_util(config.get("LIVE2D_Expression_Prompt")).replace(
+        "[<insert_emomap_keys>]", live2d.emo_str
+    )
+
+
+def run_conversation(config: dict, system: str, cached: bool, args) -> list[tuple[float, dict | None]]:
+    provider = config["LLM_PROVIDER"]
+    llm = LLMFactory.create_llm(
+        llm_provider=provider,
+        SYSTEM_PROMPT=system,
+        **{**config.get(provider, {}), "PROMPT_CACHE": cached},
+    )
+    turns = []
+    for question in (QUESTIONS * args.turns)[: args.turns]:
+        if not cached:
+            llm.memory.set_system(f"Conversation {uuid.uuid4().hex}\n\n{system}")
+        start = time.perf_counter()
+        first_token = None
+        for token in llm.chat_iter(question):
+            if first_token is None and token:
+                first_token = time.perf_counter() - start
+        turns.append((first_token or time.perf_counter() - start, llm.last_usage))
+    return turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=6, help="Turns of the conversation (at least 2)")
+    args = parser.parse_args()
+    args.turns = max(2, args.turns)
+
+    with open("conf.yaml", "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    if config["LLM_PROVIDER"] not in ("claude", "ollama"):
+        sys.exit(f"LLM_PROVIDER is {config['LLM_PROVIDER']}, set it to claude or ollama in conf.yaml.")
+    system = system_prompt(config)
+
+    results = {cached: run_conversation(config, system, cached, args) for cached in (False, True)}
+
+    print(f"\n\n ======= {config['LLM_PROVIDER']}, {args.turns} turns =======")
+    for cached, turns in results.items():
+        later = turns[1:]
+        ttft = [first_token for first_token, _ in later]
+        usages = [usage for _, usage in later if usage is not None]
+        read = sum(usage["cache_read_tokens"] for usage in usages)
+        prompt = sum(usage["prompt_tokens"] for usage in usages)
+        hit_rate = f"{read / prompt:5.0%}" if prompt else "  n/a"
+        print(
+            f"{'cached' if cached else 'uncached':9}  "
+            f"TTFT p50: {statistics.median(ttft) * 1000:7.1f}ms  "
+            f"max: {max(ttft) * 1000:7.1f}ms  "
+            f"prompt tokens read from the cache: {read:6d}/{prompt:6d} ({hit_rate})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Time-to-first-audio of a conversation turn, with and without FIRST_CLAUSE_FLUSH.
+
+Runs `conversation_chain` on the fake LLM (streamed at a fixed token rate) with a simulated
+network TTS, and measures the time from the start of the turn to the first audio handed to
+the player, and to the end of the turn.
+
+Run from the project root:
+    python benchmarks/ttfa_bench.py --rounds 5 --token-delay 0.03 --tts-base 0.25 --tts-per-char 0.004
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Iterator
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import OpenLLMVTuberMain
+from tts.tts_interface import TTSInterface
+
+RESPONSES = [
+    "Well, that is honestly one of the most interesting questions anyone has asked me on stream this week, "
+    "so let me think about it for a second. I would say yes.",
+    "Oh, I remember that game - we played it for six hours straight and never got past the second boss "
+    "because someone kept pressing the wrong button. It was great fun.",
+    "Honestly I think the best part of streaming is talking with all of you every single day and reading "
+    "the chat while I play. Thank you for being here!",
+]
+
+
+class SimulatedTTS(TTSInterface):
+    """A network TTS stand-in: takes a fixed latency plus a per character time, writes no audio."""
+
+    def __init__(self, base_latency: float, per_char: float):
+        self.base_latency = base_latency
+        self.per_char = per_char
+
+    def generate_audio(self, text: str, file_name_no_ext=None) -> str:
+        time.sleep(self.base_latency + self.per_char * len(text))
+        return f"{file_name_no_ext}.wav"
+
+    def remove_file(self, filepath: str, verbose: bool = True) -> None:
+        pass
+
+
+def run_turn(config: dict, response: str, args) -> tuple[float, float]:
+    vtuber = OpenLLMVTuberMain(config, custom_tts=SimulatedTTS(args.tts_base, args.tts_per_char))
+    vtuber.llm.response_list = []
+
+    def chat_iter(prompt: str, cancel_token=None) -> Iterator[str]:
+        # the fake LLM answers instantly, stream it word by word like a real one
+        for word in response.split(" "):
+            time.sleep(args.token_delay)
+            yield word + " "
+
+    vtuber.llm.chat_iter = chat_iter
+
+    first_audio = []
+
+    def play_audio(sentence: str | None, filepath: str | None) -> None:
+        if not first_audio:
+            first_audio.append(time.perf_counter())
+        # the client plays the sentence while the next ones are synthesized
+        time.sleep(args.playback_per_char * len(sentence or ""))
+
+    vtuber.set_audio_output_func(play_audio)
+    start = time.perf_counter()
+    vtuber.conversation_chain(user_input="hello")
+    end = time.perf_counter()
+    return first_audio[0] - start, end - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3, help="Turns per response and mode")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="Seconds between LLM tokens (words)")
+    parser.add_argument("--tts-base", type=float, default=0.25, help="Fixed TTS latency per request, seconds")
+    parser.add_argument("--tts-per-char", type=float, default=0.004, help="TTS time per character, seconds")
+    parser.add_argument("--playback-per-char", type=float, default=0.06, help="Playback time per character, seconds")
+    parser.add_argument("--lookahead", type=int, default=3, help="TTS_LOOKAHEAD")
+    args = parser.parse_args()
+
+    with open("conf.yaml", "r", encoding="utf-8") as f:
+        base_config = yaml.safe_load(f)
+    base_config.update(
+        {
+            "LLM_PROVIDER": "fakellm",
+            "TTS_ON": True,
+            "VOICE_INPUT_ON": False,
+            "LIVE2D": False,
+            "TRANSLATE_AUDIO": False,
+            "SPECULATIVE_LLM": False,
+            "VERBOSE": False,
+            "TTS_LOOKAHEAD": args.lookahead,
+        }
+    )
+
+    results = {}
+    for first_clause in (False, True):
+        config = dict(base_config, FIRST_CLAUSE_FLUSH=first_clause)
+        ttfa, total = [], []
+        for _ in range(args.rounds):
+            for response in RESPONSES:
+                first, turn = run_turn(config, response, args)
+                ttfa.append(first)
+                total.append(turn)
+        results[first_clause] = (ttfa, total)
+
+    print("\n\n ======= Time to first audio =======")
+    for first_clause, (ttfa, total) in results.items():
+        print(
+            f"FIRST_CLAUSE_FLUSH={str(first_clause):5}  "
+            f"TTFA p50: {statistics.median(ttfa) * 1000:7.1f}ms  "
+            f"max: {max(ttfa) * 1000:7.1f}ms  "
+            f"turn p50: {statistics.median(total):6.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Throughput scaling of the server with the number of worker processes.
+
+For every worker count, the server is started with the engines of conf.yaml, then a number of
+simulated clients connect to /client-ws at the same time. Every client sends a few seconds of
+benchmarks/test-16b-caps.wav as binary mic audio, and measures the time from `mic-audio-end`
+to the first audio message (time to first audio) and to `conversation-chain-end`.
+Meant for a CPU-only box, where ASR and TTS of the clients compete for the cores.
+
+Run from the project root:
+    python benchmarks/worker_scaling_bench.py --workers 1 2 4 --clients 8
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+import websocket
+from scipy.io.wavfile import read
+
+SERVER_SNIPPET = """
+import server
+config = server.load_config_with_env("conf.yaml")
+config["LIVE2D"] = True
+config["PORT"] = {port}
+config["WORKERS"] = {workers}
+server.WebSocketServer(open_llm_vtuber_main_config=config).run(
+    host="127.0.0.1", port={port}, log_level="warning", workers={workers}
+)
+"""
+
+
+def load_mic_audio(seconds: float) -> bytes:
+    sample_rate, audio = read("benchmarks/test-16b-caps.wav")
+    audio = np.array(audio[: int(seconds * sample_rate)], dtype=np.float32)
+    audio = audio / np.max(np.abs(audio))
+    return audio.astype("<f4").tobytes()
+
+
+def start_server(workers: int, port: int, timeout: float) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER_SNIPPET.format(port=port, workers=workers)]
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5).close()
+            return process
+        except OSError:
+            time.sleep(1)
+    process.terminate()
+    raise RuntimeError(f"Server with {workers} workers didn't start in {timeout} seconds")
+
+
+def run_client(port: int, mic_audio: bytes, rounds: int, results: list) -> None:
+    ws = websocket.create_connection(
+        f"ws://127.0.0.1:{port}/client-ws?audio_format=json&mic_format=float32",
+        timeout=600,
+    )
+    try:
+        # wait until the server is ready to listen
+        while True:
+            message = ws.recv()
+            if isinstance(message, str) and json.loads(message).get("text") == "start-mic":
+                break
+
+        chunk_size = 4096 * 4  # bytes, like the frontend VAD frames
+        for _ in range(rounds):
+            for offset in range(0, len(mic_audio), chunk_size):
+                ws.send_binary(mic_audio[offset : offset + chunk_size])
+            start = time.perf_counter()
+            ws.send(json.dumps({"type": "mic-audio-end"}))
+
+            first_audio = None
+            while True:
+                message = ws.recv()
+                if not isinstance(message, str):
+                    continue
+                data = json.loads(message)
+                if data.get("type") == "audio" and first_audio is None:
+                    first_audio = time.perf_counter() - start
+                if data.get("type") == "control" and data.get("text") == "conversation-chain-end":
+                    break
+            results.append((first_audio, time.perf_counter() - start))
+    finally:
+        ws.close()
+
+
+def bench(workers: int, clients: int, rounds: int, port: int, mic_audio: bytes, startup_timeout: float) -> None:
+    print(f"\n### {workers} worker(s), {clients} clients x {rounds} rounds")
+    server = start_server(workers, port, startup_timeout)
+    try:
+        results: list = []
+        threads = [
+            threading.Thread(target=run_client, args=(port, mic_audio, rounds, results))
+            for _ in range(clients)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    ttfa = sorted(r[0] for r in results if r[0] is not None)
+    turns = sorted(r[1] for r in results)
+    print(f"turns: {len(results)} in {elapsed:.1f}s -> {len(results) / elapsed * 60:.1f} turns/min")
+    if ttfa:
+        print(
+            f"time to first audio: p50 {statistics.median(ttfa):.2f}s, "
+            f"p95 {ttfa[min(len(ttfa) - 1, int(len(ttfa) * 0.95))]:.2f}s"
+        )
+    if turns:
+        print(f"turn time: p50 {statistics.median(turns):.2f}s, max {turns[-1]:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=5, help="seconds of mic audio per turn")
+    parser.add_argument("--port", type=int, default=12493)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    mic_audio = load_mic_audio(args.seconds)
+    for workers in args.workers:
+        bench(workers, args.clients, args.rounds, args.port, mic_audio, args.startup_timeout)
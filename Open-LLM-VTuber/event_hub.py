@@ -0,0 +1,256 @@
+import asyncio
+import json
+import os
+import socket
+from typing import Dict, Iterable, List
+
+import redis.asyncio as aioredis
+from loguru import logger
+
+
+class EventHub:
+    """
+    The one Redis subscriber of the server process.
+
+    A single connection subscribes to the event channels and consumes them with the async
+    `listen()` iterator, so an event is handed on as soon as Redis delivers it. Every event is
+    decoded once and put on the asyncio queues of the sessions: events with a `session_id`
+    that belongs to a subscribed session only go to that session, the others go to all sessions.
+
+    When the server runs several worker processes, every worker has its own hub and receives
+    every event. The sessions are registered in Redis (session id -> worker id, with a TTL that
+    the owning worker keeps refreshing), so an event for a session that lives on another worker
+    is left to that worker instead of being broadcast.
+
+    If the connection is lost (like when Redis restarts), the listener reconnects, retrying with a
+    growing delay, and registers the sessions of this worker again.
+
+    `start` and `stop` are meant to be called from the FastAPI lifespan.
+    """
+
+    REGISTRY_PREFIX = "vtuber:session:"
+    # Seconds before the first attempt to reconnect, doubled after each failed attempt up to the max
+    RECONNECT_DELAY = 1.0
+    RECONNECT_MAX_DELAY = 30.0
+
+    def __init__(
+        self,
+        redis_url: str = "redis://redis:6379",
+        channels: Iterable[str] = ("crypto_tips", "vtuber_events"),
+        max_queue_size: int = 100,
+        registry_ttl: int = 60,
+    ):
+        """
+        Parameters:
+            redis_url (str): URL of the Redis server.
+            channels (Iterable[str]): The channels to subscribe to.
+            max_queue_size (int): Capacity of the event queue of each session.
+                When a session falls behind, its oldest events are dropped.
+            registry_ttl (int): Seconds a session stays in the Redis registry if its worker stops refreshing it.
+        """
+        self.redis_url = redis_url
+        self.channels = list(channels)
+        self.max_queue_size = max_queue_size
+        self.registry_ttl = registry_ttl
+        self.worker_id: str | None = None
+        self.redis_client = None
+        self.pubsub = None
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._listener_task: asyncio.Task | None = None
+        self._registry_task: asyncio.Task | None = None
+
+    async def start(self, max_retries: int = 3, retry_delay: float = 1) -> None:
+        """
+        Connect to Redis and start the listener task.
+        If Redis can't be reached, the server runs without events while the listener keeps trying
+        to connect in the background.
+        """
+        # started in the worker process, after the fork
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        print("Setting up Redis connection...")
+        for attempt in range(max_retries):
+            try:
+                self.redis_client = aioredis.from_url(self.redis_url)
+                self.pubsub = self.redis_client.pubsub()
+                await self.pubsub.subscribe(*self.channels)
+                print("Redis subscriptions established")
+                break
+            except Exception as e:
+                await self._close_connection()
+                if attempt < max_retries - 1:
+                    print(f"Failed to connect to Redis (attempt {attempt + 1}/{max_retries}). Retrying in {retry_delay} seconds...")
+                    await asyncio.sleep(retry_delay)
+                    retry_delay *= 2
+                else:
+                    print(f"Failed to connect to Redis after {max_retries} attempts, retrying in the background: {e}")
+
+        self._listener_task = asyncio.create_task(self._listen())
+        self._registry_task = asyncio.create_task(self._refresh_registry())
+
+    async def stop(self) -> None:
+        """Stop the background tasks, remove the sessions of this worker from the registry and close the Redis connection."""
+        for task in (self._listener_task, self._registry_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._listener_task = None
+        self._registry_task = None
+        for session_id in list(self._queues):
+            await self.unsubscribe(session_id)
+        await self._close_connection()
+
+    async def subscribe(self, session_id: str) -> asyncio.Queue:
+        """
+        Register a session with this worker and in the Redis registry.
+
+        Parameters:
+            session_id (str): The id of the session. Events with this `session_id` go only to this session.
+
+        Returns:
+            asyncio.Queue: The queue the events of the session are put on, as decoded dicts.
+        """
+        queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._queues[session_id] = queue
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.set(
+                    self.REGISTRY_PREFIX + session_id, self.worker_id, ex=self.registry_ttl
+                )
+            except Exception as e:
+                logger.error(f"Failed to register session {session_id}: {e}")
+        return queue
+
+    async def unsubscribe(self, session_id: str) -> None:
+        """Unregister a session. Events that are still in its queue are dropped."""
+        self._queues.pop(session_id, None)
+        if self.redis_client is not None:
+            key = self.REGISTRY_PREFIX + session_id
+            try:
+                # the client may already have reconnected to another worker
+                owner = await self.redis_client.get(key)
+                if owner is not None and owner.decode("utf-8") == self.worker_id:
+                    await self.redis_client.delete(key)
+            except Exception as e:
+                logger.error(f"Failed to unregister session {session_id}: {e}")
+
+    async def owner_of(self, session_id: str) -> str | None:
+        """
+        Returns:
+            str | None: The id of the worker the session is connected to, or None if it isn't connected to any worker.
+        """
+        if session_id in self._queues:
+            return self.worker_id
+        if self.redis_client is None:
+            return None
+        try:
+            owner = await self.redis_client.get(self.REGISTRY_PREFIX + session_id)
+        except Exception as e:
+            logger.error(f"Failed to look up session {session_id}: {e}")
+            return None
+        return owner.decode("utf-8") if owner is not None else None
+
+    @property
+    def session_count(self) -> int:
+        return len(self._queues)
+
+    async def dispatch(self, data: dict) -> None:
+        """
+        Put an event on the queue of its session, or on the queues of all the sessions of this
+        worker if it has no `session_id` (or one that isn't connected to any worker).
+        Events for sessions of other workers are skipped.
+        """
+        session_id = data.get("session_id")
+        queue = self._queues.get(session_id)
+        if queue is not None:
+            targets: List[asyncio.Queue] = [queue]
+        elif session_id is not None and await self.owner_of(str(session_id)) is not None:
+            return
+        else:
+            targets = list(self._queues.values())
+        for target in targets:
+            if target.full():
+                dropped = target.get_nowait()
+                logger.warning(f"Event queue full, dropping event: {dropped.get('type')}")
+            target.put_nowait(data)
+
+    async def _listen(self) -> None:
+        while True:
+            if self.pubsub is None:
+                # not connected at startup
+                await self._reconnect()
+            try:
+                async for message in self.pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        message_data = message["data"].decode("utf-8") if isinstance(message["data"], bytes) else message["data"]
+                        print(f"DEBUG: Received Redis message: {message_data}")
+                        data = json.loads(message_data)
+                    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                        logger.error(f"Invalid event on {message['channel']}: {e}")
+                        continue
+                    if not isinstance(data, dict):
+                        logger.error(f"Invalid event on {message['channel']}: {data}")
+                        continue
+                    await self.dispatch(data)
+                logger.error("Redis listener ended, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis listener stopped, reconnecting: {e}")
+            await self._reconnect()
+
+    async def _reconnect(self) -> None:
+        """Connect and subscribe again until it works, then register the sessions of this worker again."""
+        await self._close_connection()
+        delay = self.RECONNECT_DELAY
+        while True:
+            await asyncio.sleep(delay)
+            redis_client = aioredis.from_url(self.redis_url)
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(*self.channels)
+                break
+            except Exception as e:
+                delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
+                logger.warning(f"Failed to reconnect to Redis, retrying in {delay:g} seconds: {e}")
+                try:
+                    await pubsub.aclose()
+                    await redis_client.aclose()
+                except Exception:
+                    pass
+        self.redis_client = redis_client
+        self.pubsub = pubsub
+        logger.info("Reconnected to Redis")
+        await self._register_sessions()
+
+    async def _register_sessions(self) -> None:
+        if not self._queues or self.redis_client is None:
+            return
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for session_id in list(self._queues):
+                    pipe.set(self.REGISTRY_PREFIX + session_id, self.worker_id, ex=self.registry_ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to refresh the session registry: {e}")
+
+    async def _refresh_registry(self) -> None:
+        while True:
+            await asyncio.sleep(self.registry_ttl / 3)
+            await self._register_sessions()
+
+    async def _close_connection(self) -> None:
+        try:
+            if self.pubsub is not None:
+                await self.pubsub.aclose()
+            if self.redis_client is not None:
+                await self.redis_client.aclose()
+        except Exception as e:
+            logger.error(f"Error closing Redis connection: {e}")
+        self.pubsub = None
+        self.redis_client = None
@@ -1,6 +1,11 @@
+import asyncio
 import anthropic
-from typing import Iterator
+from typing import AsyncIterator, Iterator
+from .http_pool import get_async_http_client, get_http_client
 from .llm_interface import LLMInterface
+from .memory_manager import ConversationMemory
+from .prompt_cache import EPHEMERAL, usage_from_anthropic
+from utils.cancellation import CancellationToken, acancellable, cancellable
 
 class LLM(LLMInterface):
     def __init__(
@@ -10,6 +15,9 @@ class LLM(LLMInterface):
         model: str = "claude-3-haiku-20240307",
         llm_api_key: str = None,
         verbose: bool = False,
+        memory_token_budget: int | None = None,
+        memory_keep_turns: int = 4,
+        prompt_cache: bool = True,
     ):
         """
         Initialize Claude LLM.
@@ -20,57 +28,155 @@ class LLM(LLMInterface):
             model (str): Model name
             llm_api_key (str): Claude API key
             verbose (bool): Whether to print debug info
+            memory_token_budget (int | None): Tokens of conversation memory before the older turns are summarized
+            memory_keep_turns (int): Recent turns that are never summarized
+            prompt_cache (bool): Mark the system prompt and the history with cache breakpoints,
+                so the next turns read them from the prompt cache instead of processing them again
         """
         self.system = system
         self.model = model
         self.verbose = verbose
+        self.base_url = base_url if base_url else None
+        self.llm_api_key = llm_api_key
+        self.prompt_cache = prompt_cache
         
-        # Initialize Claude client
+        # Initialize Claude client (the connections are shared with the other sessions)
         self.client = anthropic.Anthropic(
             api_key=llm_api_key,
-            base_url=base_url if base_url else None
+            base_url=self.base_url,
+            http_client=get_http_client(self.base_url or "https://api.anthropic.com", anthropic)
         )
+        self._async_client: anthropic.AsyncAnthropic | None = None
+        self._async_client_loop: asyncio.AbstractEventLoop | None = None
         
-        # Store conversation history (excluding system prompt)
-        self.messages = []
+        # Store conversation history (the system prompt is sent apart, with the summary of the older turns)
+        self.memory = ConversationMemory(
+            system, token_budget=memory_token_budget, keep_turns=memory_keep_turns
+        )
 
-    def chat_iter(self, prompt: str) -> Iterator[str]:
+    def chat_iter(
+        self, prompt: str, cancel_token: CancellationToken | None = None
+    ) -> Iterator[str]:
         """
         Send message to Claude and yield response tokens.
         
         Args:
             prompt (str): User message
+            cancel_token (CancellationToken | None): Closes the stream when cancelled
             
         Yields:
             str: Response tokens
         """
         # Add user message to history
-        self.messages.append({"role": "user", "content": prompt})
+        self.memory.append("user", prompt)
+        self.last_usage = None
         
         try:
             # Stream response from Claude
             with self.client.messages.stream(
-                messages=self.messages,
-                system=self.system if self.system else "",
+                messages=self._messages(),
+                system=self._system_prompt(),
                 model=self.model,
                 max_tokens=1024
             ) as stream:
                 response_text = ""
-                for text in stream.text_stream:
+                for text in cancellable(stream.text_stream, cancel_token, stream.close):
                     response_text += text
                     yield text
+
+                if cancel_token is not None and cancel_token.cancelled:
+                    return  # handle_interrupt stores what was heard
                 
                 # Add assistant response to history
-                self.messages.append({
-                    "role": "assistant", 
-                    "content": response_text
-                })
+                self.memory.append("assistant", response_text)
+                self.last_usage = usage_from_anthropic(stream.get_final_message().usage)
                 
         except Exception as e:
             if self.verbose:
                 print(f"Error in Claude chat: {str(e)}")
             yield f"Error occurred: {str(e)}"
 
+    async def achat_iter(
+        self, prompt: str, cancel_token: CancellationToken | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Send message to Claude with the async client and yield response tokens.
+        
+        Args:
+            prompt (str): User message
+            cancel_token (CancellationToken | None): Closes the stream when cancelled
+            
+        Yields:
+            str: Response tokens
+        """
+        self.memory.append("user", prompt)
+        self.last_usage = None
+        
+        try:
+            async with self._get_async_client().messages.stream(
+                messages=self._messages(),
+                system=self._system_prompt(),
+                model=self.model,
+                max_tokens=1024
+            ) as stream:
+                response_text = ""
+                async for text in acancellable(stream.text_stream, cancel_token, stream.close):
+                    response_text += text
+                    yield text
+
+                if cancel_token is not None and cancel_token.cancelled:
+                    return  # handle_interrupt stores what was heard
+                
+                self.memory.append("assistant", response_text)
+                self.last_usage = usage_from_anthropic((await stream.get_final_message()).usage)
+                
+        except Exception as e:
+            if self.verbose:
+                print(f"Error in Claude chat: {str(e)}")
+            yield f"Error occurred: {str(e)}"
+
+    def _system_prompt(self) -> str | list:
+        """
+        The system prompt, and the summary of the older turns. With the prompt cache, they are
+        blocks with a cache breakpoint each: the persona prompt stays the same for the whole
+        conversation, and the summary until the next turns are folded into it.
+        """
+        if not self.prompt_cache:
+            return self.memory.system_prompt()
+        summary = self.memory.summary_message()
+        parts = [part for part in (self.memory.system, summary and summary["content"]) if part]
+        return [{"type": "text", "text": part, "cache_control": EPHEMERAL} for part in parts]
+
+    def _messages(self) -> list:
+        """
+        The messages of the memory. With the prompt cache, the last one (the new user message) has a
+        cache breakpoint, so the next turn reads the whole conversation up to it from the cache.
+        """
+        messages = self.memory.messages(include_system=False)
+        if self.prompt_cache and messages and isinstance(messages[-1]["content"], str):
+            messages[-1]["content"] = [
+                {"type": "text", "text": messages[-1]["content"], "cache_control": EPHEMERAL}
+            ]
+        return messages
+
+    def _get_async_client(self) -> anthropic.AsyncAnthropic:
+        """The async client, on the pool of the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = anthropic.AsyncAnthropic(
+                api_key=self.llm_api_key,
+                base_url=self.base_url,
+                http_client=get_async_http_client(self.base_url or "https://api.anthropic.com", anthropic),
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    def snapshot_memory(self) -> tuple:
+        return self.memory.snapshot()
+
+    def restore_memory(self, snapshot: tuple) -> None:
+        self.memory.restore(snapshot)
+
     def handle_interrupt(self, heard_response: str) -> None:
         """
         Handle interruption by updating the last assistant message.
@@ -78,6 +184,10 @@ class LLM(LLMInterface):
         Args:
             heard_response (str): The heard portion of the response
         """
-        if self.messages and self.messages[-1]["role"] == "assistant":
+        last = self.memory.last()
+        if last is not None and last["role"] == "assistant":
             # Update last assistant message with only heard portion
-            self.messages[-1]["content"] = heard_response
+            self.memory.replace_last(heard_response)
+        elif heard_response:
+            # The response was cancelled before it was stored
+            self.memory.append("assistant", heard_response)
@@ -1,15 +1,22 @@
 from typing import Iterator
-import json
 
 from .llm_interface import LLMInterface
+from .memory_manager import ConversationMemory
+from utils.cancellation import CancellationToken
 
 class LLM(LLMInterface):
 
-    def __init__(self):
+    def __init__(self, memory_token_budget: int | None = None, memory_keep_turns: int = 4):
         """
         Initializes an instance of the `FakeLLM` class.
+
+        Parameters:
+        - memory_token_budget (int, optional): Tokens of conversation memory before the older turns are summarized. Defaults to `None` (no limit).
+        - memory_keep_turns (int, optional): Recent turns that are never summarized. Defaults to 4.
         """
-        self.memory = []
+        self.memory = ConversationMemory(
+            token_budget=memory_token_budget, keep_turns=memory_keep_turns
+        )
         self.sentence_count = 1
         self.response_list = [
             """Hello [smirk]! This is fake_llm. This is sentence 1. [joy]""",
@@ -25,32 +32,24 @@ class LLM(LLMInterface):
             the system prompt
         """
         self.system = system
-        self.memory.append(
-            {
-                "role": "system",
-                "content": system,
-            }
-        )
+        self.memory.set_system(system)
 
     def __print_memory(self):
         """
         Print the memory
         """
         print("Memory:\n========\n")
-        print(self.memory)
+        print(self.memory.messages())
         print("\n========\n")
 
     def __printDebugInfo(self):
         print(" -- System: " + self.system)
 
-    def chat_iter(self, prompt: str) -> Iterator[str]:
+    def chat_iter(
+        self, prompt: str, cancel_token: CancellationToken | None = None
+    ) -> Iterator[str]:
 
-        self.memory.append(
-            {
-                "role": "user",
-                "content": prompt,
-            }
-        )
+        self.memory.append("user", prompt)
 
         if len(self.response_list) > 0:
             response = self.response_list.pop(0)
@@ -63,48 +62,28 @@ class LLM(LLMInterface):
         def _generate_response():
             complete_response = ""
             for char in response:
+                if cancel_token is not None and cancel_token.cancelled:
+                    return
                 yield char
                 complete_response += char
             
-            # Store the complete response in memory
-            self.memory.append(
-                {
-                    "role": "assistant",
-                    "content": complete_response,
-                }
-            )
-
-            # Serialize the memory to a file
-            self.serialize_memory(self.memory, 'mem.json')
+            # Store the complete response in memory (and its journal, if any)
+            self.memory.append("assistant", complete_response)
 
         return _generate_response()
 
+    def snapshot_memory(self) -> tuple:
+        return self.memory.snapshot()
+
+    def restore_memory(self, snapshot: tuple) -> None:
+        self.memory.restore(snapshot)
+
     def handle_interrupt(self, heard_response: str) -> None:
         print(">>>> LLM believe heard response is: ", heard_response)
-        if self.memory[-1]["role"] == "assistant":
-            self.memory[-1]["content"] = heard_response + "..."
+        last = self.memory.last()
+        if last is not None and last["role"] == "assistant":
+            self.memory.replace_last(heard_response + "...")
         else:
             if heard_response:
-                self.memory.append(
-                    {
-                        "role": "assistant",
-                        "content": heard_response + "...",
-                    }
-                )
-        self.memory.append(
-            {
-                "role": "system",
-                "content": "[Interrupted by user]",
-            }
-        )
-
-    def serialize_memory(self, memory, filename):
-        """
-        Serialize the memory to a file.
-
-        Parameters:
-        - memory (list): The list of memory to be serialized.
-        - filename (str): The name of the file to which memory should be serialized.
-        """
-        with open(filename, 'w') as file:
-            json.dump(memory, file)
+                self.memory.append("assistant", heard_response + "...")
+        self.memory.append("system", "[Interrupted by user]")
@@ -1,6 +1,11 @@
-from openai import OpenAI
-from typing import Iterator
+import asyncio
+import openai
+from openai import AsyncOpenAI, OpenAI
+from typing import AsyncIterator, Iterator
+from .http_pool import get_async_http_client, get_http_client
 from .llm_interface import LLMInterface
+from .memory_manager import ConversationMemory
+from utils.cancellation import CancellationToken, acancellable, cancellable
 
 class LLM(LLMInterface):
     def __init__(
@@ -12,6 +17,8 @@ class LLM(LLMInterface):
         base_url: str = None,
         project_id: str = None,  
         organization_id: str = None,  
+        memory_token_budget: int | None = None,
+        memory_keep_turns: int = 4,
         **kwargs  
     ):
         if not base_url:
@@ -25,22 +32,30 @@ class LLM(LLMInterface):
         if not base_url.endswith('/v1/'):
             base_url = f"{base_url}/v1/"
             
+        self.base_url = base_url
+        self.llm_api_key = llm_api_key
+        # the connections to the endpoint are shared with the other sessions
         self.client = OpenAI(
             base_url=base_url,
-            api_key=llm_api_key
+            api_key=llm_api_key,
+            http_client=get_http_client(base_url, openai)
         )
+        self._async_client: AsyncOpenAI | None = None
+        self._async_client_loop: asyncio.AbstractEventLoop | None = None
         
-        self.messages = []
-        if system:
-            self.messages.append({"role": "system", "content": system})
+        self.memory = ConversationMemory(
+            system, token_budget=memory_token_budget, keep_turns=memory_keep_turns
+        )
 
-    def chat_iter(self, prompt: str) -> Iterator[str]:
+    def chat_iter(
+        self, prompt: str, cancel_token: CancellationToken | None = None
+    ) -> Iterator[str]:
         print(f"DEBUG: Starting chat_iter with prompt: {prompt}")
         
         try:
             # Add the new user message
-            messages = list(self.messages)  # Copy existing messages
-            messages.append({"role": "user", "content": prompt})
+            self.memory.append("user", prompt)
+            messages = self.memory.messages()
             
             print("DEBUG: Starting chat completion...")
             chat_completion = self.client.chat.completions.create(
@@ -52,7 +67,7 @@ class LLM(LLMInterface):
             )
             
             response_text = ""
-            for message in chat_completion:
+            for message in cancellable(chat_completion, cancel_token, chat_completion.close):
                 if hasattr(message.choices[0].delta, 'content'):
                     token = message.choices[0].delta.content
                     if token is not None:
@@ -60,20 +75,16 @@ class LLM(LLMInterface):
                         yield token
                         response_text += token
             
+            if cancel_token is not None and cancel_token.cancelled:
+                return
             if response_text:
                 print("DEBUG: Final response:", response_text)
-                self.messages.append({
-                    "role": "assistant",
-                    "content": response_text
-                })
+                self.memory.append("assistant", response_text)
             else:
                 fallback = "I apologize, I couldn't generate a response."
                 print("DEBUG: Using fallback:", fallback)
                 yield fallback
-                self.messages.append({
-                    "role": "assistant",
-                    "content": fallback
-                })
+                self.memory.append("assistant", fallback)
                 
         except Exception as e:
             print(f"DEBUG: Exception occurred: {str(e)}")
@@ -82,11 +93,68 @@ class LLM(LLMInterface):
             print(f"DEBUG: Traceback: {traceback.format_exc()}")
             error_response = "I apologize, but I encountered an error."
             yield error_response
-            self.messages.append({
-                "role": "assistant",
-                "content": error_response
-            })
+            self.memory.append("assistant", error_response)
+
+    async def achat_iter(
+        self, prompt: str, cancel_token: CancellationToken | None = None
+    ) -> AsyncIterator[str]:
+        print(f"DEBUG: Starting achat_iter with prompt: {prompt}")
+
+        try:
+            self.memory.append("user", prompt)
+            chat_completion = await self._get_async_client().chat.completions.create(
+                model="tgi",  # Required model name for TGI endpoints
+                messages=self.memory.messages(),
+                temperature=0.5,
+                max_tokens=100,
+                stream=True
+            )
+
+            response_text = ""
+            try:
+                async for message in acancellable(chat_completion, cancel_token, chat_completion.close):
+                    if hasattr(message.choices[0].delta, 'content'):
+                        token = message.choices[0].delta.content
+                        if token is not None:
+                            yield token
+                            response_text += token
+            finally:
+                await chat_completion.close()
+
+            if cancel_token is not None and cancel_token.cancelled:
+                return
+            if not response_text:
+                response_text = "I apologize, I couldn't generate a response."
+                yield response_text
+            self.memory.append("assistant", response_text)
+
+        except Exception as e:
+            print(f"DEBUG: Exception occurred: {str(e)}")
+            error_response = "I apologize, but I encountered an error."
+            yield error_response
+            self.memory.append("assistant", error_response)
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        """The async client, on the pool of the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.llm_api_key,
+                http_client=get_async_http_client(self.base_url, openai),
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    def snapshot_memory(self) -> tuple:
+        return self.memory.snapshot()
+
+    def restore_memory(self, snapshot: tuple) -> None:
+        self.memory.restore(snapshot)
 
     def handle_interrupt(self, heard_response: str) -> None:
-        if self.messages and self.messages[-1]["role"] == "assistant":
-            self.messages[-1]["content"] = heard_response
\ No newline at end of file
+        last = self.memory.last()
+        if last is not None and last["role"] == "assistant":
+            self.memory.replace_last(heard_response)
+        elif heard_response:
+            self.memory.append("assistant", heard_response)
\ No newline at end of file
@@ -1,6 +1,8 @@
 from huggingface_hub import InferenceClient
 from typing import Iterator
 from .llm_interface import LLMInterface
+from .memory_manager import ConversationMemory
+from utils.cancellation import CancellationToken, cancellable
 
 class LLM(LLMInterface):
     def __init__(
@@ -12,6 +14,8 @@ class LLM(LLMInterface):
         base_url: str = None,  
         project_id: str = None,  
         organization_id: str = None,  
+        memory_token_budget: int | None = None,
+        memory_keep_turns: int = 4,
         **kwargs  
     ):
         self.model = model
@@ -25,29 +29,40 @@ class LLM(LLMInterface):
         )
         
         # Initialize messages with system prompt if provided
-        self.messages = []
-        if system:
-            self.messages.append({"role": "system", "content": system})
+        self.memory = ConversationMemory(
+            system, token_budget=memory_token_budget, keep_turns=memory_keep_turns
+        )
 
-    def chat_iter(self, prompt: str) -> Iterator[str]:
+    def chat_iter(
+        self, prompt: str, cancel_token: CancellationToken | None = None
+    ) -> Iterator[str]:
         """
         Send message to model and yield response tokens.
         Falls back to non-streaming if streaming is not supported.
+        Stops at the next token when `cancel_token` is cancelled.
         """
-        self.messages.append({"role": "user", "content": prompt})
+        self.memory.append("user", prompt)
+        messages = self.memory.messages()
         
         try:
+            streamed = ""
             try:
                 # First try streaming
-                for chunk in self.client.chat_completion(
-                    self.messages,
-                    stream=True,
-                    max_tokens=128,
-                    temperature=0.7
+                for chunk in cancellable(
+                    self.client.chat_completion(
+                        messages,
+                        stream=True,
+                        max_tokens=128,
+                        temperature=0.7
+                    ),
+                    cancel_token,
                 ):
                     token = chunk.choices[0].delta.content
                     if token:
                         yield token
+                        streamed += token
+                if cancel_token is not None and cancel_token.cancelled:
+                    return
                         
             except Exception as stream_error:
                 if self.verbose:
@@ -55,7 +70,7 @@ class LLM(LLMInterface):
                     
                 # Fallback to non-streaming
                 response = self.client.chat_completion(
-                    self.messages,
+                    messages,
                     stream=False,
                     max_tokens=128,
                     temperature=0.7
@@ -65,22 +80,28 @@ class LLM(LLMInterface):
                 yield content
                 
             # Get the final response text (either from streaming or non-streaming)
-            if self.messages[-1]["role"] == "user":  # Make sure we haven't added the response yet
+            if self.memory.last()["role"] == "user":  # Make sure we haven't added the response yet
                 response_text = content if 'content' in locals() else None
                 if not response_text:
-                    # Try to reconstruct from streaming if needed
-                    response_text = "".join(token for token in response.choices[0].message.content)
+                    # Reconstruct from streaming if needed
+                    response_text = streamed
                     
-                self.messages.append({
-                    "role": "assistant",
-                    "content": response_text
-                })
+                self.memory.append("assistant", response_text)
                 
         except Exception as e:
             if self.verbose:
                 print(f"Error in chat: {str(e)}")
             raise
 
+    def snapshot_memory(self) -> tuple:
+        return self.memory.snapshot()
+
+    def restore_memory(self, snapshot: tuple) -> None:
+        self.memory.restore(snapshot)
+
     def handle_interrupt(self, heard_response: str) -> None:
-        if self.messages and self.messages[-1]["role"] == "assistant":
-            self.messages[-1]["content"] = heard_response
+        last = self.memory.last()
+        if last is not None and last["role"] == "assistant":
+            self.memory.replace_last(heard_response)
+        elif heard_response:
+            self.memory.append("assistant", heard_response)
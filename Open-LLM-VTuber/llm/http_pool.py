@@ -0,0 +1,116 @@
+"""
+Process-wide HTTP connection pools for the LLM clients.
+
+Every session has LLM instances of its own, but the LLM servers are the same for all of them, so
+the clients (OpenAI, Anthropic, the MemGPT REST calls, the DeepLX translator) share one keep-alive pool per server
+(scheme, host and port) instead of opening their own connections and doing their own TLS handshakes.
+HTTP/2 is used when the `h2` package is installed (`pip install httpx[http2]`), so the requests
+of many sessions are multiplexed over a few connections.
+
+The async pools are tied to the event loop they are used on, so there is one per loop (and the
+sync ones one per process, since the server workers are forked).
+
+The SDKs check the class of the client they are given (some versions use a fork of httpx), so the
+clients of an SDK are made with its own client class (like `openai.DefaultHttpxClient`).
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import os
+import threading
+import weakref
+from types import ModuleType
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# LLM responses are streamed for a long time, so only connecting has a short timeout
+TIMEOUT_SECONDS = 600.0
+CONNECT_TIMEOUT_SECONDS = 10.0
+MAX_CONNECTIONS = 200
+MAX_KEEPALIVE_CONNECTIONS = 50
+KEEPALIVE_EXPIRY_SECONDS = 60.0
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[int, str, type], object] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, type], object]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _origin(base_url: str | None) -> str:
+    parts = urlsplit(base_url or "")
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _new_client(client_class: type):
+    # the Timeout and Limits have to come from the httpx package the client class is from
+    package = next(
+        importlib.import_module(cls.__module__.split(".")[0])
+        for cls in client_class.__mro__
+        if cls.__module__.split(".")[0].startswith("httpx")
+    )
+    return client_class(
+        http2=HTTP2,
+        timeout=package.Timeout(TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS),
+        limits=package.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        follow_redirects=True,
+    )
+
+
+def get_http_client(base_url: str | None, sdk: ModuleType | None = None):
+    """
+    Parameters:
+    - base_url (str | None): The URL of the LLM server. Only its scheme, host and port matter.
+    - sdk (ModuleType | None): The SDK the client is for, like `openai` or `anthropic`. None for a plain httpx client.
+
+    Returns:
+    - httpx.Client: The shared client (and connection pool) of that server, for this process.
+    """
+    client_class = getattr(sdk, "DefaultHttpxClient", httpx.Client)
+    key = (os.getpid(), _origin(base_url), client_class)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _new_client(client_class)
+        return client
+
+
+def get_async_http_client(base_url: str | None, sdk: ModuleType | None = None):
+    """
+    Must be called from the event loop the client is used on.
+
+    Parameters:
+    - base_url (str | None): The URL of the LLM server. Only its scheme, host and port matter.
+    - sdk (ModuleType | None): The SDK the client is for, like `openai` or `anthropic`. None for a plain httpx client.
+
+    Returns:
+    - httpx.AsyncClient: The shared async client (and connection pool) of that server, for the running loop.
+    """
+    client_class = getattr(sdk, "DefaultAsyncHttpxClient", httpx.AsyncClient)
+    loop = asyncio.get_running_loop()
+    key = (_origin(base_url), client_class)
+    with _lock:
+        clients = _async_clients.get(loop)
+        if clients is None:
+            clients = _async_clients[loop] = {}
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = _new_client(client_class)
+        return client
+
+
+async def aclose_async_http_clients() -> None:
+    """Close the async clients of the running loop, like when the server shuts down."""
+    with _lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
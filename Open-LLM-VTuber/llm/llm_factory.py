@@ -39,6 +39,10 @@ class LLMFactory:
                 project_id=cfg(kwargs, "PROJECT_ID"),
                 organization_id=cfg(kwargs, "ORGANIZATION_ID"),
                 verbose=cfg(kwargs, "VERBOSE", default=False),
+                memory_token_budget=cfg(kwargs, "MEMORY_TOKEN_BUDGET"),
+                memory_keep_turns=cfg(kwargs, "MEMORY_KEEP_TURNS", default=4),
+                keep_alive=cfg(kwargs, "KEEP_ALIVE"),
+                stream_usage=cfg(kwargs, "STREAM_USAGE", default=False),
             )
         elif llm_provider == "mem0":
             from llm.mem0_llm import LLM as Mem0LLM
@@ -51,7 +55,14 @@ class LLMFactory:
                 project_id=cfg(kwargs, "PROJECT_ID"),
                 organization_id=cfg(kwargs, "ORGANIZATION_ID"),
                 mem0_config=kwargs.get("MEM0_CONFIG"),  # Special case for nested config
-                verbose=cfg(kwargs, "VERBOSE", default=False)
+                verbose=cfg(kwargs, "VERBOSE", default=False),
+                memory_token_budget=cfg(kwargs, "MEMORY_TOKEN_BUDGET"),
+                memory_keep_turns=cfg(kwargs, "MEMORY_KEEP_TURNS", default=4),
+                search_limit=int(cfg(kwargs, "SEARCH_LIMIT", default=10)),
+                search_ttl=float(cfg(kwargs, "SEARCH_TTL", default=30)),
+                search_budget=float(cfg(kwargs, "SEARCH_BUDGET", default=0.5)),
+                add_batch_size=int(cfg(kwargs, "ADD_BATCH_SIZE", default=4)),
+                add_batch_delay=float(cfg(kwargs, "ADD_BATCH_DELAY", default=2)),
             )
         elif llm_provider == "memgpt":
             return MemGPTLLM(
@@ -67,6 +78,9 @@ class LLMFactory:
                 model=cfg(kwargs, "MODEL"),
                 llm_api_key=cfg(kwargs, "LLM_API_KEY"),
                 verbose=cfg(kwargs, "VERBOSE", default=False),
+                memory_token_budget=cfg(kwargs, "MEMORY_TOKEN_BUDGET"),
+                memory_keep_turns=cfg(kwargs, "MEMORY_KEEP_TURNS", default=4),
+                prompt_cache=cfg(kwargs, "PROMPT_CACHE", default=True),
             )
         elif llm_provider == "hfllama":
             return HFLlamaLLM(
@@ -75,6 +89,8 @@ class LLMFactory:
                 model=cfg(kwargs, "MODEL", env_key="HF_MODEL"),
                 llm_api_key=cfg(kwargs, "LLM_API_KEY", env_key="HF_TOKEN"),
                 verbose=cfg(kwargs, "VERBOSE", default=False),
+                memory_token_budget=cfg(kwargs, "MEMORY_TOKEN_BUDGET"),
+                memory_keep_turns=cfg(kwargs, "MEMORY_KEEP_TURNS", default=4),
             )
         elif llm_provider == "hfendpoint":
             return HFEndpointLLM(
@@ -83,9 +99,14 @@ class LLMFactory:
                 model=cfg(kwargs, "MODEL", env_key="HF_MODEL"),
                 llm_api_key=cfg(kwargs, "LLM_API_KEY", env_key="HF_TOKEN"),
                 verbose=cfg(kwargs, "VERBOSE", default=False),
+                memory_token_budget=cfg(kwargs, "MEMORY_TOKEN_BUDGET"),
+                memory_keep_turns=cfg(kwargs, "MEMORY_KEEP_TURNS", default=4),
             )
         elif llm_provider == "fakellm":
-            return FakeLLM()
+            return FakeLLM(
+                memory_token_budget=cfg(kwargs, "MEMORY_TOKEN_BUDGET"),
+                memory_keep_turns=cfg(kwargs, "MEMORY_KEEP_TURNS", default=4),
+            )
         else:
             raise ValueError(f"Unsupported LLM provider: {llm_provider}")
 
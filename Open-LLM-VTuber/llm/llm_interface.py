@@ -1,23 +1,62 @@
 import abc
-from typing import Iterator
+from typing import Any, AsyncIterator, Iterator
+
+from utils.async_bridge import iterate_in_executor
+from utils.cancellation import CancellationToken
+from .memory_manager import ConversationMemory
 
 
 class LLMInterface(metaclass=abc.ABCMeta):
 
+    # The conversation memory, for the LLMs that keep it on this side (None for the ones that keep it
+    # on their server, like MemGPT). Its `summarize` is set by whoever has an LLM to summarize with.
+    memory: ConversationMemory | None = None
+
+    # The token usage of the last response, as made by `llm.prompt_cache.usage_from_openai` (or
+    # `usage_from_anthropic`): the prompt tokens, how many of them were read from and written to the
+    # prompt cache, and the completion tokens. None for the LLMs that don't report it, or if the
+    # response was cancelled.
+    last_usage: dict | None = None
+
     @abc.abstractmethod
-    def chat_iter(self, prompt: str) -> Iterator[str]:
+    def chat_iter(
+        self, prompt: str, cancel_token: CancellationToken | None = None
+    ) -> Iterator[str]:
         """
         Sends a chat prompt to an agent and return an iterator to the response.
         This function will have to store the user message and ai response back to the memory.
 
         Parameters:
         - prompt (str): The message or question to send to the agent.
+        - cancel_token (CancellationToken | None): Cancelled when the user interrupts. The iterator
+          should then end right away: close the HTTP response (or whatever the response is read
+          from) instead of reading it to the end, and don't store the partial response in memory,
+          `handle_interrupt` is called with what the user heard.
 
         Returns:
         - Iterator[str]: An iterator to the response from the agent.
         """
         raise NotImplementedError
 
+    async def achat_iter(
+        self, prompt: str, cancel_token: CancellationToken | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Same as `chat_iter`, for the event loop (the async conversation pipeline of the server).
+
+        LLMs with an async client override this. This default reads `chat_iter` on a thread of the
+        loop's default executor and hands the tokens to the loop as they arrive.
+
+        Parameters:
+        - prompt (str): The message or question to send to the agent.
+        - cancel_token (CancellationToken | None): See `chat_iter`.
+
+        Returns:
+        - AsyncIterator[str]: An async iterator to the response from the agent.
+        """
+        async for token in iterate_in_executor(lambda: self.chat_iter(prompt, cancel_token=cancel_token)):
+            yield token
+
     def handle_interrupt(self, heard_response: str) -> None:
         """
         This function will be called when the LLM is interrupted by the user.
@@ -30,3 +69,28 @@ class LLMInterface(metaclass=abc.ABCMeta):
         - heard_response (str): The last response from the LLM before it was interrupted. The only content that the user can hear before the interruption.
         """
         raise NotImplementedError
+
+    def close(self) -> None:
+        """
+        Free what this LLM holds besides its memory, like background threads, once the session is
+        done with it. The work they have queued is finished first. Nothing to do by default.
+        """
+
+    def snapshot_memory(self) -> Any:
+        """
+        Take a snapshot of the conversation memory, so it can be rolled back with `restore_memory`
+        (like when a speculative `chat_iter` call is thrown away).
+
+        Returns:
+        - Any: An opaque snapshot, or None if this LLM can't roll back its memory (the default).
+        """
+        return None
+
+    def restore_memory(self, snapshot: Any) -> None:
+        """
+        Roll the conversation memory back to a snapshot taken with `snapshot_memory`.
+
+        Parameters:
+        - snapshot (Any): The snapshot to restore.
+        """
+        raise NotImplementedError
@@ -5,10 +5,15 @@ Compatible with all of the OpenAI Compatible endpoints, including Ollama, OpenAI
 
 from typing import Iterator
 from mem0 import Memory
+import openai
 from openai import OpenAI
 from loguru import logger
+
+from utils.cancellation import CancellationToken, cancellable
+from .http_pool import get_http_client
 from .llm_interface import LLMInterface
-import json
+from .mem0_store import MemorySearchCache, MemoryWriteQueue
+from .memory_manager import ConversationMemory
 
 
 class LLM(LLMInterface):
@@ -24,6 +29,13 @@ class LLM(LLMInterface):
         project_id: str = "z",
         llm_api_key: str = "z",
         verbose: bool = False,
+        memory_token_budget: int | None = None,
+        memory_keep_turns: int = 4,
+        search_limit: int = 10,
+        search_ttl: float = 30.0,
+        search_budget: float = 0.5,
+        add_batch_size: int = 4,
+        add_batch_delay: float = 2.0,
     ):
         """
         Initializes an instance of the `ollama` class.
@@ -36,6 +48,13 @@ class LLM(LLMInterface):
         - project_id (str, optional): The project ID for the OpenAI API. Defaults to an empty string.
         - llm_api_key (str, optional): The API key for the OpenAI API. Defaults to an empty string.
         - verbose (bool, optional): Whether to enable verbose mode. Defaults to `False`.
+        - memory_token_budget (int, optional): Tokens of conversation memory before the older turns are summarized. Defaults to `None` (no limit).
+        - memory_keep_turns (int, optional): Recent turns that are never summarized. Defaults to 4.
+        - search_limit (int, optional): Most memories recalled for a turn. Defaults to 10.
+        - search_ttl (float, optional): Seconds the memories found for a query are reused. Defaults to 30.
+        - search_budget (float, optional): Seconds a turn waits for the memory search before going on without memories. Defaults to 0.5.
+        - add_batch_size (int, optional): Most turns added to mem0 in one call. Defaults to 4.
+        - add_batch_delay (float, optional): Seconds to wait for more turns before adding them to mem0. Defaults to 2.
         """
 
         self.base_url = base_url
@@ -44,41 +63,56 @@ class LLM(LLMInterface):
         self.mem0_config = mem0_config
         self.user_id = user_id
 
-        self.conversation_memory = []
         self.verbose = verbose
         self.client = OpenAI(
             base_url=base_url,
             organization=organization_id,
             project=project_id,
             api_key=llm_api_key,
+            http_client=get_http_client(base_url, openai),
         )
 
         self.system = system
-        self.conversation_memory = [
-            {
-                "role": "system",
-                "content": system,
-            }
-        ]
+        self.memory = ConversationMemory(
+            system, token_budget=memory_token_budget, keep_turns=memory_keep_turns
+        )
 
         logger.debug("Initializing Memory...")
         # Initialize Memory with the configuration
         self.mem0 = Memory.from_config(self.mem0_config)
         logger.debug("Memory Initialized...")
 
+        # the search and the write-back run off the response's critical path
+        self.search_limit = search_limit
+        self.memory_search = MemorySearchCache(
+            self._search_memories, ttl=search_ttl, budget=search_budget
+        )
+        self.memory_writer = MemoryWriteQueue(
+            self._add_memories,
+            max_batch=add_batch_size,
+            batch_delay=add_batch_delay,
+            on_added=self.memory_search.invalidate,
+        )
+
         # Add a memory
         # self.mem0.add("I'm visiting Paris", user_id="john")
 
-    def chat_iter(self, prompt: str) -> Iterator[str]:
+    def close(self) -> None:
+        # the writer thread holds this LLM (and its mem0 clients) until it is stopped
+        self.memory_writer.close()
+        self.memory_search.close()
+
+    def chat_iter(
+        self, prompt: str, cancel_token: CancellationToken | None = None
+    ) -> Iterator[str]:
 
-        logger.debug("All Mem:")
-        logger.debug(self.mem0.get_all(user_id=self.user_id))
+        if self.verbose:
+            logger.debug("All Mem:")
+            logger.debug(self.mem0.get_all(user_id=self.user_id))
 
-        # Get relevant memory
+        # Get relevant memory (none if the search is over its budget)
 
-        relevant_memories_list = self.mem0.search(
-            query=prompt, limit=10, user_id=self.user_id
-        )
+        relevant_memories_list = self.memory_search.search(prompt, self.user_id)
         relevant_memories = ""
         if relevant_memories_list:
             relevant_memories = "\n".join(
@@ -87,9 +121,8 @@ class LLM(LLMInterface):
 
         if relevant_memories:
             logger.debug("Relevant memories found...")
-            self.conversation_memory[0] = {
-                "role": "system",
-                "content": f"""{self.system}
+            self.memory.set_system(
+                f"""{self.system}
                 
                 ## Relevant Memories
                 Here are something you recall from the past:
@@ -97,24 +130,16 @@ class LLM(LLMInterface):
                 {relevant_memories}
                 ===== end of relevant memories =====
                 
-                """,
-            }
+                """
+            )
         else:
             logger.debug("No relevant memories found...")
-            self.conversation_memory[0] = {
-                "role": "system",
-                "content": f"""{self.system}""",
-            }
+            self.memory.set_system(f"""{self.system}""")
 
         logger.debug("System:")
-        logger.debug(self.conversation_memory[0])
+        logger.debug(self.memory.system)
 
-        self.conversation_memory.append(
-            {
-                "role": "user",
-                "content": prompt,
-            }
-        )
+        self.memory.append("user", prompt)
 
         this_conversation_mem = [
             {
@@ -126,9 +151,10 @@ class LLM(LLMInterface):
         chat_completion = []
         try:
             logger.debug("Calling the chat endpoint with...")
-            logger.debug(self.conversation_memory)
+            messages = self.memory.messages()
+            logger.debug(messages)
             chat_completion = self.client.chat.completions.create(
-                messages=self.conversation_memory,
+                messages=messages,
                 model=self.model,
                 stream=True,
             )
@@ -141,18 +167,16 @@ class LLM(LLMInterface):
         # the complete response in memory once the iteration is done
         def _generate_and_store_response():
             complete_response = ""
-            for chunk in chat_completion:
+            for chunk in cancellable(chat_completion, cancel_token, chat_completion.close):
                 if chunk.choices[0].delta.content is None:
                     chunk.choices[0].delta.content = ""
                 yield chunk.choices[0].delta.content
                 complete_response += chunk.choices[0].delta.content
 
-            self.conversation_memory.append(
-                {
-                    "role": "assistant",
-                    "content": complete_response,
-                }
-            )
+            if cancel_token is not None and cancel_token.cancelled:
+                return  # handle_interrupt stores what was heard
+
+            self.memory.append("assistant", complete_response)
 
             this_conversation_mem.append(
                 {
@@ -161,40 +185,38 @@ class LLM(LLMInterface):
                 }
             )
 
-            # Add the conversation to the memory
-            logger.debug(self.mem0.add(this_conversation_mem, user_id=self.user_id))
+            # Add the conversation to the memory, in the background
+            self.memory_writer.put(this_conversation_mem, self.user_id)
+            return
+
+        return _generate_and_store_response()
 
-            logger.debug(f"Mem0 Added... {this_conversation_mem}")
+    def _search_memories(self, query: str, user_id: str) -> list:
+        found = self.mem0.search(query=query, limit=self.search_limit, user_id=user_id)
+        # newer mem0 versions return {"results": [...]}
+        return found.get("results", []) if isinstance(found, dict) else found
 
+    def _add_memories(self, messages: list, user_id: str):
+        result = self.mem0.add(messages, user_id=user_id)
+        if self.verbose:
             logger.debug("All Mem:")
-            logger.debug(self.mem0.get_all(user_id=self.user_id))
+            logger.debug(self.mem0.get_all(user_id=user_id))
+        return result
 
-            def serialize_memory(memory, filename):
-                with open(filename, "w") as file:
-                    json.dump(memory, file)
+    def snapshot_memory(self) -> tuple:
+        return self.memory.snapshot()
 
-            serialize_memory(self.conversation_memory, "mem.json")
-            return
-
-        return _generate_and_store_response()
+    def restore_memory(self, snapshot: tuple) -> None:
+        self.memory.restore(snapshot)
 
     def handle_interrupt(self, heard_response: str) -> None:
-        if self.conversation_memory[-1]["role"] == "assistant":
-            self.conversation_memory[-1]["content"] = heard_response + "..."
+        last = self.memory.last()
+        if last is not None and last["role"] == "assistant":
+            self.memory.replace_last(heard_response + "...")
         else:
             if heard_response:
-                self.conversation_memory.append(
-                    {
-                        "role": "assistant",
-                        "content": heard_response + "...",
-                    }
-                )
-        self.conversation_memory.append(
-            {
-                "role": "system",
-                "content": "[Interrupted by user]",
-            }
-        )
+                self.memory.append("assistant", heard_response + "...")
+        self.memory.append("system", "[Interrupted by user]")
 
 
 def test():
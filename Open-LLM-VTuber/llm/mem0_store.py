@@ -0,0 +1,231 @@
+import queue
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Tuple
+
+from loguru import logger
+
+_STOP = object()
+
+# the write queues of this process that are not closed yet, for `close_write_queues`
+_open_write_queues: "weakref.WeakSet[MemoryWriteQueue]" = weakref.WeakSet()
+_open_write_queues_lock = threading.Lock()
+
+
+def close_write_queues(timeout: float | None = None) -> None:
+    """
+    Close all the write queues of this process, adding the turns they still have (like when the
+    server shuts down).
+
+    Parameters:
+    - timeout (float | None): Most seconds to wait for each queue. None to wait until they are done.
+    """
+    with _open_write_queues_lock:
+        write_queues = list(_open_write_queues)
+    for write_queue in write_queues:
+        write_queue.close(timeout)
+
+
+class MemorySearchCache:
+    """
+    The mem0 memory search of the mem0 LLM, with a short-lived cache and a latency budget.
+
+    The results of a search are reused for `ttl` seconds for the same user and query (the same
+    words, whatever the case and spacing), so a repeated question or a retried turn doesn't search
+    again. A search that takes longer than `budget` seconds is not waited for: the turn goes on
+    without memories, and the search finishes in the background and fills the cache for later.
+    """
+
+    def __init__(
+        self,
+        search: Callable[[str, str], List[dict]],
+        ttl: float = 30.0,
+        budget: float = 0.5,
+        max_entries: int = 256,
+    ):
+        """
+        Parameters:
+        - search (Callable[[str, str], List[dict]]): Searches the memories of a user, from the query
+          and the user id. Blocking.
+        - ttl (float): Seconds a result is reused.
+        - budget (float): Seconds a turn waits for the search.
+        - max_entries (int): Most results kept. The oldest ones are dropped first.
+        """
+        self._search = search
+        self.ttl = ttl
+        self.budget = budget
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[dict]]]" = OrderedDict()
+        self._pending: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mem0-search")
+
+    def search(self, query: str, user_id: str) -> List[dict]:
+        """
+        Parameters:
+        - query (str): What to search for, like the user message.
+        - user_id (str): Whose memories to search.
+
+        Returns:
+        - List[dict]: The memories found, or an empty list if the search failed or is over budget.
+        """
+        key = (user_id, " ".join(query.lower().split()))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = self._executor.submit(self._search_and_store, key, query, user_id)
+        try:
+            return future.result(timeout=self.budget)
+        except FutureTimeoutError:
+            logger.warning(f"Memory search took more than {self.budget}s. Continuing without memories.")
+        except Exception as e:
+            logger.error(f"Memory search failed: {e}")
+        return []
+
+    def close(self) -> None:
+        """Stop the search threads. The searches that are running are not waited for."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget the results of a user, like when memories were added."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def _search_and_store(self, key: Tuple[str, str], query: str, user_id: str) -> List[dict]:
+        try:
+            results = self._search(query, user_id)
+            with self._lock:
+                self._entries[key] = (time.monotonic(), results)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return results
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+
+class MemoryWriteQueue:
+    """
+    Adds the turns of the conversation to mem0 on a background thread, so the response is done
+    as soon as it is streamed instead of after the extraction LLM call and the vector upsert.
+
+    The turns that are waiting are added together: the worker waits `batch_delay` seconds after
+    a turn for more of them (up to `max_batch`), and adds the turns of each user in one call, so
+    mem0 extracts the memories of several turns in one LLM call.
+    """
+
+    def __init__(
+        self,
+        add: Callable[[List[dict], str], Any],
+        max_batch: int = 4,
+        batch_delay: float = 2.0,
+        on_added: Callable[[str], None] | None = None,
+    ):
+        """
+        Parameters:
+        - add (Callable[[List[dict], str], Any]): Adds messages to the memories of a user, from the
+          messages and the user id. Blocking.
+        - max_batch (int): Most turns added in one call.
+        - batch_delay (float): Seconds to wait for more turns before adding.
+        - on_added (Callable[[str], None] | None): Called with the user id after memories were added.
+        """
+        self._add = add
+        self.max_batch = max(1, max_batch)
+        self.batch_delay = batch_delay
+        self.on_added = on_added
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    def put(self, messages: List[dict], user_id: str) -> None:
+        """
+        Queue the messages of a turn.
+
+        Parameters:
+        - messages (List[dict]): The messages, like the user message and the response.
+        - user_id (str): Whose memories they go to.
+        """
+        with self._start_lock:
+            if self._closed:
+                logger.warning(f"The memory writer is closed, {len(messages)} messages are not added to mem0.")
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mem0-writer", daemon=True)
+                self._thread.start()
+                with _open_write_queues_lock:
+                    _open_write_queues.add(self)
+            self._queue.put((messages, user_id))
+
+    def join(self) -> None:
+        """Wait until the turns queued so far are added."""
+        self._queue.join()
+
+    def close(self, timeout: float | None = None) -> None:
+        """
+        Add the turns that are still queued, then stop the thread. Turns put after this are dropped.
+
+        Parameters:
+        - timeout (float | None): Most seconds to wait for the queued turns. None to wait until they are added.
+        """
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(_STOP)
+        with _open_write_queues_lock:
+            _open_write_queues.discard(self)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning(f"The memory writer did not finish adding the queued turns in {timeout}s.")
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True  # closing: add what is left without waiting for more
+                    break
+                batch.append(item)
+
+            by_user: Dict[str, List[dict]] = {}
+            for messages, user_id in batch:
+                by_user.setdefault(user_id, []).extend(messages)
+            for user_id, messages in by_user.items():
+                try:
+                    logger.debug(self._add(messages, user_id))
+                    logger.debug(f"Mem0 Added... {messages}")
+                    if self.on_added is not None:
+                        self.on_added(user_id)
+                except Exception as e:
+                    logger.error(f"Failed to add {len(messages)} messages to the memories of {user_id}: {e}")
+            for _ in range(len(batch) + stop):  # the stop item too
+                self._queue.task_done()
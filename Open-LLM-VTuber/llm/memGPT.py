@@ -1,8 +1,9 @@
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 import json
-import requests
 from rich.console import Console
+from .http_pool import get_async_http_client, get_http_client
 from .llm_interface import LLMInterface
+from utils.cancellation import CancellationToken, acancellable, cancellable
 
 console = Console()
 
@@ -32,17 +33,45 @@ class LLM(LLMInterface):
         }
         self.verbose = verbose
 
-    def chat_iter(self, prompt) -> Iterator[str]:
-        full_response = self._send_message_to_agent(prompt, callback_function=print)
+    def chat_iter(self, prompt, cancel_token: CancellationToken | None = None) -> Iterator[str]:
+        full_response = self._send_message_to_agent(
+            prompt, callback_function=print, cancel_token=cancel_token
+        )
+        if cancel_token is not None and cancel_token.cancelled:
+            return ""
         # memGPT will handle the memory, so no need to deal with it here
         return full_response
 
+    async def achat_iter(
+        self, prompt, cancel_token: CancellationToken | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Same as `chat_iter` with the async client, except that the assistant messages are yielded as they
+        arrive instead of all at once at the end.
+        """
+        async with get_async_http_client(self.base_url).stream(
+            "POST",
+            self._messages_url(),
+            headers=self.headers,
+            content=self._message_body(prompt),
+            timeout=30,
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise ValueError(f"Failed to send message: {response.text}")
+
+            async for line in acancellable(response.aiter_lines(), cancel_token, response.aclose):
+                assistant_message = self._parse_line(line)
+                if assistant_message:
+                    print(assistant_message)
+                    yield assistant_message
+
     def handle_interrupt(self, heard_response: str) -> None:
         print(
             "\n>> (MemGPT doesn't know you interrupted it for now. I don't know how to tell it about the interruption.) \n"
         )
 
-    def _send_message_to_agent(self, message, callback_function=print):
+    def _send_message_to_agent(self, message, callback_function=print, cancel_token=None):
         """
         Sends a message to the specified agent, invokes the callback with the assistant's full message if given, and return the assistant's full response. The response will NOT be streamed back word by word.
 
@@ -53,46 +82,67 @@ class LLM(LLMInterface):
         Parameters:
         - message (str): The message to send to the agent.
         - callback_function (function): The function to call with the assistant's message. Defaults to print.
+        - cancel_token (CancellationToken | None): Closes the response when cancelled, the partial response is returned.
 
         Returns:
         - str: The assistant's full response.
         """
 
-        url = f"{self.base_url}/api/agents/{self.agent_id}/messages"
+        result = ""
+
+        # the connections to the server are shared with the other sessions
+        with get_http_client(self.base_url).stream(
+            "POST",
+            self._messages_url(),
+            headers=self.headers,
+            content=self._message_body(message),
+            timeout=30,
+        ) as response:
+            if response.status_code != 200:
+                response.read()
+                raise ValueError(f"Failed to send message: {response.text}")
+
+            for line in cancellable(response.iter_lines(), cancel_token, response.close):
+                assistant_message = self._parse_line(line)
+                if assistant_message:
+                    result += assistant_message
+                    if callable(callback_function):
+                        callback_function(assistant_message)
+
+        return result
+
+    def _messages_url(self) -> str:
+        return f"{self.base_url}/api/agents/{self.agent_id}/messages"
 
+    def _message_body(self, message: str) -> str:
         data = {
             "agent_id": self.agent_id,
             "message": message,
             "stream": True,
             "role": "user",
         }
-        response = requests.post(
-            url, headers=self.headers, data=json.dumps(data), stream=True, timeout=30
-        )
-
-        if response.status_code != 200:
-            raise ValueError(f"Failed to send message: {response.text}")
-
-        result = ""
+        return json.dumps(data)
 
-        for line in response.iter_lines():
-            if line:
-                decoded_line = line.decode("utf-8").strip()
-                if decoded_line.startswith("data:"):
-                    decoded_line = decoded_line[len("data:") :].strip()
-                if decoded_line:
-                    try:
-                        json_line = json.loads(decoded_line)
-                        if self.verbose:
-                            console.print(json_line)
-                        if "assistant_message" in json_line:
-                            result += json_line["assistant_message"]
-                            if callable(callback_function):
-                                callback_function(json_line["assistant_message"])
-
-                    except json.JSONDecodeError as e:
-                        print(f"Error decoding JSON: {e} for line: {decoded_line}")
-                else:
-                    print("Received an empty line or non-JSON data.")
+    def _parse_line(self, line: str) -> str | None:
+        """
+        Parse one line of the Server-Sent Events of the response.
 
-        return result
+        Returns:
+        - str | None: The assistant message in it, if any.
+        """
+        if not line:
+            return None
+        decoded_line = line.strip()
+        if decoded_line.startswith("data:"):
+            decoded_line = decoded_line[len("data:") :].strip()
+        if not decoded_line:
+            print("Received an empty line or non-JSON data.")
+            return None
+        try:
+            json_line = json.loads(decoded_line)
+        except json.JSONDecodeError as e:
+            print(f"Error decoding JSON: {e} for line: {decoded_line}")
+            return None
+        if self.verbose:
+            console.print(json_line)
+        return json_line.get("assistant_message") if isinstance(json_line, dict) else None
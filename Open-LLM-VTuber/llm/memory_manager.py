@@ -0,0 +1,313 @@
+import threading
+from typing import Callable, List
+
+from loguru import logger
+
+from utils.journal import ConversationJournal
+
+# Tokens a chat message takes besides its content (role, separators)
+MESSAGE_OVERHEAD = 4
+
+SUMMARY_PROMPT = """Summarize the conversation below for yourself, so you can continue it later without the messages.
+Keep the names, facts, preferences and promises that came up, and what was still being talked about.
+Write it in the language of the conversation, in a few short sentences, and answer with the summary only.
+
+{previous_summary}===== conversation =====
+{conversation}
+===== end of conversation ====="""
+
+_encoding = None
+_encoding_loaded = False
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text, with tiktoken if it's installed, or estimate them
+    (one token every 4 characters) if it isn't. Models have tokenizers of their own, so
+    it is an estimate either way, but a close one.
+
+    Parameters:
+    - text (str): The text.
+
+    Returns:
+    - int: The number of tokens.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None  # not installed, or the encoding can't be downloaded
+        _encoding_loaded = True
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+class ConversationMemory:
+    """
+    The conversation memory of an LLM, kept within a token budget.
+
+    The memory is the system prompt, a summary of the older turns (once there is one) and the
+    messages of the recent turns. A turn starts with a user message. The tokens are counted once,
+    when a message is added, so the total is always known without counting the conversation again.
+
+    When the total goes over `token_budget`, all the turns but the last `keep_turns` are folded into
+    the summary: a background thread asks `summarize` for a new summary (from the previous one and
+    the folded turns), and the folded messages are replaced by it once it's ready. Until then the
+    messages stay as they are, so a turn never waits for the summary. The system prompt and the last
+    `keep_turns` turns are never folded. Without `summarize`, or if it fails, the folded turns are
+    dropped instead.
+
+    With a journal attached (see `attach_journal`), every change is appended to it, so the memory
+    survives a reconnect or a crash.
+
+    Thread safe: the summary is done on another thread while the conversation goes on.
+    """
+
+    def __init__(
+        self,
+        system: str | None = None,
+        token_budget: int | None = None,
+        keep_turns: int = 4,
+        summarize: Callable[[str], str] | None = None,
+    ):
+        """
+        Parameters:
+        - system (str | None): The system prompt.
+        - token_budget (int | None): Most tokens of the system prompt, summary and messages together
+          before the older turns are folded. None (or 0) to keep everything.
+        - keep_turns (int): Recent turns that are never folded. At least 1.
+        - summarize (Callable[[str], str] | None): Answers a prompt, like `OpenLLMVTuberMain.ask_llm_once`.
+          It is called on a background thread. None to drop the older turns instead of summarizing them.
+        """
+        self.token_budget = int(token_budget) if token_budget else None
+        self.keep_turns = max(1, int(keep_turns or 1))
+        self.summarize = summarize
+        self._lock = threading.RLock()
+        self._system: str | None = None
+        self._system_tokens = 0
+        self._summary: str | None = None
+        self._summary_tokens = 0
+        self._history: List[dict] = []
+        self._history_tokens: List[int] = []
+        self._total_history_tokens = 0
+        self._folding = False
+        self.journal: ConversationJournal | None = None
+        self.set_system(system)
+
+    @property
+    def system(self) -> str | None:
+        return self._system
+
+    @property
+    def summary(self) -> str | None:
+        return self._summary
+
+    @property
+    def token_count(self) -> int:
+        """Tokens of the system prompt, summary and messages together."""
+        with self._lock:
+            return self._system_tokens + self._summary_tokens + self._total_history_tokens
+
+    def __len__(self) -> int:
+        """Number of messages, without the system prompt and the summary."""
+        return len(self._history)
+
+    def attach_journal(self, journal: ConversationJournal) -> None:
+        """
+        Record the changes of the memory in `journal` from now on. If the journal already has a
+        conversation in it (the session reconnected), the memory continues it.
+        """
+        state = journal.load()
+        with self._lock:
+            if state is not None:
+                summary, history = state
+                self._set_state(summary, history)
+            elif self._history or self._summary:
+                journal.reset(self._summary, self._history)
+            self.journal = journal
+
+    def set_system(self, system: str | None) -> None:
+        """Replace the system prompt (like when it is rebuilt for every turn)."""
+        with self._lock:
+            self._system = system
+            self._system_tokens = count_tokens(system) + MESSAGE_OVERHEAD if system else 0
+
+    def append(self, role: str, content: str) -> None:
+        """
+        Add a message, and start folding the older turns if the memory is over budget.
+
+        Parameters:
+        - role (str): "user", "assistant" or "system".
+        - content (str): The text.
+        """
+        tokens = count_tokens(content) + MESSAGE_OVERHEAD
+        with self._lock:
+            self._history.append({"role": role, "content": content})
+            self._history_tokens.append(tokens)
+            self._total_history_tokens += tokens
+            if self.journal is not None:
+                self.journal.message(role, content)
+                self._maybe_compact()
+            self._maybe_fold()
+
+    def last(self) -> dict | None:
+        """The last message (a copy), or None if there is none."""
+        with self._lock:
+            return dict(self._history[-1]) if self._history else None
+
+    def replace_last(self, content: str) -> None:
+        """Replace the text of the last message, like with the part of the response that was heard."""
+        tokens = count_tokens(content) + MESSAGE_OVERHEAD
+        with self._lock:
+            self._history[-1] = {"role": self._history[-1]["role"], "content": content}
+            self._total_history_tokens += tokens - self._history_tokens[-1]
+            self._history_tokens[-1] = tokens
+            if self.journal is not None:
+                self.journal.replace_last(content)
+                self._maybe_compact()
+
+    def summary_message(self) -> dict | None:
+        """The summary as a system message, or None if nothing was folded yet."""
+        with self._lock:
+            if not self._summary:
+                return None
+            return {
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{self._summary}",
+            }
+
+    def system_prompt(self) -> str:
+        """The system prompt with the summary appended, for the APIs that take the system prompt apart (like Claude)."""
+        with self._lock:
+            summary = self.summary_message()
+            parts = [part for part in (self._system, summary and summary["content"]) if part]
+            return "\n\n".join(parts)
+
+    def messages(self, include_system: bool = True) -> List[dict]:
+        """
+        The messages to send to the LLM (copies).
+
+        Parameters:
+        - include_system (bool): Start with the system prompt and the summary as system messages.
+          False for the messages only, with `system_prompt` sent apart.
+
+        Returns:
+        - List[dict]: The messages, as {"role": ..., "content": ...}.
+        """
+        with self._lock:
+            messages = []
+            if include_system:
+                if self._system:
+                    messages.append({"role": "system", "content": self._system})
+                summary = self.summary_message()
+                if summary is not None:
+                    messages.append(summary)
+            messages.extend(dict(message) for message in self._history)
+            return messages
+
+    def snapshot(self) -> tuple:
+        """Take a snapshot of the memory, to roll it back with `restore`."""
+        with self._lock:
+            return (
+                self._system,
+                self._summary,
+                [dict(message) for message in self._history],
+            )
+
+    def restore(self, snapshot: tuple) -> None:
+        """
+        Roll the memory back to a snapshot taken with `snapshot`. A summary that is being made for
+        messages that the snapshot doesn't have anymore is thrown away when it's ready.
+        """
+        system, summary, history = snapshot
+        with self._lock:
+            self.set_system(system)
+            self._set_state(summary, history)
+            if self.journal is not None:
+                self.journal.reset(self._summary, self._history)
+                self._maybe_compact()
+
+    def _set_state(self, summary: str | None, history: List[dict]) -> None:
+        self._summary = summary
+        self._summary_tokens = count_tokens(summary) + MESSAGE_OVERHEAD if summary else 0
+        self._history = [dict(message) for message in history]
+        self._history_tokens = [
+            count_tokens(message["content"]) + MESSAGE_OVERHEAD for message in self._history
+        ]
+        self._total_history_tokens = sum(self._history_tokens)
+
+    def _maybe_compact(self) -> None:
+        if self.journal.needs_compaction:
+            self.journal.compact(self._summary, self._history)
+
+    def _fold_point(self) -> int:
+        """Index of the first message of the turns that are kept, 0 if nothing can be folded."""
+        turns = 0
+        for index in range(len(self._history) - 1, -1, -1):
+            if self._history[index]["role"] == "user":
+                turns += 1
+                if turns == self.keep_turns:
+                    return index
+        return 0
+
+    def _maybe_fold(self) -> None:
+        if self.token_budget is None or self._folding or self.token_count <= self.token_budget:
+            return
+        fold_point = self._fold_point()
+        if fold_point == 0:
+            return
+        folded = [dict(message) for message in self._history[:fold_point]]
+        if self.summarize is None:
+            self._replace_folded(folded, self._summary)
+            return
+        self._folding = True
+        threading.Thread(
+            target=self._fold,
+            args=(folded, self._summary),
+            name="memory-summary",
+            daemon=True,
+        ).start()
+
+    def _fold(self, folded: List[dict], previous_summary: str | None) -> None:
+        summary = previous_summary
+        try:
+            summary = self.summarize(self._summary_prompt(folded, previous_summary)).strip() or summary
+        except Exception as e:
+            logger.warning(f"Failed to summarize the older turns, dropping them instead: {e}")
+        with self._lock:
+            self._folding = False
+            if self._summary != previous_summary or self._history[: len(folded)] != folded:
+                logger.debug("The memory changed while it was being summarized. Summary discarded.")
+            else:
+                self._replace_folded(folded, summary)
+            self._maybe_fold()
+
+    def _replace_folded(self, folded: List[dict], summary: str | None) -> None:
+        count = len(folded)
+        self._history = self._history[count:]
+        self._history_tokens = self._history_tokens[count:]
+        self._total_history_tokens = sum(self._history_tokens)
+        self._summary = summary
+        self._summary_tokens = count_tokens(summary) + MESSAGE_OVERHEAD if summary else 0
+        if self.journal is not None:
+            self.journal.fold(count, summary)
+            self._maybe_compact()
+        logger.debug(
+            f"Folded {count} messages into the summary. The memory is now {self.token_count} tokens."
+        )
+
+    @staticmethod
+    def _summary_prompt(folded: List[dict], previous_summary: str | None) -> str:
+        conversation = "\n".join(f"{message['role']}: {message['content']}" for message in folded)
+        return SUMMARY_PROMPT.format(
+            previous_summary=(
+                f"===== summary of what came before =====\n{previous_summary}\n" if previous_summary else ""
+            ),
+            conversation=conversation,
+        )
@@ -5,11 +5,16 @@ And it is compatible with all of the OpenAI Compatible endpoints, including Olla
 OpenAI, and more.
 """
 
-from typing import Iterator
-import json
-from openai import OpenAI
+import asyncio
+from typing import AsyncIterator, Iterator
+import openai
+from openai import AsyncOpenAI, OpenAI
 
+from .http_pool import get_async_http_client, get_http_client
 from .llm_interface import LLMInterface
+from .memory_manager import ConversationMemory
+from .prompt_cache import usage_from_openai
+from utils.cancellation import CancellationToken, acancellable, cancellable
 
 
 class LLM(LLMInterface):
@@ -24,6 +29,10 @@ class LLM(LLMInterface):
         project_id: str = "z",
         llm_api_key: str = "z",
         verbose: bool = False,
+        memory_token_budget: int | None = None,
+        memory_keep_turns: int = 4,
+        keep_alive: str | int | None = None,
+        stream_usage: bool = False,
     ):
         """
         Initializes an instance of the `ollama` class.
@@ -37,20 +46,35 @@ class LLM(LLMInterface):
         - project_id (str, optional): The project ID for the OpenAI API. Defaults to an empty string.
         - llm_api_key (str, optional): The API key for the OpenAI API. Defaults to an empty string.
         - verbose (bool, optional): Whether to enable verbose mode. Defaults to `False`.
+        - memory_token_budget (int, optional): Tokens of conversation memory before the older turns are summarized. Defaults to `None` (no limit).
+        - memory_keep_turns (int, optional): Recent turns that are never summarized. Defaults to 4.
+        - keep_alive (str | int, optional): How long Ollama keeps the model, and the KV cache of the conversation so far, loaded after a request (like "30m", or -1 for ever). Defaults to `None` (not sent, the server's default).
+        - stream_usage (bool, optional): Ask for the token usage at the end of the stream, to report the prompt tokens read from the cache. Not all OpenAI compatible servers accept it (some answer 400). Defaults to `False`.
         """
 
         self.base_url = base_url
         self.model = model
         self.system = system
         self.callback = callback
-        self.memory = []
+        self.memory = ConversationMemory(
+            token_budget=memory_token_budget, keep_turns=memory_keep_turns
+        )
         self.verbose = verbose
-        self.client = OpenAI(
+        self.keep_alive = keep_alive
+        self.stream_usage = stream_usage
+        self._client_options = dict(
             base_url=base_url,
             organization=organization_id,
             project=project_id,
             api_key=llm_api_key,
         )
+        # the connections to the server are shared with the other sessions
+        self.client = OpenAI(
+            **self._client_options,
+            http_client=get_http_client(base_url, openai),
+        )
+        self._async_client: AsyncOpenAI | None = None
+        self._async_client_loop: asyncio.AbstractEventLoop | None = None
 
         self.__set_system(system)
 
@@ -64,12 +88,7 @@ class LLM(LLMInterface):
             the system prompt
         """
         self.system = system
-        self.memory.append(
-            {
-                "role": "system",
-                "content": system,
-            }
-        )
+        self.memory.set_system(system)
 
     def __print_memory(self):
         """
@@ -77,7 +96,7 @@ class LLM(LLMInterface):
         """
         print("Memory:\n========\n")
         # for message in self.memory:
-        print(self.memory)
+        print(self.memory.messages())
         print("\n========\n")
 
     def __printDebugInfo(self):
@@ -85,14 +104,27 @@ class LLM(LLMInterface):
         print(" -- Model: " + self.model)
         print(" -- System: " + self.system)
 
-    def chat_iter(self, prompt: str) -> Iterator[str]:
+    def __request_options(self) -> dict:
+        """
+        The options of the chat completion requests besides the messages.
 
-        self.memory.append(
-            {
-                "role": "user",
-                "content": prompt,
-            }
-        )
+        The messages always start the same way (the system prompt, the summary, then the turns in
+        order, only ever appended to), so the server can reuse its KV cache of the conversation
+        for the next turn, as long as it keeps the model loaded (`keep_alive`).
+        """
+        options = {}
+        if self.stream_usage:
+            options["stream_options"] = {"include_usage": True}
+        if self.keep_alive is not None:
+            options["extra_body"] = {"keep_alive": self.keep_alive}
+        return options
+
+    def chat_iter(
+        self, prompt: str, cancel_token: CancellationToken | None = None
+    ) -> Iterator[str]:
+
+        self.memory.append("user", prompt)
+        self.last_usage = None
 
         if self.verbose:
             self.__print_memory()
@@ -104,9 +136,10 @@ class LLM(LLMInterface):
         chat_completion = []
         try:
             chat_completion = self.client.chat.completions.create(
-                messages=self.memory,
+                messages=self.memory.messages(),
                 model=self.model,
                 stream=True,
+                **self.__request_options(),
             )
         except Exception as e:
             print("Error calling the chat endpoint: " + str(e))
@@ -117,45 +150,96 @@ class LLM(LLMInterface):
         # the complete response in memory once the iteration is done
         def _generate_and_store_response():
             complete_response = ""
-            for chunk in chat_completion:
+            # closing the response on cancel stops the generation on the server as well
+            for chunk in cancellable(chat_completion, cancel_token, chat_completion.close):
+                if not chunk.choices:  # the usage, after the last token
+                    if chunk.usage is not None:
+                        self.last_usage = usage_from_openai(chunk.usage)
+                    continue
                 if chunk.choices[0].delta.content is None:
                     chunk.choices[0].delta.content = ""
                 yield chunk.choices[0].delta.content
                 complete_response += chunk.choices[0].delta.content
 
-            self.memory.append(
-                {
-                    "role": "assistant",
-                    "content": complete_response,
-                }
-            )
-
-            def serialize_memory(memory, filename):
-                with open(filename, "w") as file:
-                    json.dump(memory, file)
+            if cancel_token is not None and cancel_token.cancelled:
+                return  # handle_interrupt stores what was heard
 
-            serialize_memory(self.memory, "mem.json")
+            # the memory's journal (if any) persists it
+            self.memory.append("assistant", complete_response)
             return
 
         return _generate_and_store_response()
 
+    async def achat_iter(
+        self, prompt: str, cancel_token: CancellationToken | None = None
+    ) -> AsyncIterator[str]:
+
+        self.memory.append("user", prompt)
+        self.last_usage = None
+
+        if self.verbose:
+            self.__print_memory()
+            print(" -- Prompt: " + prompt + "\n\n")
+
+        try:
+            chat_completion = await self.__get_async_client().chat.completions.create(
+                messages=self.memory.messages(),
+                model=self.model,
+                stream=True,
+                **self.__request_options(),
+            )
+        except Exception as e:
+            print("Error calling the chat endpoint: " + str(e))
+            self.__printDebugInfo()
+            yield "Error calling the chat endpoint: " + str(e)
+            return
+
+        complete_response = ""
+        try:
+            # closing the response on cancel stops the generation on the server as well
+            async for chunk in acancellable(chat_completion, cancel_token, chat_completion.close):
+                if not chunk.choices:  # the usage, after the last token
+                    if chunk.usage is not None:
+                        self.last_usage = usage_from_openai(chunk.usage)
+                    continue
+                if chunk.choices[0].delta.content is None:
+                    chunk.choices[0].delta.content = ""
+                yield chunk.choices[0].delta.content
+                complete_response += chunk.choices[0].delta.content
+        finally:
+            await chat_completion.close()
+
+        if cancel_token is not None and cancel_token.cancelled:
+            return  # handle_interrupt stores what was heard
+
+        # the memory's journal (if any) persists it
+        self.memory.append("assistant", complete_response)
+
+    def __get_async_client(self) -> AsyncOpenAI:
+        """The async client, on the pool of the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = AsyncOpenAI(
+                **self._client_options,
+                http_client=get_async_http_client(self.base_url, openai),
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    def snapshot_memory(self) -> tuple:
+        return self.memory.snapshot()
+
+    def restore_memory(self, snapshot: tuple) -> None:
+        self.memory.restore(snapshot)
+
     def handle_interrupt(self, heard_response: str) -> None:
-        if self.memory[-1]["role"] == "assistant":
-            self.memory[-1]["content"] = heard_response + "..."
+        last = self.memory.last()
+        if last is not None and last["role"] == "assistant":
+            self.memory.replace_last(heard_response + "...")
         else:
             if heard_response:
-                self.memory.append(
-                    {
-                        "role": "assistant",
-                        "content": heard_response + "...",
-                    }
-                )
-        self.memory.append(
-            {
-                "role": "system",
-                "content": "[Interrupted by user]",
-            }
-        )
+                self.memory.append("assistant", heard_response + "...")
+        self.memory.append("system", "[Interrupted by user]")
 
 
 def test():
@@ -0,0 +1,60 @@
+"""
+Prompt caching: the persona prompt and the history before the new user message are the same on
+every turn, so the LLM servers can reuse their work on that prefix (the KV cache) instead of
+processing it again. These helpers turn the usage fields of the responses into one shape, to
+report how much of the prompt came from the cache.
+"""
+
+from typing import Any, Dict
+
+from loguru import logger
+
+# Anthropic cache breakpoint: the prompt up to the block it is on is cached (for 5 minutes)
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def usage_from_openai(usage: Any) -> Dict[str, int]:
+    """
+    Parameters:
+    - usage: The `usage` of an OpenAI compatible chat completion (the last chunk of a stream
+      requested with `stream_options={"include_usage": True}`).
+
+    Returns:
+    - Dict[str, int]: `prompt_tokens` (all of them), `cache_read_tokens`, `cache_write_tokens` and `completion_tokens`.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "cache_read_tokens": getattr(details, "cached_tokens", 0) or 0,
+        "cache_write_tokens": 0,  # cached automatically, not reported
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+
+
+def usage_from_anthropic(usage: Any) -> Dict[str, int]:
+    """
+    Parameters:
+    - usage: The `usage` of an Anthropic message. Its `input_tokens` are the ones after the last
+      cache breakpoint only.
+
+    Returns:
+    - Dict[str, int]: Same as `usage_from_openai`.
+    """
+    cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    return {
+        "prompt_tokens": (getattr(usage, "input_tokens", 0) or 0) + cache_read + cache_write,
+        "cache_read_tokens": cache_read,
+        "cache_write_tokens": cache_write,
+        "completion_tokens": getattr(usage, "output_tokens", 0) or 0,
+    }
+
+
+def log_usage(usage: Dict[str, int]) -> None:
+    """Log how much of the prompt was read from the cache."""
+    prompt_tokens = usage["prompt_tokens"]
+    hit_rate = usage["cache_read_tokens"] / prompt_tokens if prompt_tokens else 0.0
+    logger.info(
+        f"Prompt cache: {usage['cache_read_tokens']}/{prompt_tokens} prompt tokens read from the cache "
+        f"({hit_rate:.0%}), {usage['cache_write_tokens']} written."
+    )
@@ -0,0 +1,181 @@
+import re
+import threading
+import queue
+from typing import Any, Iterator
+
+from loguru import logger
+
+from .llm_interface import LLMInterface
+from utils.cancellation import CancellationToken
+
+_DONE = object()
+
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase the text and drop punctuation and spaces, so that ASR noise like "Hi." / "hi" compares equal."""
+    return re.sub(r"[\W_]+", "", text.lower())
+
+
+class SpeculativeGenerator:
+    """
+    Starts the LLM on a partial transcript before the user has finished speaking.
+
+    `start` snapshots the LLM memory and runs `llm.chat_iter(partial_text)` on a background thread,
+    buffering the tokens. When the final transcript arrives, `commit` checks it against the partial
+    text: on a match, it returns an iterator that replays the buffered tokens and then follows the
+    running generation (a hit); otherwise the generation is stopped and the memory rolled back
+    (a miss), and the caller starts the LLM on the final transcript as usual.
+
+    Only LLMs that support `snapshot_memory` can be used speculatively.
+    """
+
+    def __init__(self, llm: LLMInterface):
+        """
+        Parameters:
+        - llm (LLMInterface): The LLM of the session.
+        """
+        self.llm = llm
+        self.hits: int = 0
+        self.misses: int = 0
+        self.wasted_tokens: int = 0  # chunks generated by speculations that were thrown away
+        self._lock = threading.Lock()
+        self._speculation: "_Speculation | None" = None
+
+    @property
+    def supported(self) -> bool:
+        return self.llm.snapshot_memory() is not None
+
+    @property
+    def pending_text(self) -> str | None:
+        """The partial transcript the running speculation was started on, or None."""
+        speculation = self._speculation
+        return speculation.text if speculation is not None else None
+
+    def start(self, partial_text: str) -> None:
+        """
+        Start generating a response to `partial_text` in the background.
+        A running speculation on a different text is thrown away first (and counted as a miss).
+
+        Parameters:
+        - partial_text (str): The transcript so far.
+        """
+        if not partial_text.strip():
+            return
+        with self._lock:
+            current = self._speculation
+            if current is not None and normalize_transcript(current.text) == normalize_transcript(partial_text):
+                return
+            self._speculation = None
+        if current is not None:
+            self._discard(current)
+
+        snapshot = self.llm.snapshot_memory()
+        if snapshot is None:
+            return
+        speculation = _Speculation(partial_text, snapshot)
+        speculation.thread = threading.Thread(
+            target=self._produce, args=(speculation,), daemon=True
+        )
+        with self._lock:
+            self._speculation = speculation
+        speculation.thread.start()
+        logger.info(f"Speculative LLM start on: {partial_text}")
+
+    def commit(
+        self, final_text: str, cancel_token: CancellationToken | None = None
+    ) -> Iterator[str] | None:
+        """
+        End the speculation with the final transcript.
+
+        Parameters:
+        - final_text (str): The final transcript of the utterance.
+        - cancel_token (CancellationToken | None): The token of the turn the response is used in,
+          cancelling it cancels the running generation.
+
+        Returns:
+        - Iterator[str] | None: The response iterator if the speculation matches the final transcript,
+          None if there was no speculation or it didn't match (the memory is rolled back then).
+        """
+        with self._lock:
+            speculation, self._speculation = self._speculation, None
+        if speculation is None:
+            return None
+        if normalize_transcript(speculation.text) != normalize_transcript(final_text):
+            self._discard(speculation)
+            logger.info(f"Speculation missed. {self.stats()}")
+            return None
+        self.hits += 1
+        logger.info(f"Speculation hit. {self.stats()}")
+        if cancel_token is not None:
+            cancel_token.on_cancel(speculation.cancel_token.cancel)
+        return self._consume(speculation)
+
+    def cancel(self) -> None:
+        """Throw away the running speculation, if any, and roll the memory back."""
+        with self._lock:
+            speculation, self._speculation = self._speculation, None
+        if speculation is not None:
+            self._discard(speculation)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+        - dict: hits, misses, hit rate and wasted tokens so far.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "wasted_tokens": self.wasted_tokens,
+        }
+
+    def _discard(self, speculation: "_Speculation") -> None:
+        speculation.cancel_token.cancel()
+        speculation.thread.join()
+        self.llm.restore_memory(speculation.snapshot)
+        self.misses += 1
+        self.wasted_tokens += speculation.produced
+
+    def _produce(self, speculation: "_Speculation") -> None:
+        chat_completion = None
+        try:
+            # the token closes the LLM response as soon as the speculation is thrown away
+            chat_completion = self.llm.chat_iter(
+                speculation.text, cancel_token=speculation.cancel_token
+            )
+            for token in chat_completion:
+                if speculation.cancel_token.cancelled:
+                    break
+                speculation.produced += 1
+                speculation.tokens.put(token)
+        except Exception as e:
+            logger.error(f"Speculative generation failed: {e}")
+        finally:
+            # closing the generator before it finishes keeps the response out of the memory
+            close = getattr(chat_completion, "close", None)
+            if callable(close):
+                close()
+            speculation.tokens.put(_DONE)
+
+    def _consume(self, speculation: "_Speculation") -> Iterator[str]:
+        try:
+            while True:
+                token = speculation.tokens.get()
+                if token is _DONE:
+                    break
+                yield token
+        finally:
+            # the caller stopped early (like on interrupt): stop the generation too
+            speculation.cancel_token.cancel()
+            speculation.thread.join()
+
+
+class _Speculation:
+    def __init__(self, text: str, snapshot: Any):
+        self.text = text
+        self.snapshot = snapshot
+        self.tokens: queue.Queue = queue.Queue()
+        self.cancel_token = CancellationToken()
+        self.thread: threading.Thread | None = None
+        self.produced: int = 0
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 import re
@@ -5,9 +6,10 @@ import random
 import shutil
 import atexit
 import threading
-import queue
+import time
 import uuid
-from typing import Callable, Iterator, Optional
+from concurrent.futures import CancelledError, Future
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
 from fastapi import WebSocket
 from loguru import logger
 import numpy as np
@@ -17,14 +19,27 @@ import chardet
 import __init__
 from asr.asr_factory import ASRFactory
 from asr.asr_interface import ASRInterface
+from asr.streaming_asr import StreamingTranscriber
 from live2d_model import Live2dModel
 from llm.llm_factory import LLMFactory
 from llm.llm_interface import LLMInterface
+from llm.prompt_cache import log_usage
+from llm.speculative import SpeculativeGenerator
 from prompts import prompt_loader
+from speech_pipeline import SpeechPipeline
 from tts.tts_factory import TTSFactory
-from tts.tts_interface import TTSInterface
+from tts.tts_interface import AudioData, AudioStream, TTSInterface, to_pcm16
+from tts.look_ahead import LookAheadSynthesizer
+from tts.tts_cache import TTSCache
 from translate.translate_interface import TranslateInterface
 from translate.translate_factory import TranslateFactory
+from translate.translation_stage import TranslationStage
+from utils.async_bridge import iterate_in_executor
+from utils.cancellation import CancellationToken
+from utils.engine_pool import EnginePool
+from utils.journal import ConversationJournal, JournalWriter
+from utils.sentence_segmenter import SentenceSegmenter, is_complete_sentence
+from utils.tracing import Tracer, TurnTrace
 
 
 class OpenLLMVTuberMain:
@@ -38,27 +53,57 @@ class OpenLLMVTuberMain:
     - llm (LLMInterface): The LLM instance.
     - asr (ASRInterface): The ASR instance.
     - tts (TTSInterface): The TTS instance.
+    - engine_pool (EnginePool | None): The pool the heavy engines (ASR, TTS, translator) are borrowed from. If None, this instance loads its own engines.
+    - tracer (Tracer): Records the latency of the stages of each turn. A new one (writing to TRACE_JSONL) if none is given.
+    - journal_writer (JournalWriter | None): Writes the conversation journal of this session to MEMORY_JOURNAL_DIR.
+      A new one if none is given (and MEMORY_JOURNAL_DIR is set).
+    - resumable (bool): The session id was chosen by the client, which can come back with it. Only the
+      memory of these sessions is journaled, a random id is never seen again. By default, whether a
+      `session_id` was given.
+    - turn_trace (TurnTrace | None): The trace of the current turn.
+    - cancel_token (CancellationToken): Cancelled by `interrupt`, it aborts the LLM request and the TTS jobs of the current turn.
     """
 
     EXEC_FLAG_CHECK_TIMEOUT = 8  # seconds
 
+    # The provider of the one-off prompts of `ask_llm_once` (like the memory summaries), for the LLM
+    # providers that have side effects besides answering. Its config is the section of the LLM provider.
+    # mem0 would search the long-term memories for the prompt and add the prompt and the answer to them.
+    UTILITY_LLM_PROVIDERS = {"mem0": "ollama"}
+
     def __init__(
         self,
         configs: dict,
         custom_asr: ASRInterface | None = None,
         custom_tts: TTSInterface | None = None,
         websocket: WebSocket | None = None,
+        engine_pool: EnginePool | None = None,
+        tracer: Tracer | None = None,
+        session_id: str | None = None,
+        journal_writer: JournalWriter | None = None,
+        resumable: bool | None = None,
     ) -> None:
         logger.info(f"t41372/Open-LLM-VTuber, version {__init__.__version__}")
 
         self.config: dict = configs
         self.verbose = self.config.get("VERBOSE", False)
         self.websocket = websocket
+        self.engine_pool = engine_pool
+        self._pooled_engines: list = []
         self.live2d: Live2dModel | None = self.init_live2d()
         self._continue_exec_flag = threading.Event()
         self._continue_exec_flag.set()  # Set the flag to continue execution
-        self.session_id: str = str(uuid.uuid4().hex)
+        self.cancel_token = CancellationToken()  # a new one for every conversation chain
+        self.session_id: str = session_id or str(uuid.uuid4().hex)
+        self.resumable: bool = session_id is not None if resumable is None else resumable
+        self.tracer = tracer or Tracer(jsonl_path=self.config.get("TRACE_JSONL"))
+        self.journal_writer = journal_writer
+        self.turn_trace: TurnTrace | None = None
         self.heard_sentence: str = ""
+        self._active_chains: int = 0  # conversation chains running right now
+        self._active_chains_lock = threading.Lock()
+        self._utility_llm: LLMInterface | None = None  # for one-off prompts, see ask_llm_once
+        self._utility_llm_lock = threading.Lock()
 
         # Init ASR if voice input is on.
         self.asr: ASRInterface | None
@@ -83,24 +128,13 @@ class OpenLLMVTuberMain:
                 self.tts = custom_tts
         else:
             self.tts = None
+        self.tts_cache: TTSCache | None = self.init_tts_cache()
 
         # Init Translator if enabled
-        self.translator: TranslateInterface | None
-        if self.config.get("TRANSLATE_AUDIO", False):
-            try:
-                translate_provider = self.config.get("TRANSLATE_PROVIDER", "DeepLX")
-                self.translator = TranslateFactory.get_translator(
-                    translate_provider=translate_provider,
-                    **self.config.get(translate_provider, {}),
-                )
-            except Exception as e:
-                print(f"Error initializing Translator: {e}")
-                print("Proceed without Translator.")
-                self.translator = None
-        else:
-            self.translator = None
+        self.translator: TranslateInterface | None = self.init_translator()
 
         self.llm: LLMInterface = self.init_llm()
+        self.speculative: SpeculativeGenerator | None = self.init_speculative()
 
     # Initialization methods
 
@@ -122,23 +156,267 @@ class OpenLLMVTuberMain:
         system_prompt = self.get_system_prompt()
 
         llm = LLMFactory.create_llm(
-            llm_provider=llm_provider, SYSTEM_PROMPT=system_prompt, **llm_config
+            llm_provider=llm_provider,
+            SYSTEM_PROMPT=system_prompt,
+            **{
+                "MEMORY_TOKEN_BUDGET": self.config.get("MEMORY_TOKEN_BUDGET"),
+                "MEMORY_KEEP_TURNS": self.config.get("MEMORY_KEEP_TURNS", 4),
+                **llm_config,
+            },
         )
+        if llm.memory is not None and self.config.get("MEMORY_SUMMARIZE", True):
+            # the older turns are summarized by a separate LLM instance without side effects, in the background
+            llm.memory.summarize = self.ask_llm_once
+        if llm.memory is not None and self.resumable and self.config.get("MEMORY_JOURNAL_DIR"):
+            # continues the conversation of this session id if there is one
+            llm.memory.attach_journal(self.init_journal())
         return llm
 
+    def init_journal(self) -> ConversationJournal:
+        """
+        Returns:
+        - ConversationJournal: The journal of the conversation memory of this session, in MEMORY_JOURNAL_DIR.
+        """
+        if self.journal_writer is None:
+            self.journal_writer = JournalWriter(
+                fsync_interval=self.config.get("MEMORY_JOURNAL_FSYNC_INTERVAL", 0.2)
+            )
+            atexit.register(self.journal_writer.close)  # writes the records still waiting
+        return ConversationJournal(
+            self.journal_writer,
+            self.config.get("MEMORY_JOURNAL_DIR"),
+            self.session_id,
+            compact_every=self.config.get("MEMORY_JOURNAL_COMPACT_EVERY", 500),
+        )
+
+    def ask_llm_once(self, prompt: str) -> str:
+        """
+        Send a one-off prompt (like a classification request) to the configured LLM provider and return the answer.
+        It goes to a separate LLM instance whose memory is rolled back afterwards, so the conversation
+        memory of this session is never touched. Blocks until the answer is complete.
+        With mem0, the prompt goes to a plain OpenAI compatible LLM on the same server instead (see
+        `UTILITY_LLM_PROVIDERS`), so it is not searched for or added to the long-term memories.
+
+        Parameters:
+        - prompt (str): The prompt.
+
+        Returns:
+        - str: The full answer.
+
+        Raises:
+        - NotImplementedError if the LLM provider can't roll back its memory.
+        """
+        with self._utility_llm_lock:
+            if self._utility_llm is None:
+                llm_provider = self.config.get("LLM_PROVIDER")
+                self._utility_llm = LLMFactory.create_llm(
+                    llm_provider=self.UTILITY_LLM_PROVIDERS.get(llm_provider, llm_provider),
+                    SYSTEM_PROMPT="Follow the instructions exactly and answer in the requested format only.",
+                    **self.config.get(llm_provider, {}),
+                )
+            snapshot = self._utility_llm.snapshot_memory()
+            if snapshot is None:
+                raise NotImplementedError(
+                    f"{self.config.get('LLM_PROVIDER')} can't answer one-off prompts without changing its memory."
+                )
+            try:
+                return "".join(self._utility_llm.chat_iter(prompt))
+            finally:
+                self._utility_llm.restore_memory(snapshot)
+
+    def init_speculative(self) -> SpeculativeGenerator | None:
+        """
+        Set up speculative LLM starts on partial transcripts if SPECULATIVE_LLM is on.
+        Partial transcripts come from the streaming ASR, and the LLM has to support memory snapshots.
+        """
+        if not self.config.get("SPECULATIVE_LLM", False):
+            return None
+        speculative = SpeculativeGenerator(self.llm)
+        if not speculative.supported:
+            print(f"{self.config.get('LLM_PROVIDER')} can't roll back its memory. Proceed without speculative LLM.")
+            return None
+        return speculative
+
     def init_asr(self) -> ASRInterface:
-        asr_model = self.config.get("ASR_MODEL")
-        asr_config = self.config.get(asr_model, {})
-        asr = ASRFactory.get_asr_system(asr_model, **asr_config)
-        return asr
+        return self._load_engine(*self._asr_engine_spec(self.config))
 
     def init_tts(self) -> TTSInterface:
-        tts_model = self.config.get("TTS_MODEL", "pyttsx3TTS")
-        tts_config = self.config.get(tts_model, {})
-        return TTSFactory.get_tts_engine(tts_model, **tts_config)
+        return self._load_engine(*self._tts_engine_spec(self.config))
+
+    def init_tts_cache(self) -> TTSCache | None:
+        """
+        Returns:
+        - TTSCache | None: The phrase cache shared by the sessions, if TTS_CACHE_ON and TTS is on.
+        """
+        if not self.config.get("TTS_CACHE_ON", False) or self.tts is None:
+            return None
+        try:
+            return self._load_engine(*self._tts_cache_engine_spec(self.config))
+        except Exception as e:
+            print(f"Error initializing the TTS cache: {e}")
+            print("Proceed without TTS cache.")
+            return None
+
+    @staticmethod
+    def _asr_engine_spec(configs: dict) -> tuple[str, str, dict, Callable]:
+        asr_model = configs.get("ASR_MODEL")
+        asr_config = configs.get(asr_model, {})
+        return (
+            "asr",
+            asr_model,
+            asr_config,
+            lambda: ASRFactory.get_asr_system(asr_model, **asr_config),
+        )
+
+    @staticmethod
+    def _tts_engine_spec(configs: dict) -> tuple[str, str, dict, Callable]:
+        tts_model = configs.get("TTS_MODEL", "pyttsx3TTS")
+        tts_config = configs.get(tts_model, {})
+        return (
+            "tts",
+            tts_model,
+            tts_config,
+            lambda: TTSFactory.get_tts_engine(tts_model, **tts_config),
+        )
+
+    @staticmethod
+    def _tts_cache_engine_spec(configs: dict) -> tuple[str, str, dict, Callable]:
+        cache_config = configs.get("TTSCache", {})
+        return (
+            "tts_cache",
+            "TTSCache",
+            cache_config,
+            lambda: TTSCache(**cache_config),
+        )
+
+    @staticmethod
+    def _translator_engine_spec(configs: dict) -> tuple[str, str, dict, Callable]:
+        translate_provider = configs.get("TRANSLATE_PROVIDER", "DeepLX")
+        translate_config = configs.get(translate_provider, {})
+        return (
+            "translator",
+            translate_provider,
+            translate_config,
+            lambda: TranslateFactory.get_translator(
+                translate_provider=translate_provider,
+                **translate_config,
+            ),
+        )
+
+    @classmethod
+    def preload_engines(cls, configs: dict, engine_pool: EnginePool) -> None:
+        """
+        Load the engines (ASR, TTS, translator) the config turns on into the engine pool and pin them there,
+        so they are loaded before the first session connects (and before the server forks its workers).
+
+        Parameters:
+        - configs (dict): The configuration dictionary.
+        - engine_pool (EnginePool): The pool to load the engines into.
+        """
+        if configs.get("VOICE_INPUT_ON", False):
+            engine_pool.preload(*cls._asr_engine_spec(configs))
+        if configs.get("TTS_ON", False):
+            engine_pool.preload(*cls._tts_engine_spec(configs))
+            if configs.get("TTS_CACHE_ON", False):
+                engine_pool.preload(*cls._tts_cache_engine_spec(configs))
+        if configs.get("TRANSLATE_AUDIO", False):
+            engine_pool.preload(*cls._translator_engine_spec(configs))
+
+    def create_streaming_transcriber(self) -> StreamingTranscriber | None:
+        """
+        Create a transcriber that transcribes mic audio while it is coming in,
+        if STREAMING_ASR is on and there is an ASR.
+
+        Returns:
+        - StreamingTranscriber | None: A new transcriber (one per session), or None.
+        """
+        if not self.config.get("STREAMING_ASR", False) or self.asr is None:
+            return None
+        streaming_config = dict(self.config.get("StreamingASR", {}))
+        if not streaming_config.get("vad_model_path"):
+            streaming_config.pop("vad_model_path", None)
+        try:
+            return StreamingTranscriber(
+                self.asr.transcribe_np,
+                on_partial=self.speculate if self.speculative is not None else None,
+                **streaming_config,
+            )
+        except Exception as e:
+            print(f"Error initializing streaming ASR: {e}")
+            print("Proceed without streaming ASR.")
+            return None
+
+    def speculate(self, partial_text: str) -> None:
+        """
+        Start the LLM on a partial transcript (the user paused but may not be done yet).
+        The response is used by the next `conversation_chain` if its input matches the partial transcript.
+        Does nothing if speculation is off or a conversation chain is running.
+
+        Parameters:
+        - partial_text (str): The transcript so far.
+        """
+        if self.speculative is None:
+            return
+        with self._active_chains_lock:
+            if self._active_chains > 0:
+                return
+        self.speculative.start(partial_text)
+
+    def _load_engine(self, kind: str, provider: str, config: dict, loader: Callable):
+        """
+        Load an engine with the loader, or borrow it from the engine pool if there is one.
+
+        Parameters:
+        - kind (str): The kind of engine ("asr", "tts", "translator").
+        - provider (str): The name of the provider in the config.
+        - config (dict): The config of the provider.
+        - loader (Callable): A function with no arguments that builds the engine.
+
+        Returns:
+        - The engine instance.
+        """
+        if self.engine_pool is None:
+            return loader()
+        engine = self.engine_pool.acquire(kind, provider, config, loader)
+        self._pooled_engines.append(engine)
+        return engine
+
+    def release_engines(self) -> None:
+        """
+        Give the engines borrowed from the engine pool back to it.
+        Called by `close`, or before the engines are initialized again.
+        """
+        if self.engine_pool is None:
+            return
+        while self._pooled_engines:
+            self.engine_pool.release(self._pooled_engines.pop())
+
+    def close_llms(self) -> None:
+        """
+        Close the LLM and the utility LLM of `ask_llm_once` (their background threads, like the mem0
+        writer, add what they have queued first). Blocking.
+        """
+        with self._utility_llm_lock:
+            llms = [self.llm, self._utility_llm]
+            self._utility_llm = None
+        for llm in llms:
+            if llm is None:
+                continue
+            try:
+                llm.close()
+            except Exception as e:
+                logger.error(f"Failed to close the LLM: {e}")
+
+    def close(self) -> None:
+        """
+        Give the engines back to the pool and close the LLMs.
+        Call this when this instance is no longer used (like when the client disconnects). Blocking.
+        """
+        self.release_engines()
+        self.close_llms()
 
     def set_audio_output_func(
-        self, audio_output_func: Callable[[Optional[str], Optional[str]], None]
+        self, audio_output_func: Callable[[Optional[str], Optional[str | AudioData | AudioStream]], None]
     ) -> None:
         """
         Set the audio output function to be used for playing audio files.
@@ -148,8 +426,11 @@ class OpenLLMVTuberMain:
         - The sentence to be displayed on the frontend.
         - If None, empty sentence will be displayed.
 
-        filepath: str | None
+        filepath: str | AudioData | AudioStream | None
         - The path to the audio file to be played.
+        - With TTS_IN_MEMORY on, the audio itself (AudioData: int16 samples and sample rate) instead of a path.
+        - With TTS_STREAMING on, an AudioStream of PCM chunks that are still being synthesized.
+          Iterate it to play the chunks as they arrive, or call `read_all()` to get the AudioData.
         - If None, no audio will be played.
 
         Here is an example of the function:
@@ -170,6 +451,24 @@ class OpenLLMVTuberMain:
 
         # def _play_audio_file(self, sentence: str, filepath: str | None) -> None:
 
+    def set_async_audio_output_func(
+        self,
+        audio_output_func: Callable[
+            [Optional[str], Optional[str | AudioData | AudioStream]], Awaitable[None]
+        ],
+    ) -> None:
+        """
+        Set the coroutine function `aconversation_chain` plays the audio with, like sending it to the
+        client from the event loop. It takes the same arguments as the one of `set_audio_output_func`.
+        Without one, the function of `set_audio_output_func` is run on the loop's default executor.
+        """
+        self._aplay_audio_file = audio_output_func
+
+    async def _aplay_audio_file(
+        self, sentence: str | None, filepath: str | AudioData | AudioStream | None
+    ) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self._play_audio_file, sentence, filepath)
+
     def get_system_prompt(self) -> str:
         """
         Construct and return the system prompt based on the configuration file.
@@ -194,7 +493,9 @@ class OpenLLMVTuberMain:
 
     # Main conversation methods
 
-    def conversation_chain(self, user_input: str | np.ndarray | None = None) -> str:
+    def conversation_chain(
+        self, user_input: str | np.ndarray | None = None, turn_trace: TurnTrace | None = None
+    ) -> str:
         """
         One iteration of the main conversation.
         1. Get user input (text or audio) if not provided as an argument
@@ -203,20 +504,57 @@ class OpenLLMVTuberMain:
 
         Parameters:
         - user_input (str, numpy array, or None): The user input to be used in the conversation. If it's string, it will be considered as user input. If it's a numpy array, it will be transcribed. If it's None, we'll request input from the user.
+        - turn_trace (TurnTrace or None): The trace of this turn, if it was started before (like at the end of the user's speech). A new one is started otherwise.
 
         Returns:
         - str: The full response from the LLM
         """
+        self._start_turn(turn_trace)
+        try:
+            return self._conversation_chain(user_input)
+        finally:
+            self._end_turn()
 
-        def clean_text_for_tts(text: str) -> str:
-            """Remove action text between asterisks for TTS"""
-            # Remove text between asterisks
-            cleaned = re.sub(r'\*[^*]+\*', '', text)
-            # Remove any leftover asterisks
-            cleaned = cleaned.replace('*', '')
-            # Clean up extra spaces
-            cleaned = ' '.join(cleaned.split())
-            return cleaned
+    async def aconversation_chain(
+        self, user_input: str | np.ndarray, turn_trace: TurnTrace | None = None
+    ) -> str | None:
+        """
+        The asyncio variant of `conversation_chain`, for the server: the turn runs on the event loop
+        instead of taking threads for itself. The LLM stream is read with `LLMInterface.achat_iter`,
+        the response is spoken by a SpeechPipeline and the audio is played with the function of
+        `set_async_audio_output_func`. The blocking engines (ASR, TTS) run on the loop's default executor.
+
+        Parameters:
+        - user_input (str or numpy array): The user input. If it's a numpy array, it will be transcribed.
+        - turn_trace (TurnTrace or None): The trace of this turn, if it was started before. A new one is started otherwise.
+
+        Returns:
+        - str or None: The full response from the LLM, or None if it was interrupted
+        """
+        self._start_turn(turn_trace)
+        try:
+            return await self._aconversation_chain(user_input)
+        finally:
+            self._end_turn()
+
+    def _start_turn(self, turn_trace: TurnTrace | None) -> None:
+        self.turn_trace = turn_trace or self.tracer.start_turn(self.session_id)
+        self.cancel_token = CancellationToken()
+        with self._active_chains_lock:
+            self._active_chains += 1
+
+    def _end_turn(self) -> None:
+        with self._active_chains_lock:
+            self._active_chains -= 1
+        self.turn_trace.record("turn", time.perf_counter() - self.turn_trace.start)
+        if self.cancel_token.cancelled:
+            # from the interrupt until the LLM, the TTS and the playback of this turn all stopped
+            self.turn_trace.record(
+                "interrupt_to_silence", time.perf_counter() - self.cancel_token.cancelled_at
+            )
+
+    def _conversation_chain(self, user_input: str | np.ndarray | None = None) -> str:
+        """The body of `conversation_chain`."""
 
         if not self._continue_exec_flag.wait(timeout=self.EXEC_FLAG_CHECK_TIMEOUT):
             print(">> Execution flag not set...")
@@ -240,7 +578,8 @@ class OpenLLMVTuberMain:
             user_input = self.get_user_input()
         elif isinstance(user_input, np.ndarray):
             print("transcribing...")
-            user_input = self.asr.transcribe_np(user_input)
+            with self.turn_trace.span("asr_transcribe"):
+                user_input = self.asr.transcribe_np(user_input)
 
         if user_input.strip().lower() == self.config.get("EXIT_PHRASE", "exit").lower():
             print("Exiting...")
@@ -248,7 +587,13 @@ class OpenLLMVTuberMain:
 
         print(f"User input: {user_input}")
 
-        chat_completion: Iterator[str] = self.llm.chat_iter(user_input)
+        # use the response that was started on the partial transcript, if it matches
+        chat_completion: Iterator[str] | None = None
+        if self.speculative is not None:
+            chat_completion = self.speculative.commit(user_input, self.cancel_token)
+        if chat_completion is None:
+            chat_completion = self.llm.chat_iter(user_input, cancel_token=self.cancel_token)
+        chat_completion = self._traced_completion(chat_completion, self.turn_trace, self.llm)
 
         if not self.config.get("TTS_ON", False):
             full_response = ""
@@ -259,52 +604,161 @@ class OpenLLMVTuberMain:
                     return None
                 full_response += char
                 print(char, end="")
+            if not self._continue_exec_flag.is_set():
+                # the interrupt closed the LLM stream
+                self._interrupt_post_processing()
+                print("\nInterrupted!")
+                return None
             return full_response
 
-        # For TTS, clean the text before speaking
-        full_response = ""
-        current_sentence = ""
-        
-        for char in chat_completion:
+        # For TTS, speak sentence by sentence while the response streams in
+        try:
+            full_response = self.speak_by_sentence_chain(chat_completion)
+        except InterruptedError:
+            print("\nInterrupted!")
+            return None
+
+        print(f"{c[color_code]}Conversation completed.")
+        return full_response
+
+    async def _aconversation_chain(self, user_input: str | np.ndarray) -> str | None:
+        """The body of `aconversation_chain`."""
+        loop = asyncio.get_running_loop()
+
+        if not self._continue_exec_flag.is_set() and not await loop.run_in_executor(
+            None, self._continue_exec_flag.wait, self.EXEC_FLAG_CHECK_TIMEOUT
+        ):
+            print(">> Execution flag not set...")
+            self._continue_exec_flag.set()
+            raise InterruptedError("Conversation chain interrupted...")
+
+        print("New Conversation Chain started!")
+
+        if isinstance(user_input, np.ndarray):
+            print("transcribing...")
+            with self.turn_trace.span("asr_transcribe"):
+                user_input = await loop.run_in_executor(None, self.asr.transcribe_np, user_input)
+
+        print(f"User input: {user_input}")
+
+        # use the response that was started on the partial transcript, if it matches
+        chat_completion: AsyncIterator[str] | None = None
+        if self.speculative is not None:
+            speculated = self.speculative.commit(user_input, self.cancel_token)
+            if speculated is not None:
+                chat_completion = iterate_in_executor(speculated)
+        if chat_completion is None:
+            chat_completion = self.llm.achat_iter(user_input, cancel_token=self.cancel_token)
+        chat_completion = self._atraced_completion(chat_completion, self.turn_trace, self.llm)
+
+        if not self.config.get("TTS_ON", False):
+            full_response = ""
+            async for char in chat_completion:
+                full_response += char
+                print(char, end="")
             if not self._continue_exec_flag.is_set():
                 self._interrupt_post_processing()
                 print("\nInterrupted!")
                 return None
-            
-            print(char, end="")
-            current_sentence += char
-            full_response += char
-            
-            if self.is_complete_sentence(current_sentence):
-                # Clean the text before sending to TTS
-                cleaned_sentence = clean_text_for_tts(current_sentence)
-                if cleaned_sentence.strip():  # Only process if there's text after cleaning
-                    filename = self._generate_audio_file(cleaned_sentence, "temp")
-                    if self._continue_exec_flag.is_set():
-                        self._play_audio_file(
-                            sentence=current_sentence,  # Keep original for display
-                            filepath=filename,
-                        )
-                    else:
-                        self._interrupt_post_processing()
-                current_sentence = ""
-
-        # Handle any remaining text
-        if current_sentence.strip():
-            cleaned_sentence = clean_text_for_tts(current_sentence)
-            if cleaned_sentence.strip():
-                filename = self._generate_audio_file(cleaned_sentence, "temp")
-                if self._continue_exec_flag.is_set():
-                    self._play_audio_file(
-                        sentence=current_sentence,
-                        filepath=filename,
-                    )
-                else:
-                    self._interrupt_post_processing()
+            return full_response
 
-        print(f"{c[color_code]}Conversation completed.")
+        try:
+            full_response = await self.aspeak_by_sentence_chain(chat_completion)
+        except InterruptedError:
+            print("\nInterrupted!")
+            return None
+
+        print("Conversation completed.")
         return full_response
 
+    async def aspeak_by_sentence_chain(self, chat_completion: AsyncIterator[str]) -> str:
+        """
+        The asyncio variant of `speak_by_sentence_chain`, with a SpeechPipeline.
+
+        Raises:
+        - InterruptedError: If the turn was interrupted.
+        """
+        turn_trace = self.turn_trace or self.tracer.start_turn(self.session_id)
+        translate_batch = None
+        if self.translator and self.config.get("TRANSLATE_AUDIO", False):
+            translate_batch = self.translator.atranslate_batch
+
+        async def _play(sentence: str, audio: str | AudioData | AudioStream) -> None:
+            self.heard_sentence += sentence
+            await self._aplay_audio_file(sentence, audio)
+
+        self.heard_sentence = ""
+        pipeline = SpeechPipeline(
+            self.new_sentence_segmenter(),
+            synthesize=self._synthesize_text,
+            play=_play,
+            clean_text=self.clean_text_for_tts,
+            translate_batch=translate_batch,
+            max_ahead=self.config.get("TTS_LOOKAHEAD", 1),
+            max_batch=self.config.get("TRANSLATE_MAX_BATCH", 8),
+            on_sentence=lambda sentence: turn_trace.mark("first_sentence"),
+            on_discard=self._discard_audio_file,
+        )
+        try:
+            full_response = await pipeline.run(chat_completion, self.cancel_token)
+            if not self._continue_exec_flag.is_set():
+                raise InterruptedError("Conversation chain interrupted")
+        except InterruptedError:
+            self._interrupt_post_processing()
+            raise
+
+        print("\n\n --- Audio generation and playback completed ---")
+        return full_response
+
+    @staticmethod
+    async def _atraced_completion(
+        chat_completion: AsyncIterator[str], turn_trace: TurnTrace, llm: LLMInterface
+    ) -> AsyncIterator[str]:
+        """The async version of `_traced_completion`."""
+        llm_start = time.perf_counter()
+        try:
+            async for token in chat_completion:
+                turn_trace.mark("llm_first_token", since=llm_start)
+                yield token
+        finally:
+            await chat_completion.aclose()
+        OpenLLMVTuberMain._record_llm_response(turn_trace, time.perf_counter() - llm_start, llm.last_usage)
+
+    @staticmethod
+    def _traced_completion(
+        chat_completion: Iterator[str], turn_trace: TurnTrace, llm: LLMInterface
+    ) -> Iterator[str]:
+        """
+        Pass the LLM stream through, recording its time to the first token, its total time and
+        the tokens it used (see `_record_llm_response`).
+        """
+        llm_start = time.perf_counter()
+        for token in chat_completion:
+            turn_trace.mark("llm_first_token", since=llm_start)
+            yield token
+        OpenLLMVTuberMain._record_llm_response(turn_trace, time.perf_counter() - llm_start, llm.last_usage)
+
+    @staticmethod
+    def _record_llm_response(turn_trace: TurnTrace, duration: float, usage: dict | None) -> None:
+        """
+        Record the "llm_response" span, with the token usage of the response if the LLM reported it,
+        and count the prompt tokens by where they came from: read from the prompt cache, written to
+        it, or neither.
+        """
+        if usage is None:
+            turn_trace.record("llm_response", duration)
+            return
+        turn_trace.record("llm_response", duration, **usage)
+        uncached = usage["prompt_tokens"] - usage["cache_read_tokens"] - usage["cache_write_tokens"]
+        for cache, tokens in (
+            ("read", usage["cache_read_tokens"]),
+            ("write", usage["cache_write_tokens"]),
+            ("none", uncached),
+        ):
+            turn_trace.tracer.count("llm_prompt_tokens", tokens, cache=cache)
+        turn_trace.tracer.count("llm_completion_tokens", usage["completion_tokens"])
+        log_usage(usage)
+
     def get_user_input(self) -> str:
         """
         Get user input using the method specified in the configuration file.
@@ -371,6 +825,86 @@ class OpenLLMVTuberMain:
         if self.verbose:
             print(f">> generating {file_name_no_ext}...")
 
+        sentence = self._prepare_tts_text(sentence)
+        if sentence is None:
+            return None
+
+        if self.tts_cache is None:
+            return self.tts.generate_audio(sentence, file_name_no_ext=file_name_no_ext)
+
+        cache_key = self._tts_cache_key(sentence)
+        filepath = self.tts_cache.get(cache_key)
+        if filepath is not None:
+            if self.verbose:
+                print(f">> TTS cache hit: {sentence}")
+            return filepath
+        filepath = self.tts.generate_audio(sentence, file_name_no_ext=file_name_no_ext)
+        if filepath:
+            self.tts_cache.put(cache_key, filepath)
+        return filepath
+
+    def _generate_audio(
+        self, sentence: str, file_name_no_ext: str, cancel_token: CancellationToken | None = None
+    ) -> str | AudioData | AudioStream | None:
+        """
+        Generate the audio of the given sentence. With TTS_STREAMING on and a TTS engine that can stream,
+        this returns right away with an AudioStream the audio arrives in while it is synthesized.
+        With TTS_IN_MEMORY on, the TTS engine synthesizes it in memory (see `TTSInterface.synthesize`)
+        and no file is written or read back for it.
+        Otherwise, or for phrases from the TTS cache, this is an audio file like `_generate_audio_file`.
+
+        Parameters:
+        - sentence (str): The sentence to generate audio from
+        - file_name_no_ext (str): The name of the audio file without the extension, if it is a file
+        - cancel_token (CancellationToken | None): Stops the TTS engine when the turn is interrupted
+
+        Returns:
+        - str, AudioData, AudioStream or None: The path to the audio file, the audio, or None if the sentence is empty
+
+        Raises:
+        - InterruptedError: If the turn was interrupted
+        """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        streaming = self.config.get("TTS_STREAMING", False) and self.tts is not None and self.tts.can_stream
+        if not streaming and not self.config.get("TTS_IN_MEMORY", False):
+            return self._generate_audio_file(sentence, file_name_no_ext)
+
+        sentence = self._prepare_tts_text(sentence)
+        if sentence is None:
+            return None
+
+        cache_key = None
+        if self.tts_cache is not None:
+            cache_key = self._tts_cache_key(sentence)
+            filepath = self.tts_cache.get(cache_key)
+            if filepath is not None:
+                if self.verbose:
+                    print(f">> TTS cache hit: {sentence}")
+                return filepath
+
+        if streaming:
+            def _cache_streamed_audio(audio: AudioData) -> None:
+                if cache_key is not None and len(audio.samples):
+                    self.tts_cache.put_audio(cache_key, audio)
+
+            return AudioStream(
+                self.tts.stream(sentence, cancel_token=cancel_token),
+                self.tts.stream_sample_rate,
+                on_complete=_cache_streamed_audio,
+                cancel_token=cancel_token,
+            )
+
+        samples, sample_rate = self.tts.synthesize(sentence, cancel_token=cancel_token)
+        audio = AudioData(to_pcm16(samples), sample_rate)
+        if len(audio.samples) == 0:
+            return None
+        if cache_key is not None:
+            self.tts_cache.put_audio(cache_key, audio)
+        return audio
+
+    def _prepare_tts_text(self, sentence: str) -> str | None:
+        """The text the TTS should speak for the sentence, or None if there is nothing to speak."""
         if not self.tts:
             return None
 
@@ -379,16 +913,31 @@ class OpenLLMVTuberMain:
 
         if sentence.strip() == "":
             return None
+        return sentence
 
-        return self.tts.generate_audio(sentence, file_name_no_ext=file_name_no_ext)
+    def _tts_cache_key(self, sentence: str) -> str:
+        tts_model = self.config.get("TTS_MODEL", "pyttsx3TTS")
+        return self.tts_cache.key(
+            f"{tts_model}:{type(self.tts).__name__}", self.config.get(tts_model, {}), sentence
+        )
 
-    def _play_audio_file(self, sentence: str | None, filepath: str | None) -> None:
+    def audio_volumes(self, filepath: str | AudioData) -> list | None:
+        """
+        Returns:
+        - list | None: The volume envelope of an audio file from `_generate_audio_file`, if the TTS cache has it,
+          in slices of TTSCache.slice_length ms. None means it has to be computed from the audio.
+        """
+        if self.tts_cache is None or not isinstance(filepath, str):
+            return None
+        return self.tts_cache.volumes_for(filepath)
+
+    def _play_audio_file(self, sentence: str | None, filepath: str | AudioData | AudioStream | None) -> None:
         """
         Play the audio file either locally or remotely using the Live2D controller if available.
 
         Parameters:
         - sentence (str): The sentence to display
-        - filepath (str): The path to the audio file. If None, no audio will be streamed.
+        - filepath (str | AudioData | AudioStream): The path to the audio file, or the audio. If None, no audio will be streamed.
         """
 
         if filepath is None:
@@ -398,9 +947,20 @@ class OpenLLMVTuberMain:
         if sentence is None:
             sentence = ""
 
+        if isinstance(filepath, AudioStream):
+            filepath = filepath.read_all()
+        if isinstance(filepath, AudioData):
+            # the local player needs a file
+            audio_path = self.tts.generate_cache_file_name(uuid.uuid4().hex, "wav")
+            with open(audio_path, "wb") as f:
+                f.write(filepath.to_wav_bytes())
+            filepath = audio_path
+
         try:
             if self.verbose:
                 print(f">> Playing {filepath}...")
+            if self.turn_trace is not None:
+                self.turn_trace.mark("first_audio")
             self.tts.play_audio_file_local(filepath)
 
             self.tts.remove_file(filepath, verbose=self.verbose)
@@ -415,16 +975,41 @@ class OpenLLMVTuberMain:
     def speak_by_sentence_chain(self, chat_completion: Iterator[str]) -> str:
         """
         Generate and play the chat completion sentences one by one using the TTS engine.
+        Up to TTS_LOOKAHEAD sentences are synthesized in parallel while the earlier ones play,
+        and they are played in order.
         Now properly handles interrupts in a multi-threaded environment using the existing _continue_exec_flag.
         """
-        task_queue = queue.Queue()
+        synthesizer = LookAheadSynthesizer(
+            self._synthesize_sentence,
+            max_ahead=self.config.get("TTS_LOOKAHEAD", 1),
+            on_discard=self._discard_audio_file,
+        )
+        # With TRANSLATE_AUDIO on, the sentences are translated in a stage of their own before the TTS
+        translation_stage = self.new_translation_stage()
+
+        turn_trace = self.turn_trace or self.tracer.start_turn(self.session_id)
+
+        # On interrupt, stop waiting for the TTS and translation jobs right away
+        cancel_token = self.cancel_token
+        unregister_cancel = [cancel_token.on_cancel(synthesizer.cancel)]
+        if translation_stage is not None:
+            unregister_cancel.append(cancel_token.on_cancel(translation_stage.cancel))
+
+        def submit_sentence(sentence: str) -> None:
+            turn_trace.mark("first_sentence")
+            if translation_stage is None:
+                synthesizer.submit(sentence)
+                return
+            tts_target_sentence = self.clean_text_for_tts(sentence)
+            translation = translation_stage.submit(tts_target_sentence) if tts_target_sentence else None
+            synthesizer.submit(sentence, translation)
         full_response = [""]  # Use a list to store the full response
         interrupted_error_event = threading.Event()
 
         def producer_worker():
+            sentence_buffer = ""
             try:
-                index = 0
-                sentence_buffer = ""
+                segmenter = self.new_sentence_segmenter()
 
                 for char in chat_completion:
                     # Validate that char is actually a string
@@ -441,117 +1026,70 @@ class OpenLLMVTuberMain:
 
                     if char:
                         print(char, end="", flush=True)
-                        sentence_buffer += char
                         full_response[0] += char
-                        if self.is_complete_sentence(sentence_buffer):
+                        for sentence_buffer in segmenter.feed(char):
                             if self.verbose:
                                 print("\n")
-                            if not self._continue_exec_flag.is_set():
-                                raise InterruptedError("Producer interrupted")
-                            
                             # Skip empty sentences
-                            if not sentence_buffer.strip():
-                                sentence_buffer = ""
-                                continue
-
-                            tts_target_sentence = sentence_buffer.strip()
-
-                            # Extra validation for tts_target_sentence
-                            if not isinstance(tts_target_sentence, str):
-                                print(f"Warning: Invalid sentence type: {type(tts_target_sentence)}")
-                                sentence_buffer = ""
-                                continue
-
-                            if self.translator and self.config.get("TRANSLATE_AUDIO", False):
-                                try:
-                                    print("Translating...")
-                                    tts_target_sentence = self.translator.translate(tts_target_sentence)
-                                    print(f"Translated: {tts_target_sentence}")
-                                except Exception as e:
-                                    print(f"Translation error: {e}")
-                                    # Continue with original text if translation fails
-                                    tts_target_sentence = sentence_buffer.strip()
-
-                            # Only generate audio if we have valid text
-                            if tts_target_sentence and isinstance(tts_target_sentence, str):
-                                try:
-                                    audio_filepath = self._generate_audio_file(
-                                        tts_target_sentence, file_name_no_ext=str(uuid.uuid4())
-                                    )
-
-                                    if not self._continue_exec_flag.is_set():
-                                        raise InterruptedError("Producer interrupted")
-                                        
-                                    if audio_filepath:  # Only queue if we got a valid filepath
-                                        audio_info = {
-                                            "sentence": sentence_buffer,
-                                            "audio_filepath": audio_filepath,
-                                        }
-                                        task_queue.put(audio_info)
-                                        index += 1
-                                except Exception as e:
-                                    print(f"Audio generation error: {e}")
-                            
-                            sentence_buffer = ""
+                            if sentence_buffer.strip():
+                                submit_sentence(sentence_buffer)
+
+                # the LLM stream ends early when the interrupt closes it
+                if not self._continue_exec_flag.is_set():
+                    raise InterruptedError("Producer interrupted")
 
                 # Handle any remaining text in the buffer
-                if sentence_buffer and sentence_buffer.strip():
-                    if not self._continue_exec_flag.is_set():
-                        raise InterruptedError("Producer interrupted")
+                sentence_buffer = segmenter.flush()
+                if sentence_buffer.strip():
                     print("\n")
-                    audio_filepath = self._generate_audio_file(
-                        sentence_buffer, file_name_no_ext=str(uuid.uuid4())
-                    )
-                    audio_info = {
-                        "sentence": sentence_buffer,
-                        "audio_filepath": audio_filepath,
-                    }
-                    task_queue.put(audio_info)
+                    submit_sentence(sentence_buffer)
 
             except InterruptedError:
                 print("\nProducer interrupted")
                 interrupted_error_event.set()
-                return
+                synthesizer.cancel()
+                if translation_stage is not None:
+                    translation_stage.cancel()
             except Exception as e:
                 print(f"Producer error: {str(e)}")
                 print(f"Failed sentence: '{sentence_buffer}'")
                 interrupted_error_event.set()
-                return
+                synthesizer.cancel()
+                if translation_stage is not None:
+                    translation_stage.cancel()
             finally:
-                task_queue.put(None)  # Signal end of production
+                if translation_stage is not None:
+                    translation_stage.close()
+                synthesizer.finish()  # Signal end of production
 
         def consumer_worker():
             self.heard_sentence = ""
-
-            while True:
-
-                try:
+            try:
+                for sentence, audio_filepath in synthesizer.results(
+                    should_stop=lambda: not self._continue_exec_flag.is_set()
+                ):
                     if not self._continue_exec_flag.is_set():
+                        self._discard_audio_file(audio_filepath)
                         raise InterruptedError("😱Consumer interrupted")
-
-                    audio_info = task_queue.get(
-                        timeout=0.1
-                    )  # Short timeout to check for interrupts
-                    if audio_info is None:
-                        break  # End of production
-                    if audio_info:
-                        self.heard_sentence += audio_info["sentence"]
+                    if audio_filepath is None:
+                        continue
+                    self.heard_sentence += sentence
+                    try:
                         self._play_audio_file(
-                            sentence=audio_info["sentence"],
-                            filepath=audio_info["audio_filepath"],
+                            sentence=sentence,
+                            filepath=audio_filepath,
                         )
-                    task_queue.task_done()
-                except queue.Empty:
-                    continue  # No item available, continue checking for interrupts
-                except InterruptedError as e:
-                    print(f"\n{str(e)}, stopping worker threads")
-                    interrupted_error_event.set()
-                    return  # Exit the function
-                except Exception as e:
-                    print(
-                        f"Consumer error: Error playing sentence '{audio_info['sentence']}'.\n {e}"
-                    )
-                    continue
+                    except Exception as e:
+                        print(f"Consumer error: Error playing sentence '{sentence}'.\n {e}")
+                # the results end early when the interrupt cancels the synthesizer
+                if not self._continue_exec_flag.is_set():
+                    raise InterruptedError("😱Consumer interrupted")
+            except InterruptedError as e:
+                print(f"\n{str(e)}, stopping worker threads")
+                interrupted_error_event.set()
+                synthesizer.cancel()
+                if translation_stage is not None:
+                    translation_stage.cancel()
 
         producer_thread = threading.Thread(target=producer_worker)
         consumer_thread = threading.Thread(target=consumer_worker)
@@ -561,6 +1099,9 @@ class OpenLLMVTuberMain:
 
         producer_thread.join()
         consumer_thread.join()
+        synthesizer.close()
+        for unregister in unregister_cancel:
+            unregister()
 
         if interrupted_error_event.is_set():
             self._interrupt_post_processing()
@@ -571,6 +1112,71 @@ class OpenLLMVTuberMain:
         print("\n\n --- Audio generation and playback completed ---")
         return full_response[0]
 
+    def _synthesize_sentence(
+        self, sentence: str, translation: Future | None = None
+    ) -> str | AudioData | AudioStream | None:
+        """
+        Turn one sentence of the response into audio: remove the action text, translate it
+        if TRANSLATE_AUDIO is on, then run the TTS. Runs on the look-ahead TTS workers.
+
+        Parameters:
+        - sentence (str): The sentence as it is displayed
+        - translation (Future | None): The translation of the sentence from the TranslationStage, if it
+          was submitted to one. Otherwise the sentence is translated here.
+
+        Returns:
+        - str, AudioData, AudioStream or None: The path to the audio file or the audio, or None if there is nothing to speak
+        """
+        tts_target_sentence = self.clean_text_for_tts(sentence)
+        if not tts_target_sentence:
+            return None
+
+        if translation is not None:
+            try:
+                tts_target_sentence = translation.result()
+                print(f"Translated: {tts_target_sentence}")
+            except CancelledError:
+                return None
+        elif self.translator and self.config.get("TRANSLATE_AUDIO", False):
+            try:
+                print("Translating...")
+                tts_target_sentence = self.translator.translate(tts_target_sentence)
+                print(f"Translated: {tts_target_sentence}")
+            except Exception as e:
+                print(f"Translation error: {e}")
+                # Continue with original text if translation fails
+
+        return self._synthesize_text(tts_target_sentence)
+
+    def _synthesize_text(self, tts_target_sentence: str) -> str | AudioData | AudioStream | None:
+        """Run the TTS on the text to speak of one sentence, see `_generate_audio`."""
+        # every sentence gets its own file, they are synthesized at the same time
+        turn_trace = self.turn_trace or self.tracer.start_turn(self.session_id)
+        with turn_trace.span("tts_synthesis", chars=len(tts_target_sentence)):
+            return self._generate_audio(
+                tts_target_sentence,
+                file_name_no_ext=str(uuid.uuid4()),
+                cancel_token=self.cancel_token,
+            )
+
+    def _discard_audio_file(self, filepath: str | AudioData | AudioStream | None) -> None:
+        """Remove an audio file that won't be played, like after an interrupt."""
+        if isinstance(filepath, AudioStream):
+            filepath.close()
+        elif isinstance(filepath, str) and self.tts:
+            self.tts.remove_file(filepath, verbose=self.verbose)
+
+    @staticmethod
+    def clean_text_for_tts(text: str) -> str:
+        """Remove action text between asterisks for TTS"""
+        # Remove text between asterisks
+        cleaned = re.sub(r'\*[^*]+\*', '', text)
+        # Remove any leftover asterisks
+        cleaned = cleaned.replace('*', '')
+        # Clean up extra spaces
+        cleaned = ' '.join(cleaned.split())
+        return cleaned
+
     def interrupt(self, heard_sentence: str = "") -> None:
         """Set the interrupt flag to stop the conversation chain.
         Preferably provide the sentences that were already shown or heard by the user before the interrupt so that the LLM can handle the memory properly.
@@ -580,6 +1186,9 @@ class OpenLLMVTuberMain:
             (because apparently the user won't know the rest of the response.)
         """
         self._continue_exec_flag.clear()
+        # close the LLM response, stop the TTS jobs and kill their processes now,
+        # instead of when the next token or audio chunk arrives
+        self.cancel_token.cancel()
         self.llm.handle_interrupt(heard_sentence)
 
     def _interrupt_post_processing(self) -> None:
@@ -597,53 +1206,19 @@ class OpenLLMVTuberMain:
         text: str
             the text to check
         """
+        return is_complete_sentence(text)
 
-        white_list = [
-            "...",
-            "Dr.",
-            "Mr.",
-            "Ms.",
-            "Mrs.",
-            "Jr.",
-            "Sr.",
-            "St.",
-            "Ave.",
-            "Rd.",
-            "Blvd.",
-            "Dept.",
-            "Univ.",
-            "Prof.",
-            "Ph.D.",
-            "M.D.",
-            "U.S.",
-            "U.K.",
-            "U.N.",
-            "E.U.",
-            "U.S.A.",
-            "U.K.",
-            "U.S.S.R.",
-            "U.A.E.",
-        ]
-
-        for item in white_list:
-            if text.strip().endswith(item):
-                return False
-
-        punctuation_blacklist = [
-            ".",
-            "?",
-            "!",
-            "。",
-            "；",
-            "？",
-            "！",
-            "…",
-            "〰",
-            "〜",
-            "～",
-            "！",
-        ]
-        return any(text.strip().endswith(punct) for punct in punctuation_blacklist)
+    def new_sentence_segmenter(self) -> SentenceSegmenter:
+        """
+        Returns:
+        - SentenceSegmenter: A segmenter for one streamed response, merging sentences shorter than MIN_SENTENCE_LENGTH.
+          With FIRST_CLAUSE_FLUSH on, the first chunk ends at the first clause break to start speaking sooner.
+        """
+        return SentenceSegmenter(
+            min_length=self.config.get("MIN_SENTENCE_LENGTH", 0),
+            first_clause=self.config.get("FIRST_CLAUSE_FLUSH", False),
+            first_clause_max_words=self.config.get("FIRST_CLAUSE_MAX_WORDS", 8),
+        )
 
     def clean_cache(self):
         cache_dir = "./cache"
@@ -665,11 +1240,25 @@ class OpenLLMVTuberMain:
         self.config.update(new_config)
 
         # Reinitialize components with the new configuration
+        self.release_engines()
+        self.close_llms()
         self.live2d = self.init_live2d()
         self.asr = self.init_asr()
         self.tts = self.init_tts()
+        self.tts_cache = self.init_tts_cache()
         self.translator = self.init_translator()
         self.llm = self.init_llm()
+        self.speculative = self.init_speculative()
+
+    def new_translation_stage(self) -> TranslationStage | None:
+        """
+        Returns:
+        - TranslationStage or None: A translation stage for the sentences of one response (TRANSLATE_MAX_BATCH
+          sentences per request at most), or None if TRANSLATE_AUDIO is off.
+        """
+        if not self.translator or not self.config.get("TRANSLATE_AUDIO", False):
+            return None
+        return TranslationStage(self.translator, max_batch=self.config.get("TRANSLATE_MAX_BATCH", 8))
 
     def init_translator(self) -> TranslateInterface | None:
         """
@@ -680,12 +1269,7 @@ class OpenLLMVTuberMain:
         """
         if self.config.get("TRANSLATE_AUDIO", False):
             try:
-                translate_provider = self.config.get("TRANSLATE_PROVIDER", "DeepLX")
-                translator = TranslateFactory.get_translator(
-                    translate_provider=translate_provider,
-                    **self.config.get(translate_provider, {}),
-                )
-                return translator
+                return self._load_engine(*self._translator_engine_spec(self.config))
             except Exception as e:
                 print(f"Error initializing Translator: {e}")
                 print("Proceed without Translator.")
@@ -1,5 +1,13 @@
+import asyncio
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
 from enum import Enum
-from typing import Dict, Any, Tuple
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+from loguru import logger
 
 class MessageIntent(Enum):
     CRYPTO_TIP = "crypto_tip"
@@ -7,22 +15,293 @@ class MessageIntent(Enum):
     GENERAL_CHAT = "general_chat"
     TECHNICAL_SUPPORT = "technical_support"
 
-async def classify_message(message: str, llm_client: Any) -> Tuple[MessageIntent, float]:
+
+IR_CATEGORIES = ["tokenomics", "fundraising", "business_model", "partnerships"]
+
+
+class IntentResult(NamedTuple):
+    intent: MessageIntent
+    confidence: float
+    ir_category: str | None  # one of IR_CATEGORIES for investor relations, else None
+    source: str  # "rule", "model" or "llm"
+
+
+# Labelled examples the nearest-centroid model is trained on: (text, intent, IR category)
+TRAINING_EXAMPLES: List[Tuple[str, MessageIntent, str | None]] = [
+    ("what are the tokenomics", MessageIntent.INVESTOR_RELATIONS, "tokenomics"),
+    ("what is the total supply of the token", MessageIntent.INVESTOR_RELATIONS, "tokenomics"),
+    ("how is the token distributed", MessageIntent.INVESTOR_RELATIONS, "tokenomics"),
+    ("what's the fdv and circulating supply", MessageIntent.INVESTOR_RELATIONS, "tokenomics"),
+    ("is there a vesting schedule for the team tokens", MessageIntent.INVESTOR_RELATIONS, "tokenomics"),
+    ("what is the market cap", MessageIntent.INVESTOR_RELATIONS, "tokenomics"),
+    ("where can i trade the token, which trading pairs and how much liquidity", MessageIntent.INVESTOR_RELATIONS, "tokenomics"),
+    ("when is the token launch", MessageIntent.INVESTOR_RELATIONS, "tokenomics"),
+    ("are you raising money", MessageIntent.INVESTOR_RELATIONS, "fundraising"),
+    ("how can i invest in the project", MessageIntent.INVESTOR_RELATIONS, "fundraising"),
+    ("is there a seed round or private sale", MessageIntent.INVESTOR_RELATIONS, "fundraising"),
+    ("who are your investors and vcs", MessageIntent.INVESTOR_RELATIONS, "fundraising"),
+    ("what valuation are you raising at", MessageIntent.INVESTOR_RELATIONS, "fundraising"),
+    ("can i get into the presale or whitelist", MessageIntent.INVESTOR_RELATIONS, "fundraising"),
+    ("how does the project make money", MessageIntent.INVESTOR_RELATIONS, "business_model"),
+    ("what is your business model", MessageIntent.INVESTOR_RELATIONS, "business_model"),
+    ("what is the roadmap of the project", MessageIntent.INVESTOR_RELATIONS, "business_model"),
+    ("where does the revenue come from", MessageIntent.INVESTOR_RELATIONS, "business_model"),
+    ("what is the utility of the token", MessageIntent.INVESTOR_RELATIONS, "business_model"),
+    ("who are you partnering with", MessageIntent.INVESTOR_RELATIONS, "partnerships"),
+    ("any partnerships coming up", MessageIntent.INVESTOR_RELATIONS, "partnerships"),
+    ("are you working with any exchanges or other projects", MessageIntent.INVESTOR_RELATIONS, "partnerships"),
+    ("will you get listed on binance or coinbase", MessageIntent.INVESTOR_RELATIONS, "partnerships"),
+    ("the stream is lagging", MessageIntent.TECHNICAL_SUPPORT, None),
+    ("i can't hear any audio", MessageIntent.TECHNICAL_SUPPORT, None),
+    ("my wallet won't connect", MessageIntent.TECHNICAL_SUPPORT, None),
+    ("how do i send a tip", MessageIntent.TECHNICAL_SUPPORT, None),
+    ("the transaction failed, is there a bug", MessageIntent.TECHNICAL_SUPPORT, None),
+    ("the page is not loading, how do i fix it", MessageIntent.TECHNICAL_SUPPORT, None),
+    ("the microphone isn't working", MessageIntent.TECHNICAL_SUPPORT, None),
+    ("error when i try to log in", MessageIntent.TECHNICAL_SUPPORT, None),
+    ("the video keeps freezing", MessageIntent.TECHNICAL_SUPPORT, None),
+    ("the sound is cutting out", MessageIntent.TECHNICAL_SUPPORT, None),
+    ("the avatar stopped moving", MessageIntent.TECHNICAL_SUPPORT, None),
+    ("hi", MessageIntent.GENERAL_CHAT, None),
+    ("hello how are you today", MessageIntent.GENERAL_CHAT, None),
+    ("good morning", MessageIntent.GENERAL_CHAT, None),
+    ("what's your favorite food", MessageIntent.GENERAL_CHAT, None),
+    ("you are so cute", MessageIntent.GENERAL_CHAT, None),
+    ("tell me a joke", MessageIntent.GENERAL_CHAT, None),
+    ("what did you do today", MessageIntent.GENERAL_CHAT, None),
+    ("i love your stream", MessageIntent.GENERAL_CHAT, None),
+    ("do you like anime", MessageIntent.GENERAL_CHAT, None),
+    ("good night, see you tomorrow", MessageIntent.GENERAL_CHAT, None),
+    ("what's up", MessageIntent.GENERAL_CHAT, None),
+    ("what is your name", MessageIntent.GENERAL_CHAT, None),
+    ("who are you", MessageIntent.GENERAL_CHAT, None),
+    ("how is your day going", MessageIntent.GENERAL_CHAT, None),
+    ("what's the weather like where you are", MessageIntent.GENERAL_CHAT, None),
+    ("how old are you", MessageIntent.GENERAL_CHAT, None),
+    ("where are you from", MessageIntent.GENERAL_CHAT, None),
+    ("what games do you play", MessageIntent.GENERAL_CHAT, None),
+    ("can you sing a song for me", MessageIntent.GENERAL_CHAT, None),
+    ("thank you so much", MessageIntent.GENERAL_CHAT, None),
+    ("lol that's so funny", MessageIntent.GENERAL_CHAT, None),
+    ("i'm bored, let's talk", MessageIntent.GENERAL_CHAT, None),
+    ("what kind of music do you like", MessageIntent.GENERAL_CHAT, None),
+    ("do you have any pets", MessageIntent.GENERAL_CHAT, None),
+    ("what are your hobbies", MessageIntent.GENERAL_CHAT, None),
+]
+
+# Words too common to tell the intents apart. Negations are kept ("can't hear" is a support request).
+STOPWORDS = frozenset(
+    """
+    a about am an and any are as at be been but by can could did do does for from get got had has have
+    he her here him his how i i'm if in is it it's its just me my of on or our she so some than that
+    that's the their them then there they this those to too us very was we were what what's when
+    where which who why will with would you you're your yours
+    """.split()
+)
+
+# Keyword rules checked before the model: (pattern, intent, IR category, confidence)
+KEYWORD_RULES: List[Tuple[re.Pattern, MessageIntent, str | None, float]] = [
+    (re.compile(r"\b(tokenomics?|fdv|circulating supply|total supply|vesting|market ?cap)\b"), MessageIntent.INVESTOR_RELATIONS, "tokenomics", 0.95),
+    (re.compile(r"\b(seed round|private sale|presale|pre-sale|fundrais\w*|valuation)\b"), MessageIntent.INVESTOR_RELATIONS, "fundraising", 0.95),
+    (re.compile(r"\b(business model|revenue model|roadmap)\b"), MessageIntent.INVESTOR_RELATIONS, "business_model", 0.9),
+    (re.compile(r"\b(partnerships?|partnering|partnered)\b"), MessageIntent.INVESTOR_RELATIONS, "partnerships", 0.9),
+]
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, collapse whitespace and strip surrounding punctuation. Used as the cache key."""
+    return " ".join(message.lower().split()).strip(" .,!?~")
+
+
+def _tokenize(text: str) -> List[str]:
+    # the words and the pairs of neighbouring words, without stopwords and pairs of stopwords
+    words = re.findall(r"[a-z0-9$']+", text.lower())
+    return [word for word in words if word not in STOPWORDS] + [
+        f"{a} {b}" for a, b in zip(words, words[1:]) if a not in STOPWORDS or b not in STOPWORDS
+    ]
+
+
+class IntentClassifier:
+    """
+    In-process intent classifier: keyword rules first, then a TF-IDF nearest-centroid model
+    trained from labelled examples. Every (intent, IR category) label has one centroid. The
+    confidence is a softmax over the best cosine similarity of each intent, and the IR category
+    is the closest centroid of the chosen intent.
+
+    Results are cached by normalized message text.
+    """
+
+    def __init__(
+        self,
+        examples: List[Tuple[str, MessageIntent, str | None]] = TRAINING_EXAMPLES,
+        rules: List[Tuple[re.Pattern, MessageIntent, str | None, float]] = KEYWORD_RULES,
+        temperature: float = 0.1,
+        min_similarity: float = 0.1,
+        cache_size: int = 4096,
+    ):
+        """
+        Parameters:
+        - examples (list): (text, intent, IR category) training examples.
+        - rules (list): (compiled pattern, intent, IR category, confidence) keyword rules.
+        - temperature (float): Softmax temperature of the similarities. Lower is more confident.
+        - min_similarity (float): Cosine similarity to the closest example below which the message is
+          unknown: general chat with a confidence of 0.
+        - cache_size (int): Number of normalized messages to keep results for.
+        """
+        self.rules = rules
+        self.temperature = temperature
+        self.min_similarity = min_similarity
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, IntentResult]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._train(examples)
+
+    def _train(self, examples: List[Tuple[str, MessageIntent, str | None]]) -> None:
+        documents = [Counter(_tokenize(text)) for text, _, _ in examples]
+        document_frequency = Counter(term for document in documents for term in document)
+        self._vocabulary: Dict[str, int] = {term: i for i, term in enumerate(document_frequency)}
+        self._idf = np.array(
+            [
+                math.log((1 + len(documents)) / (1 + document_frequency[term])) + 1
+                for term in self._vocabulary
+            ],
+            dtype=np.float32,
+        )
+
+        self._labels: List[Tuple[MessageIntent, str | None]] = []
+        centroids = []
+        for (_, intent, category), document in zip(examples, documents):
+            label = (intent, category)
+            if label not in self._labels:
+                self._labels.append(label)
+                centroids.append(np.zeros(len(self._vocabulary), dtype=np.float32))
+            centroids[self._labels.index(label)] += self._vectorize(document)
+        self._centroids = np.stack(centroids)
+        self._centroids /= np.linalg.norm(self._centroids, axis=1, keepdims=True)
+        self._label_indices_by_intent: Dict[MessageIntent, List[int]] = {}
+        for index, (intent, _) in enumerate(self._labels):
+            self._label_indices_by_intent.setdefault(intent, []).append(index)
+
+    def _vectorize(self, document: Counter) -> np.ndarray:
+        vector = np.zeros(len(self._vocabulary), dtype=np.float32)
+        for term, count in document.items():
+            index = self._vocabulary.get(term)
+            if index is not None:
+                vector[index] = (1 + math.log(count)) * self._idf[index]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def classify(self, message: str) -> IntentResult:
+        """
+        Classify a message locally.
+
+        Parameters:
+        - message (str): The chat message.
+
+        Returns:
+        - IntentResult: The intent, its confidence, the IR category and where the result came from.
+        """
+        key = normalize_message(message)
+        cached = self.get_cached(key)
+        if cached is not None:
+            return cached
+
+        for pattern, intent, category, confidence in self.rules:
+            if pattern.search(key):
+                return self.put_cached(key, IntentResult(intent, confidence, category, "rule"))
+
+        similarities = self._centroids @ self._vectorize(Counter(_tokenize(key)))
+        best = int(np.argmax(similarities))
+        intent, category = self._labels[best]
+        if similarities[best] < self.min_similarity:
+            # too far from every example to tell
+            return self.put_cached(key, IntentResult(MessageIntent.GENERAL_CHAT, 0.0, None, "model"))
+
+        intent_similarities = np.array(
+            [similarities[indices].max() for indices in self._label_indices_by_intent.values()]
+        )
+        weights = np.exp((intent_similarities - intent_similarities.max()) / self.temperature)
+        confidence = float(weights.max() / weights.sum())
+        return self.put_cached(key, IntentResult(intent, confidence, category, "model"))
+
+    def get_cached(self, key: str) -> IntentResult | None:
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+            return result
+
+    def put_cached(self, key: str, result: IntentResult) -> IntentResult:
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+
+_default_classifier: IntentClassifier | None = None
+
+
+def get_classifier() -> IntentClassifier:
+    """The process-wide classifier, trained on first use."""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = IntentClassifier()
+    return _default_classifier
+
+
+def _parse_llm_classification(response: str) -> IntentResult:
+    category, confidence = response.strip().split("|")[:2]
+    category = category.strip().lower()
+    intent_name, _, ir_category = category.partition(":")
+    intent = MessageIntent(intent_name.strip())
+    ir_category = ir_category.strip() or None
+    if intent != MessageIntent.INVESTOR_RELATIONS or ir_category not in IR_CATEGORIES:
+        ir_category = "business_model" if intent == MessageIntent.INVESTOR_RELATIONS else None
+    return IntentResult(intent, float(confidence), ir_category, "llm")
+
+
+async def classify_message(
+    message: str,
+    llm_fallback: Callable[[str], str] | None = None,
+    threshold: float = 0.6,
+) -> IntentResult:
     """
-    Classify incoming message intent using the LLM.
-    Returns tuple of (intent, confidence_score)
+    Classify incoming message intent. The local classifier answers first, the LLM is only asked
+    when the local confidence is below `threshold`.
+
+    Parameters:
+    - message (str): The chat message.
+    - llm_fallback (Callable[[str], str] | None): A blocking function that sends a one-off prompt to the LLM
+      and returns its answer, like `OpenLLMVTuberMain.ask_llm_once`. None to never ask the LLM.
+    - threshold (float): Local confidence below which the LLM is asked.
+
+    Returns:
+    - IntentResult: (intent, confidence, ir_category, source)
     """
+    classifier = get_classifier()
+    result = classifier.classify(message)
+    if result.confidence >= threshold or llm_fallback is None:
+        return result
+
     classification_prompt = f"""
     Classify the following message into one of these categories:
-    - INVESTOR_RELATIONS: Questions about token metrics, market cap, trading pairs, liquidity, or project roadmap
-    - TECHNICAL_SUPPORT: Technical issues or how-to questions
-    - GENERAL_CHAT: General conversation or greetings
-    
+    - investor_relations: Questions about token metrics, market cap, trading pairs, liquidity, or project roadmap
+    - technical_support: Technical issues or how-to questions
+    - general_chat: General conversation or greetings
+
+    For investor_relations, add the topic after a colon: one of {', '.join(IR_CATEGORIES)}
+    (like investor_relations:tokenomics).
+
     Message: {message}
-    
+
     Respond with only the category name and confidence score (0-1), separated by |
     """
-    
-    response = await llm_client.generate(classification_prompt)
-    category, confidence = response.strip().split("|")
-    return MessageIntent(category.strip()), float(confidence) 
\ No newline at end of file
+    try:
+        response = await asyncio.to_thread(llm_fallback, classification_prompt)
+        llm_result = _parse_llm_classification(response)
+    except Exception as e:
+        logger.warning(f"LLM intent classification failed, using the local result: {e}")
+        return result
+    return classifier.put_cached(normalize_message(message), llm_result)
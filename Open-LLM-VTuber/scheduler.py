@@ -0,0 +1,244 @@
+import asyncio
+import functools
+import itertools
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, Iterable
+
+from loguru import logger
+
+
+class TurnPriority(IntEnum):
+    """Classes of conversation turns. Lower values are served first."""
+
+    VOICE = 0
+    TIP = 1
+    CHAT = 2
+
+
+class TurnRejected(Exception):
+    """Raised when a turn is shed because the queue of its class is full."""
+
+
+class _Turn:
+    def __init__(self, priority: TurnPriority, session_id: str, seq: int, started: asyncio.Future):
+        self.priority = priority
+        self.session_id = session_id
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.started = started  # resolved when the turn gets a worker
+
+
+class _ClassStats:
+    def __init__(self, recent: int):
+        self.queued = 0
+        self.started = 0
+        self.shed = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=recent)
+
+    def snapshot(self) -> dict:
+        return {
+            "queued": self.queued,
+            "started": self.started,
+            "shed": self.shed,
+            "wait_sum": self.wait_sum,
+            "wait_max": self.wait_max,
+            "recent_waits": list(self.recent_waits),
+        }
+
+
+class TurnScheduler:
+    """
+    Admission control for conversation turns (`conversation_chain` calls) of all sessions.
+
+    At most `max_workers` turns run at the same time. Waiting turns are started by priority
+    (voice > tip > chat), then in arrival order. Turns of the same session run one at a time and
+    in the order they were submitted, so they never touch the session's LLM memory concurrently.
+    When the queue of a class is full, new turns of that class are shed with `TurnRejected`.
+
+    All methods must be called from the event loop. Blocking turns run in threads, coroutine
+    functions (like `OpenLLMVTuberMain.aconversation_chain`) run on the event loop.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queue_depth: Dict[TurnPriority, int] | None = None,
+        recent_waits: int = 1000,
+    ):
+        """
+        Parameters:
+        - max_workers (int): Number of turns that can run at the same time.
+        - max_queue_depth (Dict[TurnPriority, int] | None): Number of turns of each class that can wait.
+          Defaults to 16 voice, 32 tip and 64 chat turns.
+        - recent_waits (int): Number of recent queue waits per class the percentiles are computed on.
+        """
+        self.max_workers = max_workers
+        self.max_queue_depth = {
+            TurnPriority.VOICE: 16,
+            TurnPriority.TIP: 32,
+            TurnPriority.CHAT: 64,
+        }
+        self.max_queue_depth.update(max_queue_depth or {})
+        self._pending: Dict[str, Deque[_Turn]] = {}  # session id -> turns waiting, in order
+        self._running: Dict[str, _Turn] = {}  # session id -> its running turn
+        self._seq = itertools.count()
+        self._stats = {priority: _ClassStats(recent_waits) for priority in TurnPriority}
+
+    async def run(
+        self,
+        priority: TurnPriority,
+        session_id: str,
+        func: Callable[..., Any],
+        *args,
+        **kwargs,
+    ) -> Any:
+        """
+        Wait for a worker, then run `func(*args, **kwargs)` and return its result. A blocking function
+        runs in a thread, a coroutine function is awaited.
+
+        Parameters:
+        - priority (TurnPriority): The class of the turn.
+        - session_id (str): The session the turn belongs to.
+        - func (Callable): The function to run, like `OpenLLMVTuberMain.conversation_chain` or
+          `OpenLLMVTuberMain.aconversation_chain`.
+
+        Raises:
+        - TurnRejected: If the queue of the class is full.
+        """
+        stats = self._stats[priority]
+        if stats.queued >= self.max_queue_depth[priority]:
+            stats.shed += 1
+            logger.warning(f"Shedding {priority.name.lower()} turn of session {session_id}: queue full")
+            raise TurnRejected(f"Too many {priority.name.lower()} turns waiting")
+
+        loop = asyncio.get_running_loop()
+        turn = _Turn(priority, session_id, next(self._seq), loop.create_future())
+        self._pending.setdefault(session_id, deque()).append(turn)
+        stats.queued += 1
+        self._dispatch()
+
+        try:
+            await turn.started
+        except asyncio.CancelledError:
+            if turn.started.done() and not turn.started.cancelled():
+                # got the worker just as it was cancelled
+                self._release(turn)
+            else:
+                self._remove_pending(turn)
+            raise
+
+        wait = time.monotonic() - turn.enqueued_at
+        stats.started += 1
+        stats.wait_sum += wait
+        stats.wait_max = max(stats.wait_max, wait)
+        stats.recent_waits.append(wait)
+
+        if asyncio.iscoroutinefunction(func):
+            # cancelling the caller cancels the turn itself, the worker is free right away
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self._release(turn)
+
+        work = loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+        try:
+            return await asyncio.shield(work)
+        except asyncio.CancelledError:
+            # the thread can't be stopped, keep the worker busy until it is done
+            work.add_done_callback(lambda _: self._release(turn))
+            raise
+        finally:
+            if work.done():
+                self._release(turn)
+
+    def stats(self, others: Iterable[dict] = ()) -> dict:
+        """
+        Parameters:
+        - others (Iterable[dict]): Snapshots of the schedulers of the other worker processes (see
+          `snapshot`), merged with this one.
+
+        Returns:
+        - dict: The number of schedulers (`workers`), their workers and running turns, and for every
+          class the queue depth, started and shed turns and the queue wait (average, p50, p95, max) in seconds.
+        """
+        snapshots = [self.snapshot(), *others]
+        classes = {}
+        for priority in TurnPriority:
+            name = priority.name.lower()
+            merged = [snapshot["classes"][name] for snapshot in snapshots]
+            started = sum(stats["started"] for stats in merged)
+            waits = sorted(wait for stats in merged for wait in stats["recent_waits"])
+
+            def percentile(p: float) -> float:
+                return waits[min(len(waits) - 1, int(len(waits) * p))] if waits else 0.0
+
+            classes[name] = {
+                "queued": sum(stats["queued"] for stats in merged),
+                "started": started,
+                "shed": sum(stats["shed"] for stats in merged),
+                "wait_avg": sum(stats["wait_sum"] for stats in merged) / started if started else 0.0,
+                "wait_p50": percentile(0.5),
+                "wait_p95": percentile(0.95),
+                "wait_max": max(stats["wait_max"] for stats in merged),
+            }
+        return {
+            "workers": len(snapshots),
+            "max_workers": sum(snapshot["max_workers"] for snapshot in snapshots),
+            "running": sum(snapshot["running"] for snapshot in snapshots),
+            "classes": classes,
+        }
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+        - dict: The counters and recent queue waits, JSON serializable, to merge into the `stats` of
+          another worker process.
+        """
+        return {
+            "max_workers": self.max_workers,
+            "running": len(self._running),
+            "classes": {
+                priority.name.lower(): stats.snapshot() for priority, stats in self._stats.items()
+            },
+        }
+
+    def _dispatch(self) -> None:
+        while len(self._running) < self.max_workers:
+            for session_id in list(self._pending):
+                turns = self._pending[session_id]
+                while turns and turns[0].started.done():
+                    # cancelled, but its task hasn't run yet to remove it
+                    self._stats[turns.popleft().priority].queued -= 1
+                if not turns:
+                    del self._pending[session_id]
+            candidates = [
+                turns[0]
+                for session_id, turns in self._pending.items()
+                if turns and session_id not in self._running
+            ]
+            if not candidates:
+                return
+            turn = min(candidates, key=lambda t: (t.priority, t.seq))
+            self._pending[turn.session_id].popleft()
+            if not self._pending[turn.session_id]:
+                del self._pending[turn.session_id]
+            self._stats[turn.priority].queued -= 1
+            self._running[turn.session_id] = turn
+            turn.started.set_result(None)
+
+    def _remove_pending(self, turn: _Turn) -> None:
+        turns = self._pending.get(turn.session_id)
+        if turns is not None and turn in turns:
+            turns.remove(turn)
+            if not turns:
+                del self._pending[turn.session_id]
+            self._stats[turn.priority].queued -= 1
+
+    def _release(self, turn: _Turn) -> None:
+        if self._running.get(turn.session_id) is turn:
+            del self._running[turn.session_id]
+            self._dispatch()
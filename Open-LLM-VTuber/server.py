@@ -3,19 +3,36 @@ import re
 import shutil
 import atexit
 import json
+import signal
 import asyncio
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from typing import List, Dict
 import yaml
 import numpy as np
 from fastapi import FastAPI, WebSocket, APIRouter
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.websockets import WebSocketDisconnect
 from main import OpenLLMVTuberMain
 from live2d_model import Live2dModel
 from tts.stream_audio import AudioPayloadPreparer
+from tts.tts_interface import AudioData, AudioStream
+from asr.audio_buffer import AudioChunkBuffer, MIC_AUDIO_FORMATS, pcm_bytes_to_float32
+from llm.http_pool import aclose_async_http_clients
+from llm.mem0_store import close_write_queues
+from utils.async_bridge import iterate_in_executor
+from utils.engine_pool import EnginePool
+from utils.journal import JournalWriter
+from utils.tracing import Tracer, TurnTrace
+from utils.worker_stats import WorkerStats
+from ws_session import OutboundMessage, WebSocketSession
+from event_hub import EventHub
+from scheduler import TurnPriority, TurnRejected, TurnScheduler
 import chardet
 from loguru import logger
-import redis.asyncio as aioredis
 from decimal import Decimal
 from prompts.crypto_reactions import get_token_specific_reactions, format_tip_response
 from prompts.intent_classifier import classify_message, MessageIntent
@@ -32,94 +49,300 @@ class WebSocketServer:
         router (APIRouter): APIRouter instance for routing.
         connected_clients (List[WebSocket]): List of connected WebSocket clients for "/client-ws".
         server_ws_clients (List[WebSocket]): List of connected WebSocket clients for "/server-ws".
+        engine_pool (EnginePool): Process-wide pool of the ASR, TTS and translator engines shared by all sessions.
+        event_hub (EventHub): The Redis subscriber that hands tips and chat events to the sessions.
+        scheduler (TurnScheduler): Admission control and priorities for the conversation turns of all sessions.
+        tracer (Tracer): Latency of the stages of the conversation turns of all sessions, served on /metrics.
+        worker_stats (WorkerStats | None): With several workers, where the workers share the stats of their
+            tracer and scheduler, so /metrics and /scheduler-stats cover all of them. None with one worker.
+        executor (ThreadPoolExecutor): The default executor of the event loop, shared by the blocking engine
+            calls of all sessions (ASR, TTS, sync LLM clients...). BLOCKING_WORKERS threads.
     """
 
+    # Most seconds the shutdown waits for the turns still queued for mem0
+    SHUTDOWN_DRAIN_TIMEOUT = 30.0
+
     def __init__(self, open_llm_vtuber_main_config: Dict | None = None):
         """
         Initializes the WebSocketServer with the given configuration.
         """
-        self.app = FastAPI()
+        self.app = FastAPI(lifespan=self._lifespan)
         self.router = APIRouter()
         self.new_connected_clients: List[WebSocket] = []
         self.connected_clients: List[WebSocket] = []
         self.server_ws_clients: List[WebSocket] = []
         self.open_llm_vtuber_main_config: Dict | None = open_llm_vtuber_main_config
-        self.redis_client = None
-        self.tip_reaction_task = None
-        
+        self.engine_pool = EnginePool()
+        self.event_hub = EventHub(
+            redis_url=(open_llm_vtuber_main_config or {}).get(
+                "REDIS_URL", "redis://redis:6379"
+            )
+        )
+        self.scheduler = self._create_scheduler(open_llm_vtuber_main_config or {})
+        self.tracer = Tracer(jsonl_path=(open_llm_vtuber_main_config or {}).get("TRACE_JSONL"))
+        self.worker_stats: WorkerStats | None = None  # set by _run_workers
+        self.journal_writer = JournalWriter(
+            fsync_interval=(open_llm_vtuber_main_config or {}).get("MEMORY_JOURNAL_FSYNC_INTERVAL", 0.2)
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=(open_llm_vtuber_main_config or {}).get("BLOCKING_WORKERS", 32),
+            thread_name_prefix="blocking",
+        )
+
         self._setup_routes()
         self._mount_static_files()
         self.app.include_router(self.router)
 
     def _initialize_components(
-        self, websocket: WebSocket
+        self, session: WebSocketSession, config: Dict, audio_output: str = "json"
     ) -> tuple[Live2dModel, OpenLLMVTuberMain, AudioPayloadPreparer]:
         """
-        Initialize or reinitialize all necessary components with current configuration.
+        Initialize or reinitialize all necessary components with the given configuration.
+        The heavy engines (ASR, TTS, translator) are borrowed from the shared engine pool,
+        so call `close()` on the returned OpenLLMVTuberMain once the session is done with it.
 
         Args:
-            websocket: The WebSocket connection to send messages through
+            session: The session of the WebSocket connection to send messages through
+            config: The configuration of this session
+            audio_output: How the audio is sent to the client. "json" sends one JSON message
+                with the base64 audio in it, "binary" sends a JSON header followed by binary PCM frames.
 
         Returns:
             tuple: (Live2dModel instance, OpenLLMVTuberMain instance, AudioPayloadPreparer instance)
         """
-        l2d = Live2dModel(self.open_llm_vtuber_main_config["LIVE2D_MODEL"])
-        open_llm_vtuber = OpenLLMVTuberMain(self.open_llm_vtuber_main_config)
+        l2d = Live2dModel(config["LIVE2D_MODEL"])
+        open_llm_vtuber = OpenLLMVTuberMain(
+            config,
+            engine_pool=self.engine_pool,
+            tracer=self.tracer,
+            session_id=session.session_id,
+            journal_writer=self.journal_writer,
+            resumable=session.resumable,
+        )
         audio_preparer = AudioPayloadPreparer()
 
+        def _trace_send(turn_trace: TurnTrace | None):
+            # the sender task reports when the audio of a sentence actually went out
+            if turn_trace is None:
+                return None
+
+            def _on_sent(start: float, end: float) -> None:
+                turn_trace.record("ws_send", end - start)
+                turn_trace.mark("first_audio", at=start)
+
+            return _on_sent
+
         # Set up the audio playback function
-        def _play_audio_file(sentence: str | None, filepath: str | None) -> None:
+        def _stream_audio(sentence: str, audio: AudioStream, expression_list: list) -> None:
+            # Forward the PCM chunks while the TTS is still synthesizing the sentence.
+            # The lip sync volumes need the whole audio, they come with the end of the stream.
+            header = audio_preparer.audio_stream_header(
+                audio.sample_rate, display_text=sentence, expression_list=expression_list
+            )
+            frames = session.open_stream()
+            session.send_threadsafe(OutboundMessage([json.dumps(header)], stream=frames))
+            volumes = []
+            try:
+                for chunk in audio:
+                    frames.put_threadsafe(chunk)
+                    if open_llm_vtuber.turn_trace is not None:
+                        open_llm_vtuber.turn_trace.mark("first_audio")
+            finally:
+                streamed = audio.audio()
+                if len(streamed.samples):
+                    try:
+                        volumes = audio_preparer.compute_pcm_volumes(streamed.samples, streamed.sample_rate)
+                    except ValueError:
+                        pass  # silence
+                frames.end_threadsafe(
+                    streamed.duration,
+                    [json.dumps(audio_preparer.audio_stream_end(header["stream_id"], volumes=volumes))],
+                )
+
+        async def _astream_audio(sentence: str, audio: AudioStream, expression_list: list) -> None:
+            # `_stream_audio` for the async conversation chain
+            header = audio_preparer.audio_stream_header(
+                audio.sample_rate, display_text=sentence, expression_list=expression_list
+            )
+            frames = session.open_stream()
+            await session.send(OutboundMessage([json.dumps(header)], stream=frames))
+            volumes = []
+            try:
+                async for chunk in iterate_in_executor(audio):
+                    frames.put(chunk)
+                    if open_llm_vtuber.turn_trace is not None:
+                        open_llm_vtuber.turn_trace.mark("first_audio")
+            finally:
+                streamed = audio.audio()
+                if len(streamed.samples):
+                    try:
+                        volumes = audio_preparer.compute_pcm_volumes(streamed.samples, streamed.sample_rate)
+                    except ValueError:
+                        pass  # silence
+                frames.end(
+                    streamed.duration,
+                    [json.dumps(audio_preparer.audio_stream_end(header["stream_id"], volumes=volumes))],
+                )
+
+        def _audio_message(
+            sentence: str, filepath: str | AudioData, expression_list: list
+        ) -> OutboundMessage:
+            # The payload is prepared off the event loop (on the conversation worker thread, or the
+            # executor for the async chain), then the session's sender task paces it on the loop.
+            turn_trace = open_llm_vtuber.turn_trace
+            prepare_start = time.perf_counter()
+            if isinstance(filepath, AudioData):
+                # synthesized in memory (TTS_IN_MEMORY), nothing to read from disk
+                print(f">> Playing {filepath.duration:.2f}s of audio...")
+                if audio_output == "binary":
+                    header, frames, duration = audio_preparer.prepare_pcm_stream(
+                        filepath.samples,
+                        filepath.sample_rate,
+                        display_text=sentence,
+                        expression_list=expression_list,
+                    )
+                else:
+                    payload, duration = audio_preparer.prepare_pcm_payload(
+                        filepath.samples,
+                        filepath.sample_rate,
+                        display_text=sentence,
+                        expression_list=expression_list,
+                    )
+            else:
+                print(f">> Playing {filepath}...")
+                # The lip sync volumes of cached phrases are known already.
+                volumes = open_llm_vtuber.audio_volumes(filepath)
+                if audio_output == "binary":
+                    header, frames, duration = audio_preparer.prepare_audio_stream(
+                        audio_path=filepath,
+                        display_text=sentence,
+                        expression_list=expression_list,
+                        volumes=volumes,
+                    )
+                else:
+                    payload, duration = audio_preparer.prepare_audio_payload(
+                        audio_path=filepath,
+                        display_text=sentence,
+                        expression_list=expression_list,
+                        volumes=volumes,
+                    )
+                # the audio is in the message now
+                open_llm_vtuber.tts.remove_file(filepath, verbose=False)
+
+            if audio_output == "binary":
+                message = OutboundMessage(
+                    [json.dumps(header), *frames]
+                    + [json.dumps(audio_preparer.audio_stream_end(header["stream_id"]))],
+                    duration=duration,
+                    on_sent=_trace_send(turn_trace),
+                )
+            else:
+                message = OutboundMessage(
+                    [json.dumps(payload)], duration=duration, on_sent=_trace_send(turn_trace)
+                )
+            if turn_trace is not None:
+                turn_trace.record("payload_prepare", time.perf_counter() - prepare_start)
+            return message
+
+        def _play_audio_file(sentence: str | None, filepath: str | AudioData | AudioStream | None) -> None:
             if filepath is None:
                 print("No audio to be streamed. Response is empty.")
                 return
 
             if sentence is None:
                 sentence = ""
-            print(f">> Playing {filepath}...")
-            payload, duration = audio_preparer.prepare_audio_payload(
-                audio_path=filepath,
-                display_text=sentence,
-                expression_list=l2d.extract_emotion(sentence),
-            )
+            expression_list = l2d.extract_emotion(sentence)
+
+            if isinstance(filepath, AudioStream):
+                if audio_output == "binary":
+                    print(">> Streaming audio...")
+                    _stream_audio(sentence, filepath, expression_list)
+                    print("Payload send.")
+                    return
+                # the base64 payload needs the whole sentence
+                filepath = filepath.read_all()
+
+            # This runs on the conversation worker thread
+            session.send_threadsafe(_audio_message(sentence, filepath, expression_list))
             print("Payload send.")
 
-            async def _send_audio():
-                await websocket.send_text(json.dumps(payload))
-                await asyncio.sleep(duration)
-
-            new_loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(new_loop)
-            new_loop.run_until_complete(_send_audio())
-            new_loop.close()
+        async def _aplay_audio_file(
+            sentence: str | None, filepath: str | AudioData | AudioStream | None
+        ) -> None:
+            # `_play_audio_file` for the async conversation chain, on the event loop
+            if filepath is None:
+                print("No audio to be streamed. Response is empty.")
+                return
 
-            print("Audio played.")
+            if sentence is None:
+                sentence = ""
+            expression_list = l2d.extract_emotion(sentence)
+            loop = asyncio.get_running_loop()
+
+            if isinstance(filepath, AudioStream):
+                if audio_output == "binary":
+                    print(">> Streaming audio...")
+                    await _astream_audio(sentence, filepath, expression_list)
+                    print("Payload send.")
+                    return
+                filepath = await loop.run_in_executor(None, filepath.read_all)
+
+            message = await loop.run_in_executor(None, _audio_message, sentence, filepath, expression_list)
+            await session.send(message)
+            print("Payload send.")
 
         open_llm_vtuber.set_audio_output_func(_play_audio_file)
+        open_llm_vtuber.set_async_audio_output_func(_aplay_audio_file)
         return l2d, open_llm_vtuber, audio_preparer
 
-    async def setup_redis(self):
-        """Initialize Redis connection and subscription"""
-        print("Setting up Redis connection...")
-        max_retries = 3
-        retry_delay = 1
-        
-        for attempt in range(max_retries):
-            try:
-                self.redis_client = await aioredis.from_url('redis://redis:6379')
-                self.pubsub = self.redis_client.pubsub()
-                # Subscribe to both channels
-                await self.pubsub.subscribe('crypto_tips', 'vtuber_events')
-                print("Redis subscriptions established")
-                return
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    print(f"Failed to connect to Redis (attempt {attempt + 1}/{max_retries}). Retrying in {retry_delay} seconds...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2
-                else:
-                    print(f"Failed to connect to Redis after {max_retries} attempts, ignoring")
+    @staticmethod
+    def _create_scheduler(config: Dict) -> TurnScheduler:
+        """Creates the turn scheduler from MAX_CONCURRENT_TURNS and MAX_QUEUED_TURNS in the config."""
+        queued_turns = config.get("MAX_QUEUED_TURNS") or {}
+        return TurnScheduler(
+            max_workers=config.get("MAX_CONCURRENT_TURNS", 4),
+            max_queue_depth={
+                priority: queued_turns[priority.name.lower()]
+                for priority in TurnPriority
+                if priority.name.lower() in queued_turns
+            },
+        )
 
-    async def handle_tip(self, tip_data: dict, websocket: WebSocket, open_llm_vtuber: OpenLLMVTuberMain):
+    @staticmethod
+    def _conversation_chain_func(open_llm_vtuber: OpenLLMVTuberMain):
+        """
+        The conversation chain the scheduler runs for a turn: `aconversation_chain` on the event loop
+        with ASYNC_PIPELINE on, otherwise `conversation_chain` in a thread of its own.
+        """
+        if open_llm_vtuber.config.get("ASYNC_PIPELINE", False):
+            return open_llm_vtuber.aconversation_chain
+        return open_llm_vtuber.conversation_chain
+
+    @asynccontextmanager
+    async def _lifespan(self, app: FastAPI):
+        """Starts the shared Redis subscriber with the app and stops it on shutdown."""
+        # asyncio.to_thread and run_in_executor(None, ...) of all sessions share one bounded pool
+        asyncio.get_running_loop().set_default_executor(self.executor)
+        await self.event_hub.start()
+        publish_task = None
+        if self.worker_stats is not None:
+            publish_task = asyncio.create_task(
+                self.worker_stats.publish(
+                    {"tracer": self.tracer.snapshot, "scheduler": self.scheduler.snapshot}
+                )
+            )
+        yield
+        if publish_task is not None:
+            publish_task.cancel()
+            await asyncio.gather(publish_task, return_exceptions=True)
+        await self.event_hub.stop()
+        # the turns still queued for mem0 are added before the process exits
+        await asyncio.to_thread(close_write_queues, self.SHUTDOWN_DRAIN_TIMEOUT)
+        await aclose_async_http_clients()
+        self.tracer.close()
+        self.journal_writer.close()
+
+    async def handle_tip(self, tip_data: dict, session: WebSocketSession, open_llm_vtuber: OpenLLMVTuberMain):
         """Process incoming crypto tip and generate VTuber response"""
         print(f"\n=== Processing Tip ===\nData: {tip_data}")
         
@@ -146,12 +369,13 @@ Respond to this tip while maintaining your character's personality. Incorporate
 
         try:
             if amount > 0:
-                await websocket.send_text(
-                    json.dumps({"type": "full-text", "text": "💰 Received a crypto tip!"})
-                )
-                
-                response = await asyncio.to_thread(
-                    open_llm_vtuber.conversation_chain,
+                await session.send_json({"type": "full-text", "text": "💰 Received a crypto tip!"})
+
+
+                response = await self.scheduler.run(
+                    TurnPriority.TIP,
+                    session.session_id,
+                    self._conversation_chain_func(open_llm_vtuber),
                     user_input=user_prompt
                 )
                 
@@ -159,125 +383,201 @@ Respond to this tip while maintaining your character's personality. Incorporate
         except Exception as e:
             print(f"Error handling tip: {e}")
 
-    async def monitor_events(self, websocket: WebSocket, open_llm_vtuber: OpenLLMVTuberMain):
-        """Monitor Redis for both tips and chat messages"""
-        try:
-            while True:
-                message = await self.pubsub.get_message(ignore_subscribe_messages=True)
-                if message and message['type'] == 'message':
-                    try:
-                        message_data = message['data'].decode('utf-8') if isinstance(message['data'], bytes) else message['data']
-                        print(f"DEBUG: Received Redis message: {message_data}")
-                        
-                        data = json.loads(message_data)
-                        event_type = data.get('type')
-                        
-                        if event_type == 'tip':
-                            # Handle crypto tips
-                            if all(k in data for k in ['token', 'amount']):
-                                await self.handle_tip(data, websocket, open_llm_vtuber)
-                            else:
-                                print("Invalid tip data format")
-                                
-                        elif event_type == 'chat':
-                            # Handle chat messages
-                            if 'text' in data:
-                                response = await self.handle_message(
-                                    data['text'],
-                                    websocket,
-                                    open_llm_vtuber
-                                )
-                                await websocket.send_text(
-                                    json.dumps({
-                                        "type": "full-text",
-                                        "text": response,
-                                        "session_id": data.get("session_id", "default")
-                                    })
-                                )
-                            else:
-                                print("Invalid chat data format")
-                                
-                await asyncio.sleep(0.1)
-        except Exception as e:
-            print(f"Error in event monitor: {e}")
+    async def monitor_events(
+        self,
+        events: asyncio.Queue,
+        session: WebSocketSession,
+        open_llm_vtuber: OpenLLMVTuberMain,
+    ):
+        """
+        Handle the tips and chat messages the event hub puts on the queue of this session.
+
+        Args:
+            events: The event queue of this session, from `EventHub.subscribe`
+            session: The session to send the responses to
+            open_llm_vtuber: The OpenLLMVTuberMain of this session
+        """
+        while True:
+            data = await events.get()
+            try:
+                event_type = data.get('type')
+
+                if event_type == 'tip':
+                    # Handle crypto tips
+                    if all(k in data for k in ['token', 'amount']):
+                        await self.handle_tip(data, session, open_llm_vtuber)
+                    else:
+                        print("Invalid tip data format")
+
+                elif event_type == 'chat':
+                    # Handle chat messages
+                    if 'text' in data:
+                        response = await self.handle_message(
+                            data['text'],
+                            session,
+                            open_llm_vtuber
+                        )
+                        await session.send_json({
+                            "type": "full-text",
+                            "text": response,
+                            "session_id": data.get("session_id", "default")
+                        })
+                    else:
+                        print("Invalid chat data format")
+            except Exception as e:
+                print(f"Error in event monitor: {e}")
 
     def _setup_routes(self):
         """Sets up the WebSocket and broadcast routes."""
 
+        @self.app.get("/metrics")
+        async def metrics():
+            """
+            Latency histograms of the stages of the conversation turns of all the workers, in the
+            Prometheus text format.
+            """
+            others = {}
+            if self.worker_stats is not None:
+                others = await asyncio.to_thread(self.worker_stats.read, "tracer")
+            return PlainTextResponse(
+                self.tracer.prometheus_text(others.values()), media_type="text/plain; version=0.0.4"
+            )
+
+        @self.app.get("/scheduler-stats")
+        async def scheduler_stats():
+            """Queue depths, shed turns and queue waits of the turn schedulers of all the running workers."""
+            others = {}
+            if self.worker_stats is not None:
+                others = await asyncio.to_thread(self.worker_stats.read, "scheduler", True)
+            return self.scheduler.stats(others.values())
+
         # Add this new endpoint for text chat
         @self.app.websocket("/text-ws")
         async def text_websocket_endpoint(websocket: WebSocket):
             await websocket.accept()
-            await self.setup_redis()
 
-            await websocket.send_text(
-                json.dumps({"type": "full-text", "text": "Text chat connection established"})
+            session = WebSocketSession(websocket)
+            await session.send_json(
+                {"type": "full-text", "text": "Text chat connection established"}
             )
 
             # Initialize components
-            _, open_llm_vtuber, _ = self._initialize_components(websocket)
-            
+            session_config = dict(self.open_llm_vtuber_main_config)
+            _, open_llm_vtuber, _ = await asyncio.to_thread(
+                self._initialize_components, session, session_config
+            )
+
             try:
                 while True:
                     message = await websocket.receive_text()
                     data = json.loads(message)
                     
                     if data.get("type") == "text-message":
-                        response = await self.handle_message(
-                            data.get("text", ""), 
-                            websocket, 
-                            open_llm_vtuber
-                        )
-                        
+                        try:
+                            response = await self.handle_message(
+                                data.get("text", ""),
+                                session,
+                                open_llm_vtuber
+                            )
+                        except TurnRejected:
+                            response = "Too many messages right now, please try again in a moment."
+
                         # Send the response back to the client
-                        await websocket.send_text(
-                            json.dumps({
-                                "type": "full-text",
-                                "text": response
-                            })
-                        )
+                        await session.send_json({
+                            "type": "full-text",
+                            "text": response
+                        })
             
             except WebSocketDisconnect:
                 print("Text chat client disconnected")
+            finally:
+                await session.close()
+                await asyncio.to_thread(open_llm_vtuber.close)
 
         # the existing voice chat endpoint
         @self.app.websocket("/client-ws")
         async def websocket_endpoint(websocket: WebSocket):
             await websocket.accept()
-            await self.setup_redis()
-            
-            await websocket.send_text(
-                json.dumps({"type": "full-text", "text": "Connection established"})
+
+            # everything sent to this client goes through the session's outbound queue
+            session = WebSocketSession(
+                websocket,
+                session_id=websocket.query_params.get("session_id"),
             )
+            await session.send_json({"type": "full-text", "text": "Connection established"})
 
             self.connected_clients.append(websocket)
             print("Connection established")
 
             # Initialize components
-            l2d, open_llm_vtuber, _ = self._initialize_components(websocket)
-            
-            # Start event monitoring task (replaces tip_reaction_task)
-            self.event_monitor_task = asyncio.create_task(
-                self.monitor_events(websocket, open_llm_vtuber)
+            # Each session gets its own copy of the config, so a switch-config
+            # from one client doesn't change the config of the other clients.
+            session_config = dict(self.open_llm_vtuber_main_config)
+            # "json" (default): base64 audio in one JSON message per sentence.
+            # "binary": a JSON header followed by binary PCM frames (see doc/API.md).
+            audio_output = websocket.query_params.get("audio_format", "json")
+            if audio_output not in ("json", "binary"):
+                logger.error(f"Unsupported audio_format '{audio_output}', using json")
+                audio_output = "json"
+            l2d, open_llm_vtuber, _ = await asyncio.to_thread(
+                self._initialize_components, session, session_config, audio_output
             )
-            
-            await websocket.send_text(
-                json.dumps({"type": "set-model", "text": l2d.model_info})
+
+            # Tips and chat events from Redis, dispatched by the shared event hub
+            events = await self.event_hub.subscribe(session.session_id)
+            event_monitor_task = asyncio.create_task(
+                self.monitor_events(events, session, open_llm_vtuber)
             )
+            
+            await session.send_json({"type": "set-model", "text": l2d.model_info})
             print("Model set")
-            received_data_buffer = np.array([])
-            # start mic
-            await websocket.send_text(
-                json.dumps({"type": "control", "text": "start-mic"})
+
+            # Mic audio comes either as JSON "mic-audio-data" messages (old frontends)
+            # or as binary frames of raw PCM. The sample format of the binary frames is
+            # negotiated at connect time with the `mic_format` query parameter.
+            mic_format = websocket.query_params.get("mic_format")
+            if mic_format is not None:
+                if mic_format not in MIC_AUDIO_FORMATS:
+                    logger.error(f"Unsupported mic_format '{mic_format}', using float32")
+                    mic_format = "float32"
+                await session.send_json({"type": "mic-audio-format", "format": mic_format})
+            received_data_buffer = AudioChunkBuffer()
+            # With STREAMING_ASR on, the mic audio goes to the transcriber instead of the buffer
+            # and is transcribed while the user is still speaking.
+            transcriber = await asyncio.to_thread(
+                open_llm_vtuber.create_streaming_transcriber
             )
 
+            def _receive_mic_audio(samples: np.ndarray) -> None:
+                if transcriber is not None:
+                    transcriber.feed(samples)
+                else:
+                    received_data_buffer.append(samples)
+
+            # start mic
+            await session.send_json({"type": "control", "text": "start-mic"})
+
             conversation_task = None
 
             try:
                 while True:
                     print(".", end="")
-                    message = await websocket.receive_text()
-                    data = json.loads(message)
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(message.get("code", 1000))
+
+                    if message.get("bytes") is not None:
+                        # binary frame: raw PCM mic audio
+                        try:
+                            _receive_mic_audio(
+                                pcm_bytes_to_float32(message["bytes"], mic_format or "float32")
+                            )
+                        except ValueError as e:
+                            logger.error(f"Dropped mic audio frame: {e}")
+                        print("*", end="")
+                        continue
+
+                    data = json.loads(message["text"])
                     # print(f"\033\n Received ws req: {data.get('type')}\033[0m\n")
 
                     if data.get("type") == "interrupt-signal":
@@ -290,48 +590,63 @@ Respond to this tip while maintaining your character's personality. Incorporate
                                 "\033[0m\n",
                             )
                             open_llm_vtuber.interrupt(data.get("text"))
+                            # the client stops playing, so drop the audio it hasn't got yet
+                            session.clear_pending_audio()
                             # conversation_task.cancel()
 
                     elif data.get("type") == "mic-audio-data":
-                        received_data_buffer = np.append(
-                            received_data_buffer,
-                            np.array(
-                                list(data.get("audio").values()), dtype=np.float32
-                            ),
-                        )
+                        # JSON frames: a Float32Array serialized as {index: sample}
+                        audio_data = data.get("audio")
+                        if isinstance(audio_data, dict):
+                            audio_data = audio_data.values()
+                        _receive_mic_audio(np.fromiter(audio_data, dtype=np.float32))
                         print("*", end="")
 
                     elif data.get("type") == "mic-audio-end":
                         print("Received audio data end from front end.")
-                        await websocket.send_text(
-                            json.dumps({"type": "full-text", "text": "Thinking..."})
-                        )
-                        audio = received_data_buffer
-                        received_data_buffer = np.array([])
+                        await session.send_json({"type": "full-text", "text": "Thinking..."})
+                        # the turn starts when the user stops speaking
+                        turn_trace = self.tracer.start_turn(session.session_id)
+                        if transcriber is not None:
+                            # only the audio after the last pause is left to transcribe
+                            print("transcribing...")
+                            with turn_trace.span("asr_transcribe"):
+                                user_input = await asyncio.to_thread(transcriber.finish)
+                        else:
+                            user_input = received_data_buffer.consume()
 
                         async def _run_conversation():
                             try:
-                                await websocket.send_text(
-                                    json.dumps(
-                                        {
-                                            "type": "control",
-                                            "text": "conversation-chain-start",
-                                        }
-                                    )
+                                await session.send_json(
+                                    {
+                                        "type": "control",
+                                        "text": "conversation-chain-start",
+                                    }
                                 )
-                                await asyncio.to_thread(
-                                    open_llm_vtuber.conversation_chain,
-                                    user_input=audio,
+                                await self.scheduler.run(
+                                    TurnPriority.VOICE,
+                                    session.session_id,
+                                    self._conversation_chain_func(open_llm_vtuber),
+                                    user_input=user_input,
+                                    turn_trace=turn_trace,
                                 )
-                                await websocket.send_text(
-                                    json.dumps(
-                                        {
-                                            "type": "control",
-                                            "text": "conversation-chain-end",
-                                        }
-                                    )
+                                # held back until the client has played the audio of this turn
+                                await session.send_json(
+                                    {
+                                        "type": "control",
+                                        "text": "conversation-chain-end",
+                                    },
+                                    after_playback=True,
                                 )
                                 print("One Conversation Loop Completed")
+                            except TurnRejected:
+                                # let the client listen again
+                                await session.send_json(
+                                    {
+                                        "type": "control",
+                                        "text": "conversation-chain-end",
+                                    }
+                                )
                             except asyncio.CancelledError:
                                 print("Conversation task was cancelled.")
                             except InterruptedError as e:
@@ -340,51 +655,61 @@ Respond to this tip while maintaining your character's personality. Incorporate
                         conversation_task = asyncio.create_task(_run_conversation())
                     elif data.get("type") == "fetch-configs":
                         config_files = self._scan_config_alts_directory()
-                        await websocket.send_text(
-                            json.dumps({"type": "config-files", "files": config_files})
-                        )
+                        await session.send_json({"type": "config-files", "files": config_files})
                     elif data.get("type") == "switch-config":
                         config_file = data.get("file")
                         if config_file:
                             new_config = self._load_config_from_file(config_file)
                             if new_config:
                                 # Update configuration
-                                self.open_llm_vtuber_main_config.update(new_config)
-
-                                # Reinitialize components with new configuration
-                                l2d, open_llm_vtuber, _ = self._initialize_components(
-                                    websocket
+                                session_config.update(new_config)
+
+                                # Reinitialize components with new configuration.
+                                # Release the old engines first so the pool can
+                                # drop the ones no other session is using.
+                                await asyncio.to_thread(open_llm_vtuber.close)
+                                l2d, open_llm_vtuber, _ = await asyncio.to_thread(
+                                    self._initialize_components,
+                                    session,
+                                    session_config,
+                                    audio_output,
+                                )
+                                # events from now on go to the new OpenLLMVTuberMain
+                                event_monitor_task.cancel()
+                                event_monitor_task = asyncio.create_task(
+                                    self.monitor_events(events, session, open_llm_vtuber)
+                                )
+                                if transcriber is not None:
+                                    transcriber.close()
+                                transcriber = await asyncio.to_thread(
+                                    open_llm_vtuber.create_streaming_transcriber
                                 )
 
                                 # Send confirmation and model info
-                                await websocket.send_text(
-                                    json.dumps(
-                                        {
-                                            "type": "config-switched",
-                                            "message": f"Switched to config: {config_file}",
-                                        }
-                                    )
+                                await session.send_json(
+                                    {
+                                        "type": "config-switched",
+                                        "message": f"Switched to config: {config_file}",
+                                    }
                                 )
-                                await websocket.send_text(
-                                    json.dumps(
-                                        {"type": "set-model", "text": l2d.model_info}
-                                    )
+                                await session.send_json(
+                                    {"type": "set-model", "text": l2d.model_info}
                                 )
                                 print(f"Configuration switched to {config_file}")
                     elif data.get("type") == "fetch-backgrounds":
                         bg_files = self._scan_bg_directory()
-                        await websocket.send_text(
-                            json.dumps({"type": "background-files", "files": bg_files})
-                        )
+                        await session.send_json({"type": "background-files", "files": bg_files})
                     else:
                         print("Unknown data type received.")
 
             except WebSocketDisconnect:
-                if self.tip_reaction_task:
-                    self.tip_reaction_task.cancel()
-                if self.redis_client:
-                    await self.redis_client.close()
+                event_monitor_task.cancel()
+                await self.event_hub.unsubscribe(session.session_id)
                 self.connected_clients.remove(websocket)
+                await session.close()
+                if transcriber is not None:
+                    transcriber.close()
+                await asyncio.to_thread(open_llm_vtuber.close)
                 open_llm_vtuber = None
 
     def _scan_config_alts_directory(self) -> List[str]:
@@ -466,11 +791,103 @@ Respond to this tip while maintaining your character's personality. Incorporate
         )
         self.app.mount("/", StaticFiles(directory="./static", html=True), name="static")
 
-    def run(self, host: str = "0.0.0.0", port: int = 8000, log_level: str = "info"):
-        """Runs the FastAPI application using Uvicorn."""
+    def run(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        log_level: str = "info",
+        workers: int = 1,
+    ):
+        """
+        Runs the FastAPI application using Uvicorn.
+
+        Args:
+            host: The host to bind to
+            port: The port to bind to
+            log_level: The log level of Uvicorn
+            workers: Number of worker processes. With more than one, the engines are loaded
+                once in this process and the workers are forked from it (see `_run_workers`).
+        """
         import uvicorn
 
-        uvicorn.run(self.app, host=host, port=port, log_level=log_level)
+        if workers > 1 and not hasattr(os, "fork"):
+            logger.warning("Multiple workers need os.fork, which this platform doesn't have. Running a single process.")
+            workers = 1
+
+        if workers <= 1:
+            uvicorn.run(self.app, host=host, port=port, log_level=log_level)
+            return
+
+        self._run_workers(
+            uvicorn.Config(self.app, host=host, port=port, log_level=log_level),
+            workers,
+        )
+
+    def _run_workers(self, uvicorn_config, workers: int):
+        """
+        Serve the app with several forked worker processes sharing one listening socket.
+
+        The ASR, TTS and translator engines of the main config are preloaded into the engine
+        pool before forking, so every worker starts with them in (copy-on-write) memory.
+        Each worker runs its own event loop and its own event hub, the sessions are
+        registered in Redis so events reach the worker that owns the connection.
+        The workers share the stats of their tracer and scheduler through `worker_stats`, a
+        temporary directory removed when the server stops.
+        Workers that die are replaced until this process gets SIGINT or SIGTERM.
+
+        Args:
+            uvicorn_config: The uvicorn.Config to serve
+            workers: Number of worker processes
+        """
+        import uvicorn
+
+        print(f"Preloading engines for {workers} workers...")
+        OpenLLMVTuberMain.preload_engines(self.open_llm_vtuber_main_config, self.engine_pool)
+        self.worker_stats = WorkerStats(tempfile.mkdtemp(prefix="vtuber-stats-"))
+        sock = uvicorn_config.bind_socket()
+        children: set[int] = set()
+        stopping = False
+
+        def spawn() -> None:
+            pid = os.fork()
+            if pid == 0:
+                # worker process
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                try:
+                    uvicorn.Server(uvicorn_config).run(sockets=[sock])
+                finally:
+                    os._exit(0)
+            children.add(pid)
+            print(f"Started worker {pid}")
+
+        def shutdown(signum, frame) -> None:
+            nonlocal stopping
+            stopping = True
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+        for _ in range(workers):
+            spawn()
+
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            children.discard(pid)
+            if not stopping:
+                logger.error(f"Worker {pid} exited with status {status}, restarting it")
+                spawn()
+        sock.close()
+        self.worker_stats.remove()
 
     @staticmethod
     def clean_cache():
@@ -480,41 +897,34 @@ Respond to this tip while maintaining your character's personality. Incorporate
             shutil.rmtree(cache_dir)
             os.makedirs(cache_dir)
 
-    async def handle_message(self, message: str, websocket: WebSocket, open_llm_vtuber: OpenLLMVTuberMain):
+    async def handle_message(self, message: str, session: WebSocketSession, open_llm_vtuber: OpenLLMVTuberMain):
         """Process incoming messages with intent classification"""
-        intent, confidence = await classify_message(message, open_llm_vtuber.llm_client)
-        
+        # answered locally in most cases, the LLM is only asked when the local classifier isn't sure
+        intent, confidence, ir_category, _ = await classify_message(
+            message, llm_fallback=open_llm_vtuber.ask_llm_once
+        )
+
         if intent == MessageIntent.INVESTOR_RELATIONS and confidence > 0.8:
-            # Determine the type of IR query
-            ir_types = ["tokenomics", "fundraising", "business_model", "partnerships"]
-            
-            type_prompt = f"""
-            Classify this investor relations question into one of these categories: {', '.join(ir_types)}
-            Question: {message}
-            Respond with only the category name.
-            """
-            query_type = await asyncio.to_thread(
-                open_llm_vtuber.conversation_chain,
-                user_input=type_prompt
-            )
-            query_type = query_type.strip().lower()
-            
-            ir_context = format_ir_response(query_type)
-            
-            response = await asyncio.to_thread(
-                open_llm_vtuber.conversation_chain,
+            ir_context = format_ir_response(ir_category or "business_model")
+
+            response = await self.scheduler.run(
+                TurnPriority.CHAT,
+                session.session_id,
+                self._conversation_chain_func(open_llm_vtuber),
                 user_input=f"{ir_context}\n\nUser question: {message}"
             )
             return response
             
         elif intent == MessageIntent.CRYPTO_TIP:
-            tip_response = await self.handle_tip(message, websocket, open_llm_vtuber)
+            tip_response = await self.handle_tip(message, session, open_llm_vtuber)
             return tip_response
             
         else:
             # Handle general chat
-            response = await asyncio.to_thread(
-                open_llm_vtuber.conversation_chain,
+            response = await self.scheduler.run(
+                TurnPriority.CHAT,
+                session.session_id,
+                self._conversation_chain_func(open_llm_vtuber),
                 user_input=message
             )
             return response
@@ -564,4 +974,6 @@ if __name__ == "__main__":
 
     # Initialize and run the WebSocket server
     server = WebSocketServer(open_llm_vtuber_main_config=config)
-    server.run(host=config["HOST"], port=config["PORT"])
+    server.run(
+        host=config["HOST"], port=config["PORT"], workers=config.get("WORKERS", 1)
+    )
@@ -0,0 +1,237 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, List
+
+from loguru import logger
+
+from utils.cancellation import CancellationToken
+from utils.sentence_segmenter import SentenceSegmenter
+
+_END = None  # closes a queue
+
+
+class SpeechPipeline:
+    """
+    The asyncio version of `OpenLLMVTuberMain.speak_by_sentence_chain`: speaks a streamed LLM
+    response sentence by sentence without a thread per stage.
+
+    The response goes through four stages, each an asyncio task, connected by bounded queues:
+
+    1. segmentation: the tokens of the async LLM stream are split into sentences
+    2. translation (optional): the sentences waiting together are translated in one batch
+    3. synthesis: the TTS of every sentence runs on the loop's default executor, up to
+       `max_ahead` sentences ahead of playback
+    4. playback: the audio is handed to the async `play` function in sentence order
+
+    A full queue makes the stage before it wait, so a slow client or TTS holds back the reading of
+    the LLM stream instead of piling up sentences and audio. Only the blocking engines (the TTS,
+    a translator without an async client) take a thread, and only while they work.
+    """
+
+    def __init__(
+        self,
+        segmenter: SentenceSegmenter,
+        synthesize: Callable[[str], Any],
+        play: Callable[[str, Any], Awaitable[None]],
+        clean_text: Callable[[str], str] = lambda text: text,
+        translate_batch: Callable[[List[str]], Awaitable[List[str]]] | None = None,
+        max_ahead: int = 1,
+        max_batch: int = 8,
+        queue_size: int = 16,
+        on_sentence: Callable[[str], None] | None = None,
+        on_discard: Callable[[Any], None] | None = None,
+    ):
+        """
+        Parameters:
+        - segmenter (SentenceSegmenter): The segmenter for this response.
+        - synthesize (Callable[[str], Any]): Blocking. Turns the text to speak into audio (a file path,
+          AudioData or an AudioStream), or None if there is nothing to speak.
+        - play (Callable[[str, Any], Awaitable[None]]): Sends or plays the audio of a sentence.
+        - clean_text (Callable[[str], str]): Turns a displayed sentence into the text to speak.
+        - translate_batch (Callable[[List[str]], Awaitable[List[str]]] | None): Translates the texts
+          to speak, like `TranslateInterface.atranslate_batch`. None to speak them as they are.
+        - max_ahead (int): Sentences synthesized at the same time, counted from the one being played.
+        - max_batch (int): Most sentences translated in one batch.
+        - queue_size (int): Capacity of the queues between the segmentation, translation and synthesis.
+        - on_sentence (Callable[[str], None] | None): Called with every sentence of the response, as it is complete.
+        - on_discard (Callable[[Any], None] | None): Called with the audio that won't be played after an
+          interrupt, like to remove its file.
+        """
+        self.segmenter = segmenter
+        self.synthesize = synthesize
+        self.play = play
+        self.clean_text = clean_text
+        self.translate_batch = translate_batch
+        self.max_ahead = max(1, max_ahead)
+        self.max_batch = max(1, max_batch)
+        self.queue_size = max(1, queue_size)
+        self.on_sentence = on_sentence
+        self.on_discard = on_discard
+        self.full_response = ""
+
+    async def run(
+        self, tokens: AsyncIterator[str], cancel_token: CancellationToken | None = None
+    ) -> str:
+        """
+        Speak the response.
+
+        Parameters:
+        - tokens (AsyncIterator[str]): The LLM stream.
+        - cancel_token (CancellationToken | None): Stops all the stages right away when cancelled.
+
+        Returns:
+        - str: The full response.
+
+        Raises:
+        - InterruptedError: If `cancel_token` was cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        sentences: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        texts: asyncio.Queue = (
+            asyncio.Queue(maxsize=self.queue_size) if self.translate_batch is not None else sentences
+        )
+        audio: asyncio.Queue = asyncio.Queue(maxsize=self.max_ahead)
+        slots = asyncio.Semaphore(self.max_ahead)
+
+        stages = [asyncio.ensure_future(self._segment(tokens, sentences))]
+        if self.translate_batch is not None:
+            stages.append(asyncio.ensure_future(self._translate(sentences, texts)))
+        stages.append(asyncio.ensure_future(self._synthesize(texts, audio, slots)))
+        stages.append(asyncio.ensure_future(self._play(audio, slots)))
+        pipeline = asyncio.gather(*stages)
+
+        def _cancel_threadsafe() -> None:
+            try:
+                loop.call_soon_threadsafe(pipeline.cancel)
+            except RuntimeError:
+                pass  # the loop is closed
+
+        unregister = (
+            cancel_token.on_cancel(_cancel_threadsafe) if cancel_token is not None else (lambda: None)
+        )
+        try:
+            await pipeline
+        except asyncio.CancelledError:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise InterruptedError("Speech pipeline interrupted")
+            raise
+        finally:
+            unregister()
+            for stage in stages:
+                stage.cancel()
+            self._discard_queued(audio)
+        return self.full_response
+
+    async def _segment(self, tokens: AsyncIterator[str], outbox: asyncio.Queue) -> None:
+        try:
+            async for token in tokens:
+                if not isinstance(token, str):
+                    print(f"Warning: Received non-string type: {type(token)}")
+                    continue
+                if not token:
+                    continue
+                print(token, end="", flush=True)
+                self.full_response += token
+                for sentence in self.segmenter.feed(token):
+                    if sentence.strip():
+                        await self._submit(sentence, outbox)
+            sentence = self.segmenter.flush()
+            if sentence.strip():
+                print("\n")
+                await self._submit(sentence, outbox)
+            await outbox.put(_END)
+        finally:
+            aclose = getattr(tokens, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def _submit(self, sentence: str, outbox: asyncio.Queue) -> None:
+        if self.on_sentence is not None:
+            self.on_sentence(sentence)
+        await outbox.put((sentence, self.clean_text(sentence)))
+
+    async def _translate(self, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        while True:
+            batch = [await inbox.get()]
+            while len(batch) < self.max_batch and batch[-1] is not _END and not inbox.empty():
+                batch.append(inbox.get_nowait())
+            ended = batch[-1] is _END
+            if ended:
+                batch.pop()
+
+            to_translate = [text for _, text in batch if text]
+            if to_translate:
+                try:
+                    translations = iter(await self.translate_batch(to_translate))
+                except Exception as e:
+                    logger.error(f"Translation error: {e}")
+                    translations = iter(to_translate)  # continue with the original text
+                batch = [(sentence, next(translations) if text else text) for sentence, text in batch]
+
+            for item in batch:
+                if item[1]:
+                    print(f"Translated: {item[1]}")
+                await outbox.put(item)
+            if ended:
+                await outbox.put(_END)
+                return
+
+    async def _synthesize(
+        self, inbox: asyncio.Queue, outbox: asyncio.Queue, slots: asyncio.Semaphore
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await inbox.get()
+            if item is _END:
+                await outbox.put(_END)
+                return
+            sentence, text = item
+            await slots.acquire()  # released once the sentence was played
+            if text:
+                synthesis = loop.run_in_executor(None, self.synthesize, text)
+            else:
+                synthesis = loop.create_future()
+                synthesis.set_result(None)
+            await outbox.put((sentence, synthesis))
+
+    async def _play(self, inbox: asyncio.Queue, slots: asyncio.Semaphore) -> None:
+        while True:
+            item = await inbox.get()
+            if item is _END:
+                return
+            sentence, synthesis = item
+            try:
+                try:
+                    # shielded: on interrupt, the audio is discarded when it's there
+                    audio = await asyncio.shield(synthesis)
+                except asyncio.CancelledError:
+                    synthesis.add_done_callback(self._discard_future)
+                    raise
+                except Exception as e:
+                    logger.error(f"TTS failed for sentence '{sentence}': {e}")
+                    continue
+                if audio is None:
+                    continue
+                try:
+                    await self.play(sentence, audio)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Consumer error: Error playing sentence '{sentence}'.\n {e}")
+            finally:
+                slots.release()
+
+    def _discard_queued(self, audio: asyncio.Queue) -> None:
+        while not audio.empty():
+            item = audio.get_nowait()
+            if item is not _END:
+                item[1].add_done_callback(self._discard_future)
+
+    def _discard_future(self, future: asyncio.Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        if result is not None and self.on_discard is not None:
+            try:
+                self.on_discard(result)
+            except Exception as e:
+                logger.warning(f"Failed to discard TTS result {result}: {e}")
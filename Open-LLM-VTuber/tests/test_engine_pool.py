@@ -0,0 +1,78 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.engine_pool import EnginePool
+
+
+class FakeEngine:
+    thread_safe = False
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self._count_lock = threading.Lock()
+
+    def _enter(self):
+        with self._count_lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def _exit(self):
+        with self._count_lock:
+            self.active -= 1
+
+    def transcribe_np(self, audio):
+        self._enter()
+        time.sleep(0.01)
+        self._exit()
+        return f"text {audio}"
+
+    def stream(self, text, cancel_token=None):
+        self._enter()
+        try:
+            for chunk in (b"ab", b"cd"):
+                time.sleep(0.01)
+                yield chunk
+        finally:
+            self._exit()
+
+
+class ThreadSafeEngine(FakeEngine):
+    thread_safe = True
+
+
+def _call_concurrently(func, calls=8):
+    with ThreadPoolExecutor(calls) as executor:
+        return list(executor.map(func, range(calls)))
+
+
+def test_shared_engine_runs_one_call_at_a_time():
+    pool = EnginePool()
+    engine = pool.acquire("asr", "fake", {}, FakeEngine)
+    assert pool.acquire("asr", "fake", {}, FakeEngine) is engine
+
+    assert _call_concurrently(engine.transcribe_np) == [f"text {i}" for i in range(8)]
+    assert engine.max_active == 1
+
+    engine.max_active = 0
+    assert _call_concurrently(lambda i: b"".join(engine.stream(str(i)))) == [b"abcd"] * 8
+    assert engine.max_active == 1
+
+
+def test_thread_safe_engine_is_not_locked():
+    pool = EnginePool()
+    engine = pool.acquire("asr", "fake", {}, ThreadSafeEngine)
+
+    _call_concurrently(engine.transcribe_np)
+    assert engine.max_active > 1
+
+
+def test_closed_stream_releases_the_engine():
+    pool = EnginePool()
+    engine = pool.acquire("tts", "fake", {}, FakeEngine)
+
+    chunks = engine.stream("hello")
+    next(chunks)
+    chunks.close()
+    assert _call_concurrently(engine.transcribe_np, calls=2) == ["text 0", "text 1"]
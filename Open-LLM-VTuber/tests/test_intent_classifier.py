@@ -0,0 +1,65 @@
+import pytest
+
+from prompts.intent_classifier import IntentClassifier, MessageIntent
+
+GENERAL = MessageIntent.GENERAL_CHAT
+IR = MessageIntent.INVESTOR_RELATIONS
+SUPPORT = MessageIntent.TECHNICAL_SUPPORT
+
+# messages that are not in the training examples
+LABELLED = [
+    ("what is your name", GENERAL),
+    ("what is the weather", GENERAL),
+    ("who are you", GENERAL),
+    ("how is your day going", GENERAL),
+    ("hey there", GENERAL),
+    ("do you like cats", GENERAL),
+    ("what did you eat for lunch", GENERAL),
+    ("you're the best streamer", GENERAL),
+    ("can you tell me a story", GENERAL),
+    ("good night everyone", GENERAL),
+    ("what's your favorite anime", GENERAL),
+    ("how do I invest", IR),
+    ("how much is the token supply", IR),
+    ("who invested in the project", IR),
+    ("is the token listed on any exchange", IR),
+    ("how does the project earn revenue", IR),
+    ("what's the token utility", IR),
+    ("can I buy in the private round", IR),
+    ("the audio keeps cutting out", SUPPORT),
+    ("my tip didn't go through", SUPPORT),
+    ("the video is frozen", SUPPORT),
+    ("I get an error connecting my wallet", SUPPORT),
+    ("how do i fix the lag", SUPPORT),
+]
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return IntentClassifier()
+
+
+def test_accuracy(classifier):
+    correct = sum(classifier.classify(text).intent == intent for text, intent in LABELLED)
+    assert correct / len(LABELLED) >= 0.85
+
+
+@pytest.mark.parametrize("text", [text for text, intent in LABELLED if intent == GENERAL])
+def test_general_chat_is_not_confident_investor_relations(classifier, text):
+    # the server adds the IR context above 0.8
+    result = classifier.classify(text)
+    assert not (result.intent == IR and result.confidence > 0.8)
+
+
+def test_unknown_message_is_general_chat_without_confidence(classifier):
+    result = classifier.classify("who are you")
+    assert result.intent == GENERAL
+    assert result.confidence == 0.0
+    assert result.ir_category is None
+
+
+def test_investment_question_is_fundraising(classifier):
+    result = classifier.classify("how do I invest")
+    assert result.intent == IR
+    assert result.ir_category == "fundraising"
+    assert result.confidence > 0.8
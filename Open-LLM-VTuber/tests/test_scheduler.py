@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from scheduler import TurnPriority, TurnScheduler
+
+
+def test_turn_cancelled_while_another_releases_its_worker():
+    async def main():
+        scheduler = TurnScheduler(max_workers=1)
+        order = []
+        gate = asyncio.Event()
+
+        async def first():
+            await gate.wait()
+            # the waiting turn is cancelled, then this turn releases the worker in the same step
+            waiting.cancel()
+            order.append("first")
+
+        async def turn(name):
+            order.append(name)
+
+        running = asyncio.create_task(scheduler.run(TurnPriority.VOICE, "a", first))
+        waiting = asyncio.create_task(scheduler.run(TurnPriority.VOICE, "b", turn, "cancelled"))
+        later = asyncio.create_task(scheduler.run(TurnPriority.CHAT, "c", turn, "later"))
+        await asyncio.sleep(0)
+        gate.set()
+
+        await running
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        await asyncio.wait_for(later, 1)
+
+        assert order == ["first", "later"]
+        stats = scheduler.stats()
+        assert stats["running"] == 0
+        assert all(stats["classes"][name]["queued"] == 0 for name in ("voice", "tip", "chat"))
+
+    asyncio.run(main())
+
+
+def test_priority_order():
+    async def main():
+        scheduler = TurnScheduler(max_workers=1)
+        order = []
+        gate = asyncio.Event()
+
+        async def turn(name):
+            await gate.wait()
+            order.append(name)
+
+        tasks = [asyncio.create_task(scheduler.run(TurnPriority.CHAT, "busy", turn, "busy"))]
+        await asyncio.sleep(0)
+        for priority, session_id in [
+            (TurnPriority.CHAT, "chat"),
+            (TurnPriority.TIP, "tip"),
+            (TurnPriority.VOICE, "voice"),
+        ]:
+            tasks.append(asyncio.create_task(scheduler.run(priority, session_id, turn, session_id)))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*tasks)
+
+        assert order == ["busy", "voice", "tip", "chat"]
+
+    asyncio.run(main())
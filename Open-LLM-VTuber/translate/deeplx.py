@@ -1,4 +1,8 @@
-import httpx, json
+import json
+import threading
+from collections import OrderedDict
+from typing import List
+from llm.http_pool import get_async_http_client, get_http_client
 from .translate_interface import TranslateInterface
 
 class DeepLXTranslate(TranslateInterface):
@@ -6,21 +10,92 @@ class DeepLXTranslate(TranslateInterface):
     api_endpoint: str = "http://127.0.0.1:1188/v2/translate"
     target_lang: str = "JP"
 
-    def __init__(self, api_endpoint: str, target_lang: str):
+    def __init__(self, api_endpoint: str, target_lang: str, cache_size: int = 1024, timeout: float = 10.0):
+        """
+        Parameters:
+        - api_endpoint (str): The v2 translate endpoint of DeepLX.
+        - target_lang (str): The language to translate to.
+        - cache_size (int): Number of translations kept in the LRU cache. 0 turns the cache off.
+        - timeout (float): Timeout of the requests, in seconds.
+        """
         self.api_endpoint = api_endpoint
         self.target_lang = target_lang
+        self.cache_size = cache_size
+        self.timeout = timeout
+        # the requests go through the process-wide keep-alive pools of llm/http_pool.py (one per
+        # event loop for the async ones), instead of a new connection per sentence
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
 
     # translate v2 endpoint from DeepLX
     def translate(self, text: str) -> str:
-        try:
-            data = {"text": [text], "target_lang": self.target_lang}
-            post_data = json.dumps(data)
-            req = httpx.post(url=self.api_endpoint, data=post_data).text
-            res = json.loads(req)["translations"]
-            res = " ".join([d["text"] for d in res])
-        except Exception as e:
-            print(f"Error translating text: {e}")
-            print(f"Response: {req}")
-            raise e
-
-        return res
+        return self.translate_batch([text])[0]
+
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        """Translate several texts in one request (the v2 endpoint takes a list). Cached texts are not sent."""
+        results, missing = self._from_cache(texts)
+        if missing:
+            req = None
+            try:
+                req = get_http_client(self.api_endpoint).post(
+                    url=self.api_endpoint, content=self._request_body(missing), timeout=self.timeout
+                ).text
+                self._store(missing, self._parse(req, len(missing)), results)
+            except Exception as e:
+                print(f"Error translating text: {e}")
+                print(f"Response: {req}")
+                raise e
+        return [results[text] for text in texts]
+
+    async def atranslate_batch(self, texts: List[str]) -> List[str]:
+        """Same as `translate_batch`, with the async client."""
+        results, missing = self._from_cache(texts)
+        if missing:
+            req = None
+            try:
+                response = await get_async_http_client(self.api_endpoint).post(
+                    url=self.api_endpoint, content=self._request_body(missing), timeout=self.timeout
+                )
+                req = response.text
+                self._store(missing, self._parse(req, len(missing)), results)
+            except Exception as e:
+                print(f"Error translating text: {e}")
+                print(f"Response: {req}")
+                raise e
+        return [results[text] for text in texts]
+
+    def _request_body(self, texts: List[str]) -> str:
+        return json.dumps({"text": texts, "target_lang": self.target_lang})
+
+    @staticmethod
+    def _parse(response_text: str, count: int) -> List[str]:
+        translations = [d["text"] for d in json.loads(response_text)["translations"]]
+        if len(translations) != count:
+            raise ValueError(f"Expected {count} translations, got {len(translations)}")
+        return translations
+
+    def _from_cache(self, texts: List[str]) -> tuple[dict, List[str]]:
+        # (the cached translations, the distinct texts that are not cached)
+        results = {}
+        missing = []
+        with self._cache_lock:
+            for text in texts:
+                if text in results or text in missing:
+                    continue
+                if text in self._cache:
+                    self._cache.move_to_end(text)
+                    results[text] = self._cache[text]
+                else:
+                    missing.append(text)
+        return results, missing
+
+    def _store(self, texts: List[str], translations: List[str], results: dict) -> None:
+        results.update(zip(texts, translations))
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            for text, translation in zip(texts, translations):
+                self._cache[text] = translation
+                self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
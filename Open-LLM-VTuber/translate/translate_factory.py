@@ -8,7 +8,8 @@ class TranslateFactory:
         if translate_provider == "deeplx":
             return DeepLXTranslate(
                 api_endpoint=kwargs.get("DEEPLX_API_ENDPOINT"),
-                target_lang=kwargs.get("DEEPLX_TARGET_LANG")
+                target_lang=kwargs.get("DEEPLX_TARGET_LANG"),
+                cache_size=kwargs.get("DEEPLX_CACHE_SIZE", 1024),
             )
         else:
             raise ValueError(f"Unsupported translate provider: {translate_provider}")
\ No newline at end of file
@@ -1,4 +1,6 @@
 import abc
+import asyncio
+from typing import List
 
 
 class TranslateInterface(metaclass=abc.ABCMeta):
@@ -8,3 +10,17 @@ class TranslateInterface(metaclass=abc.ABCMeta):
         """
         Translate the input text to the target language."""
         raise NotImplementedError
+
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        """
+        Translate several texts to the target language, in order.
+        Translators that can send several texts in one request override this.
+        """
+        return [self.translate(text) for text in texts]
+
+    async def atranslate_batch(self, texts: List[str]) -> List[str]:
+        """
+        Same as `translate_batch`, without blocking the event loop.
+        Translators with an async client override this.
+        """
+        return await asyncio.to_thread(self.translate_batch, texts)
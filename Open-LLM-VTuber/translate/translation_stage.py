@@ -0,0 +1,85 @@
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Tuple
+
+from loguru import logger
+
+from .translate_interface import TranslateInterface
+
+
+class TranslationStage:
+    """
+    The translation step of the speech pipeline (TRANSLATE_AUDIO), between the sentence
+    segmentation and the TTS.
+
+    Sentences are translated on a thread of their own as soon as they are submitted, so the
+    translation of a sentence overlaps with the synthesis of the previous ones instead of being
+    part of it. The sentences that are waiting together when a request goes out (like while the
+    previous request is in flight) are sent in one `translate_batch` call.
+    """
+
+    def __init__(self, translator: TranslateInterface, max_batch: int = 8):
+        """
+        Parameters:
+        - translator (TranslateInterface): The translator.
+        - max_batch (int): Most sentences sent in one request.
+        """
+        self.translator = translator
+        self.max_batch = max(1, max_batch)
+        self._pending: Deque[Tuple[str, Future]] = deque()
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="translate")
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a sentence for translation.
+
+        Returns:
+        - Future: Its result is the translated sentence, or the sentence itself if the translation failed.
+        """
+        future = Future()
+        with self._condition:
+            if self._closed:
+                future.set_result(text)
+                return future
+            self._pending.append((text, future))
+            self._condition.notify()
+        return future
+
+    def close(self) -> None:
+        """No more sentences will be submitted. The queued ones are still translated."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def cancel(self) -> None:
+        """Drop the queued sentences, like after an interrupt."""
+        with self._condition:
+            self._closed = True
+            pending, self._pending = list(self._pending), deque()
+            self._condition.notify()
+        for _, future in pending:
+            future.cancel()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                batch = [
+                    self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))
+                ]
+            texts = [text for text, _ in batch]
+            try:
+                translations = self.translator.translate_batch(texts)
+            except Exception as e:
+                logger.error(f"Translation error: {e}")
+                translations = texts  # continue with the original text
+            for (_, future), translation in zip(batch, translations):
+                if future.set_running_or_notify_cancel():
+                    future.set_result(translation)
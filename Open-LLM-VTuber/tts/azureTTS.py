@@ -2,6 +2,7 @@ import sys
 import os
 import azure.cognitiveservices.speech as speechsdk
 from .tts_interface import TTSInterface
+from utils.cancellation import CancellationToken
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
@@ -12,6 +13,10 @@ class TTSEngine(TTSInterface):
     temp_audio_file = "temp"
     file_extension = "wav"
     new_audio_dir = "cache"
+    # raw PCM of memory_speech_config, for synthesize() and stream()
+    stream_sample_rate = 24000
+    # a synthesizer and a request to Azure per call
+    thread_safe = True
 
     def __init__(self, api_key, region, voice, pitch=0, rate=1.0):
         """
@@ -43,6 +48,13 @@ class TTSEngine(TTSInterface):
             use_default_speaker=True
         )
 
+        # same voice, raw PCM for synthesize()
+        self.memory_speech_config = speechsdk.SpeechConfig(subscription=api_key, region=region)
+        self.memory_speech_config.speech_synthesis_voice_name = voice
+        self.memory_speech_config.set_speech_synthesis_output_format(
+            speechsdk.SpeechSynthesisOutputFormat.Raw24Khz16BitMonoPcm
+        )
+
     def generate_audio(self, text, file_name_no_ext=None):
         """
         Generate speech audio file using TTS.
@@ -62,12 +74,92 @@ class TTSEngine(TTSInterface):
         self.__speak_with_audio_config(text, audio_config=file_audio_config)
         return file_name
 
+    def synthesize(self, text, cancel_token: CancellationToken | None = None):
+        """
+        Generate speech audio in memory: the audio data of the synthesis result, no file.
+        text: str
+            the text to speak
+        cancel_token: CancellationToken | None
+            stops the synthesis when cancelled
+
+        Returns:
+        tuple: (raw 16 bit PCM (bytes), sample rate)
+        """
+        result = self.__speak_with_audio_config(
+            text,
+            audio_config=None,
+            speech_config=self.memory_speech_config,
+            cancel_token=cancel_token,
+        )
+        if cancel_token is not None and cancel_token.cancelled:
+            raise InterruptedError("AzureTTS: speech synthesis cancelled")
+        if result is None or result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+            raise RuntimeError("AzureTTS: speech synthesis failed")
+        return result.audio_data, self.stream_sample_rate
+
+    def stream(self, text, cancel_token: CancellationToken | None = None):
+        """
+        Generate speech audio while Azure synthesizes it: the audio data stream of the
+        synthesis is read as soon as it starts, no file.
+        text: str
+            the text to speak
+        cancel_token: CancellationToken | None
+            stops the synthesis when cancelled
+
+        Returns:
+        Iterator[bytes]: raw 16 bit mono PCM at 24kHz
+        """
+        text = text.strip()
+        if not text:
+            return
+        speech_synthesizer = speechsdk.SpeechSynthesizer(
+            speech_config=self.memory_speech_config, audio_config=None
+        )
+        unregister = (
+            cancel_token.on_cancel(speech_synthesizer.stop_speaking_async)
+            if cancel_token is not None
+            else (lambda: None)
+        )
+        try:
+            result = speech_synthesizer.start_speaking_ssml_async(self.__ssml(text)).get()
+            audio_data_stream = speechsdk.AudioDataStream(result)
+            buffer = bytes(9600)  # 200ms
+            filled_size = audio_data_stream.read_data(buffer)
+            while filled_size > 0:
+                yield buffer[:filled_size]
+                filled_size = audio_data_stream.read_data(buffer)
+        finally:
+            unregister()
+        if cancel_token is not None and cancel_token.cancelled:
+            return
+        if audio_data_stream.status == speechsdk.StreamStatus.Canceled:
+            details = audio_data_stream.cancellation_details
+            raise RuntimeError(f"AzureTTS: speech synthesis canceled: {details.reason} {details.error_details}")
+
+    def __ssml(self, text):
+        """
+        Wrap the text with SSML to adjust pitch and rate
+        text: str
+            the text to speak
+        """
+        return f"""
+        <speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="en-US">
+            <voice name="{self.speech_config.speech_synthesis_voice_name}">
+                <prosody pitch="{self.pitch}%" rate="{self.rate}">
+                    {text}
+                </prosody>
+            </voice>
+        </speak>
+        """
+
     def __speak_with_audio_config(
         self,
         text,
         audio_config,
         on_speak_start_callback=None,
         on_speak_end_callback=None,
+        speech_config=None,
+        cancel_token=None,
     ):
         """
         speak the text with specified audio configuration
@@ -79,9 +171,16 @@ class TTSEngine(TTSInterface):
             the callback function to call when synthesis starts
         on_speak_end_callback: function
             the callback function to call when synthesis ends
+        speech_config: speechsdk.SpeechConfig
+            the speech configuration to use. Default is self.speech_config
+        cancel_token: CancellationToken
+            stops the synthesis when cancelled
+
+        Returns:
+        speechsdk.SpeechSynthesisResult: the result, or None if there was nothing to speak
         """
         speech_synthesizer = speechsdk.SpeechSynthesizer(
-            speech_config=self.speech_config, audio_config=audio_config
+            speech_config=speech_config or self.speech_config, audio_config=audio_config
         )
 
         # check if the text is empty or not a string
@@ -97,20 +196,20 @@ class TTSEngine(TTSInterface):
             return
 
         # Wrap the text with SSML to adjust pitch and rate
-        ssml_text = f"""
-        <speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="en-US">
-            <voice name="{self.speech_config.speech_synthesis_voice_name}">
-                <prosody pitch="{self.pitch}%" rate="{self.rate}">
-                    {text}
-                </prosody>
-            </voice>
-        </speak>
-        """
+        ssml_text = self.__ssml(text)
 
         if on_speak_start_callback is not None:
             on_speak_start_callback()
 
-        speech_synthesis_result = speech_synthesizer.speak_ssml(ssml_text)
+        unregister = (
+            cancel_token.on_cancel(speech_synthesizer.stop_speaking_async)
+            if cancel_token is not None
+            else (lambda: None)
+        )
+        try:
+            speech_synthesis_result = speech_synthesizer.speak_ssml(ssml_text)
+        finally:
+            unregister()
 
         if on_speak_end_callback is not None:
             on_speak_end_callback()
@@ -129,6 +228,7 @@ class TTSEngine(TTSInterface):
                 if cancellation_details.error_details:
                     print(f"Error details: {cancellation_details.error_details}")
                     print("Did you set the speech resource key and region values?")
+        return speech_synthesis_result
 
 
 if __name__ == "__main__":
@@ -69,6 +69,19 @@ class TTSEngine(TTSInterface):
 
         return file_name
 
+    def synthesize(self, text, cancel_token=None):
+        """
+        Generate speech audio in memory, without writing the wav file.
+        text: str
+            the text to speak
+        cancel_token: CancellationToken | None
+            unused, bark can't be stopped mid-sentence
+
+        Returns:
+        tuple: (float samples, sample rate)
+        """
+        return generate_audio(text, history_prompt=self.voice), SAMPLE_RATE
+
 
 def sample():
     # download and load all models
@@ -1,5 +1,6 @@
 import os
 from typing import Optional
+import numpy as np
 from TTS.api import TTS
 import torch
 from .tts_interface import TTSInterface
@@ -92,6 +93,31 @@ class TTSEngine(TTSInterface):
         except Exception as e:
             raise RuntimeError(f"Failed to generate audio: {str(e)}")
 
+    def synthesize(self, text: str, cancel_token=None):
+        """
+        Generate speech audio in memory with CoquiTTS.
+
+        Args:
+            text: Text to synthesize
+            cancel_token: Unused, the model can't be stopped mid-sentence
+
+        Returns:
+            Tuple of the float samples and the sample rate
+        """
+        try:
+            if self.is_multi_speaker and self.speaker_wav:
+                wav = self.tts.tts(
+                    text=text,
+                    speaker_wav=self.speaker_wav,
+                    language=self.language,
+                )
+            else:
+                wav = self.tts.tts(text=text)
+            return np.asarray(wav, dtype=np.float32), self.tts.synthesizer.output_sample_rate
+
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate audio: {str(e)}")
+
     @staticmethod
     def list_available_models() -> list:
         """
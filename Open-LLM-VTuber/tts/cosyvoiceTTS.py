@@ -4,6 +4,9 @@ from .tts_interface import TTSInterface
 
 class TTSEngine(TTSInterface):
 
+    # a request to the CosyVoice server per call
+    thread_safe = True
+
     def __init__(
         self,
         client_url="http://127.0.0.1:50000/",
@@ -3,7 +3,7 @@ import os
 from pathlib import Path
 
 import edge_tts
-from .tts_interface import TTSInterface
+from .tts_interface import TTSInterface, decode_to_pcm16
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
@@ -15,6 +15,11 @@ sys.path.append(current_dir)
 
 class TTSEngine(TTSInterface):
 
+    # edge-tts sends 24kHz MP3, decoded to PCM of the same rate
+    stream_sample_rate = 24000
+    # a request to edge-tts per call
+    thread_safe = True
+
     def __init__(self, voice="en-US-AvaMultilingualNeural"):
         self.voice = voice
 
@@ -50,6 +55,25 @@ class TTSEngine(TTSInterface):
 
         return file_name
 
+    def stream(self, text, cancel_token=None):
+        """
+        Generate speech audio while edge-tts sends it, instead of waiting for the full file.
+        text: str
+            the text to speak
+        cancel_token: CancellationToken | None
+            kills the decoder when cancelled, which ends the stream right away
+
+        Returns:
+        Iterator[bytes]: 16 bit mono PCM at 24kHz
+        """
+        communicate = edge_tts.Communicate(text, self.voice)
+        mp3_chunks = (
+            chunk["data"] for chunk in communicate.stream_sync() if chunk["type"] == "audio"
+        )
+        return decode_to_pcm16(
+            mp3_chunks, "mp3", self.stream_sample_rate, cancel_token=cancel_token
+        )
+
 
 # en-US-AvaMultilingualNeural
 # en-US-EmmaMultilingualNeural
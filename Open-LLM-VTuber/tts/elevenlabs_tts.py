@@ -1,11 +1,17 @@
-from typing import Optional
+from typing import Iterator, Optional
 from elevenlabs import Voice, VoiceSettings, play
 from elevenlabs.client import ElevenLabs
 from .tts_interface import TTSInterface
+from utils.cancellation import CancellationToken, cancellable
 import os
 from loguru import logger
 
 class ElevenLabsTTS(TTSInterface):
+    # `stream` asks for raw PCM at this rate (output format "pcm_24000")
+    stream_sample_rate = 24000
+    # a request to the ElevenLabs API per call
+    thread_safe = True
+
     def __init__(
         self,
         api_key: str,
@@ -70,6 +76,20 @@ class ElevenLabsTTS(TTSInterface):
             logger.error(f"ElevenLabs TTS generation failed: {e}")
             return None
 
+    def stream(self, text: str, cancel_token: CancellationToken | None = None) -> Iterator[bytes]:
+        """Generate audio as ElevenLabs streams it, as 16 bit mono PCM at 24kHz. The response is closed when cancelled."""
+        text_to_speech = self.client.text_to_speech
+        # `convert_as_stream` before elevenlabs 2.0
+        stream_request = getattr(text_to_speech, "stream", None) or text_to_speech.convert_as_stream
+        chunks = stream_request(
+            self.voice_id,
+            text=text,
+            model_id=self.model_id,
+            voice_settings=self.voice_settings,
+            output_format=f"pcm_{self.stream_sample_rate}",
+        )
+        return cancellable(chunks, cancel_token)
+
     def play_audio_file_local(self, file_path: str) -> None:
         """Play the audio file locally - not needed for web interface"""
         pass
@@ -1,6 +1,7 @@
 from typing import Literal
 from fish_audio_sdk import Session, TTSRequest
 from .tts_interface import TTSInterface
+from utils.cancellation import cancellable
 
 
 class TTSEngine(TTSInterface):
@@ -9,6 +10,10 @@ class TTSEngine(TTSInterface):
     """
 
     file_extension: str = "wav"
+    # sample rate of the PCM requested by `stream`
+    stream_sample_rate: int = 44100
+    # a request to the Fish Audio API per call
+    thread_safe: bool = True
 
     def __init__(
         self,
@@ -55,3 +60,26 @@ class TTSEngine(TTSInterface):
             return None
 
         return file_name
+
+    def stream(self, text, cancel_token=None):
+        """
+        Generate speech audio as the Fish TTS API sends it, as raw PCM.
+
+        Args:
+            text (str): The text to speak.
+
+            cancel_token (CancellationToken | None): Closes the response when cancelled.
+
+        Returns:
+            Iterator[bytes]: 16 bit mono PCM at `stream_sample_rate`.
+        """
+        chunks = self.session.tts(
+            TTSRequest(
+                text=text,
+                reference_id=self.reference_id,
+                latency=self.latency,
+                format="pcm",
+                sample_rate=self.stream_sample_rate,
+            )
+        )
+        return cancellable(chunks, cancel_token)
@@ -0,0 +1,155 @@
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Deque, Iterator, Tuple
+
+from loguru import logger
+
+
+class _Job:
+    def __init__(self, sentence: str, args: tuple):
+        self.sentence = sentence
+        self.args = args  # passed to `synthesize` after the sentence
+        self.future: Future | None = None  # None until the job is started
+
+
+class LookAheadSynthesizer:
+    """
+    Synthesizes the sentences of a response in parallel, up to `max_ahead` sentences ahead of
+    playback, and hands the results back in sentence order.
+
+    The producer calls `submit` for every sentence and `finish` at the end. The consumer iterates
+    `results()`, which waits for the next sentence in order (a reorder buffer), so a slow sentence
+    never changes the playback order and later sentences are already synthesized when it is done.
+    `cancel` drops the jobs that haven't started and discards the results of the others.
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[..., Any],
+        max_ahead: int = 3,
+        on_discard: Callable[[Any], None] | None = None,
+    ):
+        """
+        Parameters:
+        - synthesize (Callable[..., Any]): Synthesizes one sentence, like returning the path of an audio file.
+        - max_ahead (int): Number of sentences synthesized at the same time, counted from the one being played.
+        - on_discard (Callable[[Any], None] | None): Called with the results that are thrown away on `cancel`,
+          like to remove their audio files.
+        """
+        self.synthesize = synthesize
+        self.max_ahead = max(1, max_ahead)
+        self.on_discard = on_discard
+        self._executor = ThreadPoolExecutor(max_workers=self.max_ahead, thread_name_prefix="tts")
+        self._jobs: Deque[_Job] = deque()  # submitted and not handed out yet, in order
+        self._running = 0  # started jobs among `_jobs`
+        self._finished = False
+        self._cancelled = False
+        self._condition = threading.Condition()
+
+    def submit(self, sentence: str, *args: Any) -> None:
+        """
+        Queue the next sentence. It's started as soon as it is within `max_ahead` of playback.
+        `args` are passed to `synthesize` after the sentence, like the pending translation of it.
+        """
+        with self._condition:
+            if self._cancelled:
+                return
+            self._jobs.append(_Job(sentence, args))
+            self._start_ready()
+            self._condition.notify_all()
+
+    def finish(self) -> None:
+        """No more sentences will be submitted."""
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def results(
+        self,
+        should_stop: Callable[[], bool] | None = None,
+        poll_interval: float = 0.1,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield (sentence, result) in the order the sentences were submitted, until `finish` was called
+        and everything was handed out. The result is None if the synthesis failed.
+
+        Parameters:
+        - should_stop (Callable[[], bool] | None): Checked every `poll_interval` seconds while waiting.
+          When it returns True, everything is cancelled and InterruptedError is raised.
+        - poll_interval (float): How often `should_stop` is checked, in seconds.
+        """
+        while True:
+            with self._condition:
+                while not self._jobs and not self._finished and not self._cancelled:
+                    if should_stop is not None and should_stop():
+                        break
+                    self._condition.wait(poll_interval)
+                if self._cancelled or (not self._jobs and self._finished):
+                    return
+                job = self._jobs[0] if self._jobs else None
+
+            if job is None:
+                self.cancel()
+                raise InterruptedError("Look-ahead synthesis interrupted")
+
+            while True:
+                if should_stop is not None and should_stop():
+                    self.cancel()
+                    raise InterruptedError("Look-ahead synthesis interrupted")
+                try:
+                    result = job.future.result(timeout=poll_interval)
+                    break
+                except FutureTimeoutError:
+                    continue
+                except CancelledError:
+                    return
+                except Exception as e:
+                    logger.error(f"TTS failed for sentence '{job.sentence}': {e}")
+                    result = None
+                    break
+
+            with self._condition:
+                if self._cancelled:
+                    return  # `cancel` discards the result
+                self._jobs.popleft()
+                self._running -= 1
+                self._start_ready()
+            yield job.sentence, result
+
+    def cancel(self) -> None:
+        """Drop the queued sentences and discard the results that weren't handed out yet."""
+        with self._condition:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            jobs, self._jobs = list(self._jobs), deque()
+            self._condition.notify_all()
+        for job in jobs:
+            if job.future is not None and not job.future.cancel():
+                # already running or done, throw the result away when it's there
+                job.future.add_done_callback(self._discard_future)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        """Release the worker threads once the results were consumed."""
+        self._executor.shutdown(wait=False)
+
+    def _start_ready(self) -> None:
+        # called with the lock held: start the queued jobs that are within max_ahead of playback
+        for job in itertools.islice(self._jobs, self._running, self.max_ahead):
+            job.future = self._executor.submit(self.synthesize, job.sentence, *job.args)
+            self._running += 1
+
+    def _discard_future(self, future: Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            self._discard(future.result())
+
+    def _discard(self, result: Any) -> None:
+        if result is not None and self.on_discard is not None:
+            try:
+                self.on_discard(result)
+            except Exception as e:
+                logger.warning(f"Failed to discard TTS result {result}: {e}")
@@ -71,3 +71,17 @@ class TTSEngine(TTSInterface):
 
             nltk.download("averaged_perceptron_tagger_eng")
             return self.generate_audio(text, file_name_no_ext)
+
+    def synthesize(self, text, cancel_token=None):
+        """
+        Generate speech audio in memory. Without an output path, melo returns the samples.
+        text: str
+            the text to speak
+        cancel_token: CancellationToken | None
+            unused, melo can't be stopped mid-sentence
+
+        Returns:
+        tuple: (float samples, sample rate)
+        """
+        audio = self.model.tts_to_file(text, self.speaker_id, None, speed=self.speed)
+        return audio, self.model.hps.data.sampling_rate
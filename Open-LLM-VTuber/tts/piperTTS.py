@@ -1,8 +1,10 @@
 import os
+import json
 import threading
 import subprocess
 import platform
 from .tts_interface import TTSInterface
+from utils.cancellation import CancellationToken
 
 
 class TTSEngine(TTSInterface):
@@ -102,3 +104,37 @@ class TTSEngine(TTSInterface):
         thread = threading.Thread(target=run_piper_tts)
         thread.start()
         thread.join()
+
+    def synthesize(self, text: str, cancel_token: CancellationToken | None = None):
+        """
+        Generate speech audio in memory: piper writes raw 16 bit PCM to stdout, no file involved.
+        The piper process is killed if `cancel_token` is cancelled.
+
+        Returns:
+        tuple: (raw 16 bit PCM (bytes), sample rate of the voice)
+        """
+        with subprocess.Popen(
+            [self.piper_binary_path, "-m", self.voice_model_path, "--output_raw"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        ) as process:
+            unregister = (
+                cancel_token.on_cancel(process.kill) if cancel_token is not None else (lambda: None)
+            )
+            try:
+                stdout, stderr = process.communicate(input=text.encode("utf-8"))
+            finally:
+                unregister()
+        if cancel_token is not None and cancel_token.cancelled:
+            raise InterruptedError("Piper TTS cancelled")
+        if process.returncode != 0:
+            raise RuntimeError(
+                f"Error running Piper TTS command: {stderr.decode(errors='replace')}"
+            )
+        return stdout, self._voice_sample_rate()
+
+    def _voice_sample_rate(self) -> int:
+        """The sample rate of the voice, from the .onnx.json file next to the model."""
+        with open(f"{self.voice_model_path}.json", "r", encoding="utf-8") as f:
+            return json.load(f)["audio"]["sample_rate"]
@@ -16,6 +16,9 @@ sys.path.append(current_dir)
 
 class TTSEngine(TTSInterface):
 
+    # generate_audio holds self.lock
+    thread_safe = True
+
     def __init__(self):
         self.engine = pyttsx3.init()
         self.temp_audio_file = "temp"
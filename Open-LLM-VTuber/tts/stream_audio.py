@@ -1,21 +1,32 @@
 import base64
+import uuid
+from typing import Iterator
+import numpy as np
 from pydub import AudioSegment
 from pydub.utils import make_chunks
 
+from .tts_interface import AudioData
+
 
 class AudioPayloadPreparer:
     """
     A class to handle preparation of audio payloads for streaming.
     """
 
-    def __init__(self, chunk_length_ms: int = 20):
+    # codec of the binary audio frames: raw 16 bit little endian mono PCM
+    STREAM_CODEC = "pcm_s16le"
+
+    def __init__(self, chunk_length_ms: int = 20, slices_per_frame: int = 25):
         """
         Initializes the AudioPayloadPreparer object with constant parameters.
 
         Parameters:
             chunk_length_ms (int): The length of each audio chunk in milliseconds.
+            slices_per_frame (int): Number of `chunk_length_ms` slices in one binary audio frame
+                (only used by `prepare_audio_stream`). Defaults to 25 slices (500ms with 20ms slices).
         """
         self.chunk_length_ms: int = chunk_length_ms
+        self.slices_per_frame: int = slices_per_frame
 
     def __get_volume_by_chunks(self, audio):
         """
@@ -35,7 +46,7 @@ class AudioPayloadPreparer:
         return [volume / max_volume for volume in volumes]
 
     def prepare_audio_payload(
-        self, audio_path, display_text=None, expression_list=None
+        self, audio_path, display_text=None, expression_list=None, volumes=None
     ):
         """
         Prepares the audio payload for sending to a broadcast endpoint.
@@ -44,6 +55,8 @@ class AudioPayloadPreparer:
             audio_path (str): The path to the audio file to be processed.
             display_text (str, optional): Text to be displayed with the audio.
             expression_list (list, optional): List of expressions associated with the audio.
+            volumes (list, optional): The volume envelope of the audio if it is known already
+                (like from the TTS cache), in slices of `chunk_length_ms`.
 
         Returns:
             tuple: A tuple containing the prepared payload (dict) and the audio duration (float).
@@ -54,7 +67,8 @@ class AudioPayloadPreparer:
         audio = AudioSegment.from_file(audio_path)
         audio_bytes = audio.export(format="wav").read()
         audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
-        volumes = self.__get_volume_by_chunks(audio)
+        if volumes is None:
+            volumes = self.__get_volume_by_chunks(audio)
 
         payload = {
             "type": "audio",
@@ -67,6 +81,182 @@ class AudioPayloadPreparer:
 
         return payload, audio.duration_seconds
 
+    def prepare_audio_stream(
+        self, audio_path, display_text=None, expression_list=None, volumes=None
+    ) -> tuple[dict, Iterator[bytes], float]:
+        """
+        Prepares the audio for the binary output mode: a small JSON header followed by
+        binary frames of raw PCM, instead of one JSON message with base64 audio in it.
+
+        The header looks like:
+        {
+            "type": "audio-stream-start",
+            "stream_id": "...",
+            "codec": "pcm_s16le",
+            "sample_rate": 24000,
+            "channels": 1,
+            "slice_length": 20,
+            "volumes": [...],
+            "text": "...",
+            "expressions": [...]
+        }
+        Each binary frame holds `slices_per_frame * slice_length` ms of audio (the last one can be shorter).
+        After the last frame, the caller should send the message returned by `audio_stream_end(stream_id)`.
+
+        Parameters:
+            audio_path (str): The path to the audio file to be processed.
+            display_text (str, optional): Text to be displayed with the audio.
+            expression_list (list, optional): List of expressions associated with the audio.
+            volumes (list, optional): The volume envelope of the audio if it is known already.
+
+        Returns:
+            tuple: (header (dict), binary frames (Iterator[bytes]), audio duration in seconds (float)).
+        """
+        if not audio_path:
+            raise ValueError("audio_path cannot be None or empty.")
+
+        samples, sample_rate = self._load_pcm(audio_path)
+        return self.prepare_pcm_stream(
+            samples, sample_rate, display_text, expression_list, volumes
+        )
+
+    def compute_volumes(self, audio_path) -> list:
+        """
+        Compute the volume envelope of an audio file, like it is sent with the audio.
+
+        Parameters:
+            audio_path (str): The path to the audio file.
+
+        Returns:
+            list: Normalized volumes of each `chunk_length_ms` slice.
+        """
+        samples, sample_rate = self._load_pcm(audio_path)
+        return self.compute_pcm_volumes(samples, sample_rate)
+
+    @staticmethod
+    def _load_pcm(audio_path) -> tuple[np.ndarray, int]:
+        """Decode an audio file to int16 mono samples and their sample rate."""
+        audio = AudioSegment.from_file(audio_path).set_channels(1).set_sample_width(2)
+        return np.frombuffer(audio.raw_data, dtype="<i2"), audio.frame_rate
+
+    def prepare_pcm_payload(
+        self, samples: np.ndarray, sample_rate: int, display_text=None, expression_list=None, volumes=None
+    ) -> tuple[dict, float]:
+        """
+        Same as `prepare_audio_payload`, for audio that is in memory already (int16 mono samples),
+        like from `TTSInterface.synthesize`. Nothing is read from disk or decoded.
+
+        Returns:
+            tuple: A tuple containing the prepared payload (dict) and the audio duration (float).
+        """
+        if volumes is None:
+            volumes = self.compute_pcm_volumes(samples, sample_rate)
+        audio_bytes = AudioData(samples, sample_rate).to_wav_bytes()
+        payload = {
+            "type": "audio",
+            "audio": base64.b64encode(audio_bytes).decode("utf-8"),
+            "volumes": volumes,
+            "slice_length": self.chunk_length_ms,
+            "text": display_text,
+            "expressions": expression_list,
+        }
+        return payload, len(samples) / sample_rate
+
+    def prepare_pcm_stream(
+        self, samples: np.ndarray, sample_rate: int, display_text=None, expression_list=None, volumes=None
+    ) -> tuple[dict, Iterator[bytes], float]:
+        """
+        Build the header and the binary frames of `prepare_audio_stream` from int16 mono samples,
+        like the audio from `TTSInterface.synthesize`.
+        """
+        slice_samples = max(1, sample_rate * self.chunk_length_ms // 1000)
+        if volumes is None:
+            volumes = self.__get_volume_by_slices(samples, slice_samples)
+        header = self.audio_stream_header(sample_rate, display_text, expression_list, volumes)
+        frame_samples = slice_samples * self.slices_per_frame
+        pcm = samples.astype("<i2", copy=False)
+
+        def _frames():
+            for start in range(0, len(pcm), frame_samples):
+                yield pcm[start : start + frame_samples].tobytes()
+
+        return header, _frames(), len(pcm) / sample_rate
+
+    def audio_stream_header(
+        self, sample_rate: int, display_text=None, expression_list=None, volumes=None
+    ) -> dict:
+        """
+        The "audio-stream-start" header of a binary audio stream (see `prepare_audio_stream`).
+        For audio that is streamed while it is synthesized, `volumes` is None: the header has
+        an empty list and `"streaming": true`, and the volumes come with `audio_stream_end`.
+
+        Parameters:
+            sample_rate (int): The sample rate of the PCM frames.
+            display_text (str, optional): Text to be displayed with the audio.
+            expression_list (list, optional): List of expressions associated with the audio.
+            volumes (list, optional): The volume envelope of the audio.
+
+        Returns:
+            dict: The header, with a new `stream_id`.
+        """
+        header = {
+            "type": "audio-stream-start",
+            "stream_id": uuid.uuid4().hex,
+            "codec": self.STREAM_CODEC,
+            "sample_rate": sample_rate,
+            "channels": 1,
+            "slice_length": self.chunk_length_ms,
+            "volumes": volumes if volumes is not None else [],
+            "text": display_text,
+            "expressions": expression_list,
+        }
+        if volumes is None:
+            header["streaming"] = True
+        return header
+
+    def compute_pcm_volumes(self, samples: np.ndarray, sample_rate: int) -> list:
+        """
+        Compute the volume envelope of int16 mono samples, like it is sent with the audio.
+
+        Returns:
+            list: Normalized volumes of each `chunk_length_ms` slice.
+        """
+        return self.__get_volume_by_slices(
+            samples, max(1, sample_rate * self.chunk_length_ms // 1000)
+        )
+
+    @staticmethod
+    def audio_stream_end(stream_id: str, volumes=None) -> dict:
+        """
+        Parameters:
+            stream_id (str): The id from the header.
+            volumes (list, optional): The volume envelope of a stream that was sent while it was synthesized.
+
+        Returns:
+            dict: The message that closes the binary audio stream `stream_id`.
+        """
+        message = {"type": "audio-stream-end", "stream_id": stream_id}
+        if volumes is not None:
+            message["volumes"] = volumes
+        return message
+
+    def __get_volume_by_slices(self, samples: np.ndarray, slice_samples: int) -> list:
+        """
+        Same as `__get_volume_by_chunks`, computed on int16 samples with numpy.
+        """
+        if len(samples) == 0:
+            raise ValueError("Audio is empty or all zero.")
+        padded = np.zeros(-(-len(samples) // slice_samples) * slice_samples, dtype=np.float64)
+        padded[: len(samples)] = samples
+        slices = padded.reshape(-1, slice_samples)
+        counts = np.full(len(slices), slice_samples, dtype=np.float64)
+        counts[-1] = len(samples) - (len(slices) - 1) * slice_samples
+        volumes = np.sqrt((slices**2).sum(axis=1) / counts)
+        max_volume = volumes.max()
+        if max_volume == 0:
+            raise ValueError("Audio is empty or all zero.")
+        return (volumes / max_volume).tolist()
+
 
 # Example usage:
 # preparer = AudioPayloadPreparer()
@@ -0,0 +1,290 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from loguru import logger
+
+from .stream_audio import AudioPayloadPreparer
+from .tts_interface import AudioData
+
+
+class _Entry:
+    def __init__(self, audio_path: str, size: int):
+        self.audio_path = audio_path
+        self.size = size
+
+
+class TTSCache:
+    """
+    A persistent cache of synthesized phrases, so a sentence that was spoken before (greetings,
+    tip thank-yous...) is not sent to the TTS again.
+
+    Entries are keyed by a hash of the TTS engine, its config (voice, speed...) and the normalized
+    text. Each entry is the audio file as the engine wrote it, plus a JSON file with the volume
+    envelope used for lip sync, so it doesn't have to be computed again either. The entries stay
+    in `cache_dir` across restarts. When they take more than `max_mb`, the least recently used
+    ones are removed.
+
+    `get` hands out a link (or a copy) of the cached audio under `output_dir`,
+    which the caller can delete after playing it like any other TTS output.
+    """
+
+    META_EXTENSION = ".json"
+
+    def __init__(
+        self,
+        cache_dir: str = "./tts_cache",
+        max_mb: float = 256,
+        output_dir: str = "./cache",
+        slice_length: int = 20,
+        max_envelopes: int = 256,
+    ):
+        """
+        Parameters:
+        - cache_dir (str): Where the entries are kept. Should not be `output_dir`, which is cleared on exit.
+        - max_mb (float): Size budget of the cached audio, in megabytes.
+        - output_dir (str): Where the audio handed out by `get` and `put` goes.
+        - slice_length (int): Length in ms of the slices of the volume envelope, like `AudioPayloadPreparer.chunk_length_ms`.
+        - max_envelopes (int): Number of handed out files whose envelope is remembered for `volumes_for`.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.output_dir = output_dir
+        self.slice_length = slice_length
+        self.max_envelopes = max_envelopes
+        self.hits = 0
+        self.misses = 0
+        self._preparer = AudioPayloadPreparer(chunk_length_ms=slice_length)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()  # least recently used first
+        self._size = 0
+        self._envelopes: "OrderedDict[str, List[float]]" = OrderedDict()  # handed out path -> volumes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def key(engine: str, params: Dict[str, Any], text: str) -> str:
+        """
+        Parameters:
+        - engine (str): The name of the TTS engine.
+        - params (Dict[str, Any]): The config of the engine, like the voice.
+        - text (str): The text that is spoken. Spaces are normalized.
+
+        Returns:
+        - str: The cache key.
+        """
+        normalized = " ".join(text.split())
+        material = json.dumps([engine, params, normalized], sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns:
+        - str | None: The path of a fresh file with the cached audio of `key` in `output_dir`, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        try:
+            path = self._hand_out(entry.audio_path)
+            os.utime(entry.audio_path)  # the recency survives restarts
+        except OSError:
+            # removed by another process sharing the cache
+            self._forget(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        volumes = self._read_volumes(key)
+        if volumes is None:
+            volumes = self._compute_volumes(key, entry.audio_path)
+        if volumes is not None:
+            self._remember_envelope(path, volumes)
+        return path
+
+    def put(self, key: str, audio_path: str) -> None:
+        """
+        Add the audio file the TTS just wrote to the cache. The file itself stays where it is.
+        The volume envelope is computed on the first hit, to keep this cheap on the way to playback.
+
+        Parameters:
+        - key (str): The key from `key`.
+        - audio_path (str): The audio file.
+        """
+        extension = os.path.splitext(audio_path)[1]
+        cached_path = os.path.join(self.cache_dir, key + extension)
+        tmp_path = f"{cached_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            _link_or_copy(audio_path, tmp_path)
+            os.replace(tmp_path, cached_path)
+        except OSError as e:
+            logger.warning(f"Failed to cache TTS audio {audio_path}: {e}")
+            return
+        self._add(key, cached_path)
+
+    def put_audio(self, key: str, audio: AudioData) -> None:
+        """
+        Add audio synthesized in memory to the cache, as a WAV file.
+
+        Parameters:
+        - key (str): The key from `key`.
+        - audio (AudioData): The audio.
+        """
+        cached_path = os.path.join(self.cache_dir, key + ".wav")
+        tmp_path = f"{cached_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(audio.to_wav_bytes())
+            os.replace(tmp_path, cached_path)
+        except OSError as e:
+            logger.warning(f"Failed to cache TTS audio: {e}")
+            return
+        self._add(key, cached_path)
+
+    def volumes_for(self, path: str) -> List[float] | None:
+        """
+        Returns:
+        - List[float] | None: The volume envelope (slices of `slice_length` ms) of a file handed out by
+          `get`, or None if it isn't known. Each envelope is only returned once.
+        """
+        with self._lock:
+            return self._envelopes.pop(path, None)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+        - dict: Hits, misses, number of entries and their size in bytes.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._size,
+        }
+
+    def _add(self, key: str, cached_path: str) -> None:
+        try:
+            size = os.path.getsize(cached_path)
+        except OSError:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old.size
+                if old.audio_path != cached_path:
+                    _remove_quietly(old.audio_path)
+            self._entries[key] = _Entry(cached_path, size)
+            self._size += size
+            evicted = self._evict()
+        for evicted_key, entry in evicted:
+            self._remove_files(evicted_key, entry)
+
+    def _load(self) -> None:
+        found: List[Tuple[float, str, _Entry]] = []
+        for name in os.listdir(self.cache_dir):
+            key, extension = os.path.splitext(name)
+            path = os.path.join(self.cache_dir, name)
+            if extension == ".tmp":
+                _remove_quietly(path)  # left over from a crash
+                continue
+            if extension == self.META_EXTENSION:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.append((stat.st_mtime, key, _Entry(path, stat.st_size)))
+        for _, key, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[key] = entry
+            self._size += entry.size
+        for key, entry in self._evict():
+            self._remove_files(key, entry)
+        logger.info(f"TTS cache: {len(self._entries)} phrases, {self._size / 1024 / 1024:.1f} MB in {self.cache_dir}")
+
+    def _evict(self) -> List[Tuple[str, _Entry]]:
+        # called with the lock held
+        evicted = []
+        while self._size > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+            evicted.append((key, entry))
+        return evicted
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry.size
+
+    def _remove_files(self, key: str, entry: _Entry) -> None:
+        for path in (entry.audio_path, os.path.join(self.cache_dir, key + self.META_EXTENSION)):
+            _remove_quietly(path)
+
+    def _hand_out(self, cached_path: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, uuid.uuid4().hex + os.path.splitext(cached_path)[1])
+        _link_or_copy(cached_path, path)
+        return path
+
+    def _read_volumes(self, key: str) -> List[float] | None:
+        try:
+            with open(os.path.join(self.cache_dir, key + self.META_EXTENSION), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("slice_length") != self.slice_length:
+            return None
+        return meta.get("volumes")
+
+    def _compute_volumes(self, key: str, cached_path: str) -> List[float] | None:
+        try:
+            volumes = self._preparer.compute_volumes(cached_path)
+            self._write_json(
+                os.path.join(self.cache_dir, key + self.META_EXTENSION),
+                {"slice_length": self.slice_length, "volumes": volumes},
+            )
+            return volumes
+        except Exception as e:
+            # the envelope is computed on playback then
+            logger.debug(f"No volume envelope for {cached_path}: {e}")
+            return None
+
+    def _remember_envelope(self, path: str, volumes: List[float]) -> None:
+        with self._lock:
+            self._envelopes[path] = volumes
+            while len(self._envelopes) > self.max_envelopes:
+                self._envelopes.popitem(last=False)
+
+    @staticmethod
+    def _write_json(path: str, data: dict) -> None:
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+
+def _link_or_copy(source: str, destination: str) -> None:
+    """Hard link `source` to `destination`, or copy it where links are not supported."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Failed to remove cached TTS file {path}: {e}")
@@ -1,10 +1,240 @@
 import abc
+import io
 import os
+import queue
+import subprocess
+import threading
+import uuid
+import wave
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+import numpy as np
+from loguru import logger
 from playsound3 import playsound
 
+from utils.cancellation import CancellationToken
+
+
+class AudioData(NamedTuple):
+    """Synthesized speech kept in memory: 16 bit mono samples and their sample rate."""
+
+    samples: np.ndarray  # int16
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    def to_wav_bytes(self) -> bytes:
+        """Returns: bytes: the audio as a WAV file."""
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(self.samples.astype("<i2", copy=False).tobytes())
+        return buffer.getvalue()
+
+
+def to_pcm16(audio: np.ndarray | bytes) -> np.ndarray:
+    """
+    Convert the audio returned by `TTSInterface.synthesize` to int16 mono samples.
+
+    audio: np.ndarray | bytes
+        int16 samples, float samples in [-1, 1], or raw 16 bit little endian PCM bytes
+    """
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return np.frombuffer(audio, dtype="<i2")
+    audio = np.asarray(audio)
+    if audio.ndim > 1:
+        audio = np.squeeze(audio)
+        if audio.ndim > 1:  # (samples, channels)
+            audio = audio.mean(axis=1)
+    if audio.dtype == np.int16:
+        return audio
+    if np.issubdtype(audio.dtype, np.floating):
+        return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    return audio.astype(np.int16)
+
+
+class AudioStream:
+    """
+    Speech that is still being synthesized, from `TTSInterface.stream`.
+
+    A background thread reads the chunks of 16 bit mono PCM from the engine as they are produced,
+    so the synthesis goes on while the first chunks are already forwarded to the client.
+    Iterate the stream to get the chunks in order (each one holds whole samples), or call
+    `read_all` to wait for the whole audio.
+    """
+
+    _END = None
+
+    def __init__(
+        self,
+        chunks: Iterator[bytes],
+        sample_rate: int,
+        on_complete: Callable[[AudioData], None] | None = None,
+        cancel_token: CancellationToken | None = None,
+    ):
+        """
+        Parameters:
+        - chunks (Iterator[bytes]): Raw 16 bit little endian mono PCM, in chunks of any size.
+        - sample_rate (int): The sample rate of the PCM.
+        - on_complete (Callable[[AudioData], None] | None): Called with the whole audio when the engine
+          is done, like to put it in the TTS cache. Not called if the synthesis failed or was closed.
+        - cancel_token (CancellationToken | None): Closes the stream when cancelled.
+        """
+        self.sample_rate = sample_rate
+        self.on_complete = on_complete
+        self._chunks = chunks
+        self._queue: queue.Queue[bytes | None] = queue.Queue()
+        self._parts: list[bytes] = []
+        self._error: Exception | None = None
+        self._closed = False
+        self._done = threading.Event()
+        self._unregister_cancel = (
+            cancel_token.on_cancel(self.close) if cancel_token is not None else (lambda: None)
+        )
+        threading.Thread(target=self._pump, daemon=True, name="tts-stream").start()
+
+    def __iter__(self) -> Iterator[bytes]:
+        """
+        Yield the PCM chunks as they arrive.
+
+        Raises:
+        - The error of the engine, after the chunks that arrived before it.
+        """
+        while True:
+            chunk = self._queue.get()
+            if chunk is self._END:
+                break
+            yield chunk
+        if self._error is not None:
+            raise self._error
+
+    def read_all(self) -> AudioData:
+        """Wait for the end of the synthesis and return the whole audio."""
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self.audio()
+
+    def audio(self) -> AudioData:
+        """The audio that arrived so far."""
+        return AudioData(np.frombuffer(b"".join(self._parts), dtype="<i2"), self.sample_rate)
+
+    def close(self) -> None:
+        """
+        Stop the synthesis and drop the audio, like after an interrupt. An iteration of the stream
+        ends right away, the engine stops at its next chunk (or right away if it was cancelled too).
+        """
+        self._closed = True
+        self._queue.put(self._END)
+
+    def _pump(self) -> None:
+        pending = b""  # odd byte of a sample split across two chunks
+        try:
+            for chunk in self._chunks:
+                if self._closed:
+                    break
+                chunk = pending + chunk
+                usable = len(chunk) - len(chunk) % 2
+                pending = chunk[usable:]
+                if usable:
+                    self._parts.append(chunk[:usable])
+                    self._queue.put(chunk[:usable])
+        except Exception as e:
+            logger.error(f"TTS stream failed: {e}")
+            self._error = e
+        finally:
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()  # stops the engine if we stopped early
+            self._unregister_cancel()
+            self._done.set()
+            self._queue.put(self._END)
+        if self._error is None and not self._closed and self.on_complete is not None:
+            try:
+                self.on_complete(self.audio())
+            except Exception as e:
+                logger.warning(f"TTS stream completion callback failed: {e}")
+
+
+def decode_to_pcm16(
+    chunks: Iterable[bytes],
+    input_format: str,
+    sample_rate: int,
+    read_size: int = 4800,
+    cancel_token: CancellationToken | None = None,
+) -> Iterator[bytes]:
+    """
+    Decode a stream of encoded audio (like MP3 from a network TTS) to 16 bit mono PCM with ffmpeg,
+    yielding the PCM while the input is still arriving.
+
+    chunks: Iterable[bytes]
+        the encoded audio
+    input_format: str
+        the ffmpeg name of the input format, like "mp3"
+    sample_rate: int
+        the sample rate of the PCM
+    read_size: int
+        the largest PCM chunk yielded, in bytes
+    cancel_token: CancellationToken | None
+        kills ffmpeg when cancelled, which ends the PCM right away
+    """
+    process = subprocess.Popen(
+        [
+            "ffmpeg", "-loglevel", "error", "-analyzeduration", "0",
+            "-f", input_format, "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1",
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    errors = []
+
+    def _feed():
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+                process.stdin.flush()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    feeder = threading.Thread(target=_feed, daemon=True, name="tts-decode")
+    feeder.start()
+    unregister = cancel_token.on_cancel(process.kill) if cancel_token is not None else (lambda: None)
+    try:
+        while True:
+            data = process.stdout.read1(read_size)
+            if not data:
+                break
+            yield data
+    finally:
+        unregister()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+    if cancel_token is not None and cancel_token.cancelled:
+        return  # the feeder failed on the killed process, or is still waiting for the input
+    feeder.join()
+    if errors:
+        raise errors[0]
+
 
 class TTSInterface(metaclass=abc.ABCMeta):
 
+    # Sample rate of the 16 bit mono PCM chunks yielded by `stream`. None if the engine can't stream.
+    stream_sample_rate: int | None = None
+    # True if the engine can synthesize in several threads at once (like a network client).
+    # The engine pool runs the others one call at a time.
+    thread_safe: bool = False
+
     @abc.abstractmethod
     def generate_audio(self, text: str, file_name_no_ext=None) -> str:
         """
@@ -20,6 +250,60 @@ class TTSInterface(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError
 
+    def synthesize(
+        self, text: str, cancel_token: CancellationToken | None = None
+    ) -> tuple[np.ndarray | bytes, int]:
+        """
+        Generate speech audio in memory, without a file.
+        Engines that can get the audio without writing a file override this. This default
+        runs `generate_audio` and reads the file back, so every engine supports it.
+
+        text: str
+            the text to speak
+        cancel_token: CancellationToken | None
+            cancelled when the user interrupts. Engines that synthesize in a subprocess or over the
+            network abort it then (kill the process, close the request) and raise InterruptedError.
+            The others can ignore it, the caller throws the audio away.
+
+        Returns:
+        tuple: (audio, sample rate). The audio is mono: int16 or float samples (np.ndarray),
+        or raw 16 bit little endian PCM (bytes).
+        """
+        from pydub import AudioSegment
+
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        filepath = self.generate_audio(text, file_name_no_ext=uuid.uuid4().hex)
+        if not filepath:
+            raise RuntimeError(f"{type(self).__name__} generated no audio")
+        try:
+            audio = AudioSegment.from_file(filepath).set_channels(1).set_sample_width(2)
+        finally:
+            self.remove_file(filepath, verbose=False)
+        return np.frombuffer(audio.raw_data, dtype="<i2"), audio.frame_rate
+
+    @property
+    def can_stream(self) -> bool:
+        """True if the engine implements `stream`."""
+        return self.stream_sample_rate is not None
+
+    def stream(self, text: str, cancel_token: CancellationToken | None = None) -> Iterator[bytes]:
+        """
+        Generate speech audio incrementally: yield the audio while it is being synthesized, so it
+        can be played before the whole sentence is done. Engines that get their audio in chunks
+        (like over the network) override this and set `stream_sample_rate`.
+
+        text: str
+            the text to speak
+        cancel_token: CancellationToken | None
+            cancelled when the user interrupts: the iterator ends early and the engine stops
+            the synthesis (closes the response, kills the decoder...)
+
+        Returns:
+        Iterator[bytes]: raw 16 bit little endian mono PCM at `stream_sample_rate`, in chunks of any size
+        """
+        raise NotImplementedError(f"{type(self).__name__} can't stream audio")
+
     def remove_file(self, filepath: str, verbose: bool = True) -> None:
         """
         Remove a file from the file system.
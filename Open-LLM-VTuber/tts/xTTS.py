@@ -4,6 +4,10 @@ from tts.tts_interface import TTSInterface
 
 
 class TTSEngine(TTSInterface):
+
+    # a request to the XTTS API server per call
+    thread_safe = True
+
     def __init__(
         self,
         api_url: str = "http://127.0.0.1:8020/tts_to_audio",
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable, Iterable, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+_END = object()
+
+
+async def iterate_in_executor(
+    iterable: Iterable[T] | Callable[[], Iterable[T]], executor: Executor | None = None
+) -> AsyncIterator[T]:
+    """
+    Iterate a blocking iterable (like the token stream of an LLM with a sync client, or an
+    AudioStream) from the event loop.
+
+    One executor thread reads the whole iterable and hands the items to the loop as they arrive,
+    instead of one executor job per item. When the async iteration stops early, the reading stops
+    at the next item and the iterable is closed (if it has a `close`) on that thread.
+
+    Parameters:
+    - iterable (Iterable[T] | Callable[[], Iterable[T]]): The blocking iterable, or a function that
+      returns it when getting it blocks too (like sending the LLM request). The function is
+      called on the executor thread.
+    - executor (Executor | None): Where to read it. None for the loop's default executor.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def _hand_over(item, error=None) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            stop.set()  # the loop is closed
+
+    def _read() -> None:
+        try:
+            iterator = iter(iterable() if callable(iterable) else iterable)
+        except Exception as e:
+            _hand_over(_END, e)
+            return
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                _hand_over(item)
+        except Exception as e:
+            _hand_over(_END, e)
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if stop.is_set() and close is not None:
+                try:
+                    close()
+                except Exception as e:
+                    logger.debug(f"Closing an abandoned iterator failed: {e}")
+        _hand_over(_END)
+
+    loop.run_in_executor(executor, _read)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
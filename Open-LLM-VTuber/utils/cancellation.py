@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class CancellationToken:
+    """
+    Cancels the work of one conversation turn (the LLM stream, the TTS jobs...) when the user
+    interrupts it.
+
+    The code doing the work registers a callback with `on_cancel` that aborts its blocking call
+    (like closing the HTTP response it is reading or killing its subprocess), and checks
+    `cancelled` between steps. `cancel` runs the callbacks on the thread that cancels, so the
+    work stops right away instead of when the next token or chunk arrives.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        # time.perf_counter() when `cancel` was called
+        self.cancelled_at: float | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Cancel the work and run the registered callbacks. Only the first call does something."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.cancelled_at = time.perf_counter()
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancellation callback failed: {e}")
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Call `callback` when the token is cancelled, or now if it already is.
+
+        Parameters:
+        - callback (Callable[[], None]): Aborts the work, like `response.close`. It runs on the
+          thread that cancels, so it must be thread safe.
+
+        Returns:
+        - Callable[[], None]: Unregisters the callback, to call when the work is done.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    def raise_if_cancelled(self) -> None:
+        """
+        Raises:
+        - InterruptedError: If the token is cancelled.
+        """
+        if self._event.is_set():
+            raise InterruptedError("Cancelled")
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait until the token is cancelled. Returns True if it is."""
+        return self._event.wait(timeout)
+
+
+def cancellable(
+    iterable: Iterable[T],
+    cancel_token: CancellationToken | None,
+    close: Callable[[], None] | None = None,
+) -> Iterator[T]:
+    """
+    Iterate `iterable` until `cancel_token` is cancelled.
+
+    Parameters:
+    - iterable (Iterable[T]): Like the chunks of a streamed HTTP response.
+    - cancel_token (CancellationToken | None): The token. None to iterate everything.
+    - close (Callable[[], None] | None): Aborts the blocking read of the next item when the token
+      is cancelled, like the `close` of the response. The error this makes the read raise is
+      not propagated.
+
+    Once cancelled, the iterator of `iterable` is closed too (if it has a `close`), so a generator
+    reading a response releases it.
+    """
+    if cancel_token is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    unregister = cancel_token.on_cancel(close) if close is not None else (lambda: None)
+    try:
+        for item in iterator:
+            if cancel_token.cancelled:
+                return
+            yield item
+    except Exception:
+        if cancel_token.cancelled:
+            return  # the read failed because `close` aborted it
+        raise
+    finally:
+        unregister()
+        close_iterator = getattr(iterator, "close", None)
+        if cancel_token.cancelled and close_iterator is not None:
+            try:
+                close_iterator()
+            except Exception as e:
+                logger.debug(f"Closing a cancelled iterator failed: {e}")
+
+
+async def acancellable(
+    aiterable: AsyncIterable[T],
+    cancel_token: CancellationToken | None,
+    aclose: Callable[[], Awaitable[None]] | None = None,
+) -> AsyncIterator[T]:
+    """
+    The async version of `cancellable`, to use on the event loop.
+
+    Parameters:
+    - aiterable (AsyncIterable[T]): Like the chunks of a streamed response of an async client.
+    - cancel_token (CancellationToken | None): The token. None to iterate everything.
+    - aclose (Callable[[], Awaitable[None]] | None): Aborts the read of the next item when the token is
+      cancelled, like the `close` of the async response. The token can be cancelled from any thread,
+      it is run on the loop. The error this makes the read raise is not propagated.
+    """
+    if cancel_token is None:
+        async for item in aiterable:
+            yield item
+        return
+    loop = asyncio.get_running_loop()
+
+    def _close() -> None:
+        try:
+            asyncio.run_coroutine_threadsafe(aclose(), loop)
+        except RuntimeError:
+            pass  # the loop is closed
+
+    unregister = cancel_token.on_cancel(_close) if aclose is not None else (lambda: None)
+    try:
+        async for item in aiterable:
+            if cancel_token.cancelled:
+                return
+            yield item
+    except Exception:
+        if cancel_token.cancelled:
+            return  # the read failed because `aclose` aborted it
+        raise
+    finally:
+        unregister()
@@ -0,0 +1,226 @@
+import functools
+import json
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+from loguru import logger
+
+# The methods of the ASR and TTS engines that do the work. The pool holds the lock of the engine
+# around them, unless the engine is `thread_safe`.
+SERIALIZED_METHODS = ("transcribe_np", "generate_audio", "synthesize", "stream")
+
+
+class _PoolEntry:
+    """
+    A single engine held by the EnginePool, together with its reference count.
+    """
+
+    def __init__(self, key: Tuple[str, str, str]):
+        self.key = key
+        self.engine: Any = None
+        self.ref_count: int = 0
+        self.pinned: bool = False
+        self.ready = threading.Event()
+        self.error: Exception | None = None
+        # reentrant: the default `synthesize` of a TTS engine calls its `generate_audio`
+        self.lock = threading.RLock()
+
+
+class EnginePool:
+    """
+    A process-wide, reference-counted registry of heavy engines (ASR, TTS, translator...).
+
+    Engines are keyed by (kind, provider, normalized config). The first `acquire` of a key
+    loads the engine with the given loader, later calls with an equal config get the same
+    instance. When the last holder calls `release`, the engine is dropped (and closed if it
+    has a `close` method) unless it was pinned with `preload`.
+
+    Engines handed out by the pool are shared between sessions, so they must not hold any
+    per-conversation state. The sessions (and their look-ahead TTS and streaming ASR threads) call
+    them at the same time: engines that are not marked `thread_safe` get one call at a time, the
+    pool holds a lock of the engine around their `SERIALIZED_METHODS`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str, str], _PoolEntry] = {}
+        self._keys_by_engine: Dict[int, Tuple[str, str, str]] = {}
+
+    @staticmethod
+    def make_key(kind: str, provider: str, config: dict | None) -> Tuple[str, str, str]:
+        """
+        Build the registry key of an engine. The config is normalized to a JSON string
+        with sorted keys, so that two configs with the same content map to the same engine.
+
+        Parameters:
+        - kind (str): The kind of engine, like "asr", "tts" or "translator".
+        - provider (str): The provider name, like "Faster-Whisper" or "edgeTTS".
+        - config (dict | None): The config used to build the engine.
+
+        Returns:
+        - tuple: The key of the engine in the registry.
+        """
+        normalized = json.dumps(config or {}, sort_keys=True, default=str)
+        return (kind, str(provider), normalized)
+
+    def acquire(
+        self,
+        kind: str,
+        provider: str,
+        config: dict | None,
+        loader: Callable[[], Any],
+    ) -> Any:
+        """
+        Get the engine for (kind, provider, config), loading it with `loader` if it is not in the pool yet.
+        Every successful call must be paired with a `release` of the returned engine.
+
+        If several threads ask for the same engine at the same time, only one of them runs the loader
+        and the others wait for it.
+
+        Parameters:
+        - kind (str): The kind of engine, like "asr", "tts" or "translator".
+        - provider (str): The provider name.
+        - config (dict | None): The config used to build the engine.
+        - loader (Callable[[], Any]): A function with no arguments that builds the engine.
+
+        Returns:
+        - Any: The (shared) engine instance.
+        """
+        key = self.make_key(kind, provider, config)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            is_loader = entry is None
+            if is_loader:
+                entry = _PoolEntry(key)
+                self._entries[key] = entry
+            entry.ref_count += 1
+
+        if not is_loader:
+            entry.ready.wait()
+            if entry.error is not None:
+                with self._lock:
+                    entry.ref_count -= 1
+                raise entry.error
+            logger.info(f"Reusing pooled {kind} engine: {provider}")
+            return entry.engine
+
+        logger.info(f"Loading {kind} engine: {provider}")
+        try:
+            engine = loader()
+        except Exception as e:
+            with self._lock:
+                entry.ref_count -= 1
+                entry.error = e
+                self._entries.pop(key, None)
+            entry.ready.set()
+            raise
+
+        if engine is not None and not getattr(engine, "thread_safe", False):
+            _serialize_calls(engine, entry.lock)
+
+        with self._lock:
+            entry.engine = engine
+            if engine is not None:
+                self._keys_by_engine[id(engine)] = key
+        entry.ready.set()
+        return engine
+
+    def preload(
+        self,
+        kind: str,
+        provider: str,
+        config: dict | None,
+        loader: Callable[[], Any],
+    ) -> Any:
+        """
+        Load an engine and pin it, so it stays in the pool even when no session is holding it.
+
+        Parameters are the same as `acquire`.
+
+        Returns:
+        - Any: The (shared) engine instance.
+        """
+        engine = self.acquire(kind, provider, config, loader)
+        with self._lock:
+            entry = self._entries.get(self.make_key(kind, provider, config))
+            if entry is not None:
+                if entry.pinned:
+                    entry.ref_count -= 1
+                entry.pinned = True
+        return engine
+
+    def release(self, engine: Any) -> None:
+        """
+        Give back an engine obtained with `acquire`. The engine is dropped from the pool
+        once nobody is holding it anymore (unless it is pinned).
+
+        Parameters:
+        - engine (Any): The engine to release. Engines that don't come from this pool are ignored.
+        """
+        if engine is None:
+            return
+
+        to_close = None
+        with self._lock:
+            key = self._keys_by_engine.get(id(engine))
+            if key is None:
+                return
+            entry = self._entries[key]
+            entry.ref_count -= 1
+            if entry.ref_count <= 0 and not entry.pinned:
+                del self._entries[key]
+                del self._keys_by_engine[id(engine)]
+                to_close = entry
+
+        if to_close is not None:
+            logger.info(f"Unloading {to_close.key[0]} engine: {to_close.key[1]}")
+            close = getattr(to_close.engine, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    logger.error(f"Error closing {to_close.key[0]} engine: {e}")
+
+    def stats(self) -> list[dict]:
+        """
+        Returns:
+        - list[dict]: The kind, provider and reference count of every engine in the pool.
+        """
+        with self._lock:
+            return [
+                {
+                    "kind": key[0],
+                    "provider": key[1],
+                    "ref_count": entry.ref_count,
+                    "pinned": entry.pinned,
+                }
+                for key, entry in self._entries.items()
+            ]
+
+
+def _serialize_calls(engine: Any, lock: threading.RLock) -> None:
+    """
+    Replace the `SERIALIZED_METHODS` of the engine with versions that hold the lock while they run.
+    The iterator of `stream` holds it until it is exhausted or closed.
+    """
+    for name in SERIALIZED_METHODS:
+        method = getattr(engine, name, None)
+        if not callable(method):
+            continue
+        if name == "stream":
+
+            @functools.wraps(method)
+            def locked_generator(*args, _method=method, **kwargs):
+                with lock:
+                    yield from _method(*args, **kwargs)
+
+            setattr(engine, name, locked_generator)
+        else:
+
+            @functools.wraps(method)
+            def locked(*args, _method=method, **kwargs):
+                with lock:
+                    return _method(*args, **kwargs)
+
+            setattr(engine, name, locked)
@@ -0,0 +1,323 @@
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from loguru import logger
+
+_APPEND = "append"
+_COMPACT = "compact"
+_FLUSH = "flush"
+_STOP = "stop"
+
+
+class JournalWriter:
+    """
+    Writes the conversation journals of all the sessions of a process, on one background thread.
+
+    Records are appended to their file as they come, and the files written to are fsynced together
+    once per batch: the writer waits `fsync_interval` after the first record of a batch for more to
+    come, so a response (or many sessions at once) costs one fsync instead of one per record.
+    The callers only put the records on a queue and never wait for the disk.
+
+    Files that were not written to for `idle_close` seconds are closed. The thread is started on
+    first use, in the process that uses it (the server workers are forked after the writer is made).
+    """
+
+    def __init__(self, fsync_interval: float = 0.2, idle_close: float = 60.0):
+        """
+        Parameters:
+        - fsync_interval (float): Most time, in seconds, a record can wait before it is fsynced.
+        - idle_close (float): Seconds without writes after which a file is closed.
+        """
+        self.fsync_interval = fsync_interval
+        self.idle_close = idle_close
+        self._queue: queue.Queue = queue.Queue()
+        self._files: Dict[str, object] = {}
+        self._last_write: Dict[str, float] = {}
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._start_lock = threading.Lock()
+
+    def _put(self, item: tuple) -> bool:
+        if self._closed:
+            return False
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._files = {}
+                self._last_write = {}
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+                self._thread.start()
+            self._queue.put(item)
+        return True
+
+    def append(self, path: str, record: dict) -> None:
+        """Append a record to the file at `path`, as one JSON line."""
+        self._put((_APPEND, path, record))
+
+    def compact(self, path: str, records: List[dict]) -> None:
+        """
+        Replace the file at `path` with `records`, after the records appended before. The new file is
+        written next to the old one and renamed over it, so a crash leaves one of the two, never half of one.
+        """
+        self._put((_COMPACT, path, records))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until everything handed to the writer so far is written and fsynced.
+
+        Returns:
+        - bool: False if it timed out.
+        """
+        done = threading.Event()
+        if not self._put((_FLUSH, None, done)):
+            return True
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Write what is left, close the files and stop the thread."""
+        if self._closed:
+            return
+        with self._start_lock:
+            self._closed = True
+            if self._thread is None or self._pid != os.getpid():
+                return
+            self._queue.put((_STOP, None, None))
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.idle_close)]
+            except queue.Empty:
+                self._close_idle()
+                continue
+            deadline = time.monotonic() + self.fsync_interval
+            while batch[-1][0] not in (_FLUSH, _STOP):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            dirty = set()
+            waiting: List[threading.Event] = []
+            stop = False
+            for kind, path, payload in batch:
+                if kind == _APPEND:
+                    if self._write(path, payload):
+                        dirty.add(path)
+                elif kind == _COMPACT:
+                    self._sync(dirty)
+                    dirty.clear()
+                    self._replace(path, payload)
+                elif kind == _FLUSH:
+                    waiting.append(payload)
+                elif kind == _STOP:
+                    stop = True
+            self._sync(dirty)
+            for done in waiting:
+                done.set()
+            if stop:
+                for path in list(self._files):
+                    self._close_file(path)
+                return
+            self._close_idle()
+
+    def _file(self, path: str):
+        file = self._files.get(path)
+        if file is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            file = self._files[path] = open(path, "a", encoding="utf-8")
+        self._last_write[path] = time.monotonic()
+        return file
+
+    def _write(self, path: str, record: dict) -> bool:
+        try:
+            self._file(path).write(json.dumps(record, ensure_ascii=False) + "\n")
+            return True
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Failed to write to the journal {path}: {e}")
+            return False
+
+    def _sync(self, paths) -> None:
+        for path in paths:
+            file = self._files.get(path)
+            if file is None:
+                continue
+            try:
+                file.flush()
+                os.fsync(file.fileno())
+            except OSError as e:
+                logger.error(f"Failed to fsync the journal {path}: {e}")
+
+    def _replace(self, path: str, records: List[dict]) -> None:
+        self._close_file(path)
+        temp_path = path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as file:
+                for record in records:
+                    file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, path)
+            _fsync_directory(os.path.dirname(path) or ".")
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Failed to compact the journal {path}: {e}")
+
+    def _close_file(self, path: str) -> None:
+        file = self._files.pop(path, None)
+        self._last_write.pop(path, None)
+        if file is None:
+            return
+        try:
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+        except OSError as e:
+            logger.error(f"Failed to close the journal {path}: {e}")
+
+    def _close_idle(self) -> None:
+        now = time.monotonic()
+        for path, last_write in list(self._last_write.items()):
+            if now - last_write > self.idle_close:
+                self._close_file(path)
+
+
+def _fsync_directory(directory: str) -> None:
+    # makes the rename durable. Not possible (nor needed) on Windows.
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ConversationJournal:
+    """
+    The append-only journal of the conversation memory of one session, a JSON lines file named after
+    the session id in `directory`: the id with the characters that don't belong in a file name replaced,
+    then a hash of the id, so two ids never share a file.
+
+    Every change of the memory is a record:
+
+    - {"op": "message", "role": ..., "content": ...}: a message was added
+    - {"op": "replace_last", "content": ...}: the text of the last message was replaced
+    - {"op": "fold", "count": ..., "summary": ...}: the first `count` messages were folded into the summary
+    - {"op": "reset", "summary": ..., "messages": [...]}: the whole memory (after a rollback, or a compaction)
+
+    After `compact_every` records, the journal is compacted to one "reset" record. `load` replays the
+    journal, so a client that reconnects with the same session id continues its conversation. A last
+    line cut short by a crash is ignored.
+    """
+
+    def __init__(
+        self,
+        writer: JournalWriter,
+        directory: str,
+        session_id: str,
+        compact_every: int = 500,
+    ):
+        """
+        Parameters:
+        - writer (JournalWriter): The writer of the process.
+        - directory (str): The directory of the journals.
+        - session_id (str): The session.
+        - compact_every (int): Records after which the journal is compacted.
+        """
+        self.writer = writer
+        readable = re.sub(r"[^A-Za-z0-9_-]", "_", session_id)[:64]
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(directory, f"{readable}-{digest}.jsonl")
+        self.compact_every = max(1, compact_every)
+        self._records = 0
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self._records >= self.compact_every
+
+    def load(self) -> Tuple[str | None, List[dict]] | None:
+        """
+        Replay the journal.
+
+        Returns:
+        - Tuple[str | None, List[dict]] | None: The summary and the messages, or None if there is no journal yet.
+        """
+        self.writer.flush()  # the records of a previous instance of this session may still be queued
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.error(f"Failed to read the journal {self.path}: {e}")
+            return None
+
+        summary: str | None = None
+        messages: List[dict] = []
+        repaired = False
+        for number, line in enumerate(lines, 1):
+            try:
+                record = json.loads(line)
+                op = record["op"]
+                if op == "message":
+                    messages.append({"role": record["role"], "content": record["content"]})
+                elif op == "replace_last":
+                    if messages:
+                        messages[-1]["content"] = record["content"]
+                elif op == "fold":
+                    messages = messages[record["count"]:]
+                    summary = record["summary"]
+                elif op == "reset":
+                    summary = record["summary"]
+                    messages = [dict(message) for message in record["messages"]]
+            except (ValueError, KeyError, TypeError) as e:
+                if number == len(lines) and not line.endswith("\n"):
+                    logger.warning(f"Ignoring the last record of {self.path}, it was not written completely.")
+                    self.writer.compact(self.path, [_reset_record(summary, messages)])
+                    repaired = True
+                    break
+                logger.error(f"Skipping the invalid record {number} of {self.path}: {e}")
+        self._records = 1 if repaired else len(lines)
+        logger.info(f"Replayed {len(messages)} messages from {self.path}")
+        return summary, messages
+
+    def message(self, role: str, content: str) -> None:
+        self._write({"op": "message", "role": role, "content": content})
+
+    def replace_last(self, content: str) -> None:
+        self._write({"op": "replace_last", "content": content})
+
+    def fold(self, count: int, summary: str | None) -> None:
+        self._write({"op": "fold", "count": count, "summary": summary})
+
+    def reset(self, summary: str | None, messages: List[dict]) -> None:
+        self._write(_reset_record(summary, messages))
+
+    def compact(self, summary: str | None, messages: List[dict]) -> None:
+        """Replace the journal with the current state of the memory."""
+        self.writer.compact(self.path, [_reset_record(summary, messages)])
+        self._records = 1
+
+    def _write(self, record: dict) -> None:
+        self.writer.append(self.path, record)
+        self._records += 1
+
+
+def _reset_record(summary: str | None, messages: List[dict]) -> dict:
+    return {"op": "reset", "summary": summary, "messages": [dict(message) for message in messages]}
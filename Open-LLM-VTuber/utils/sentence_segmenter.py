@@ -0,0 +1,182 @@
+import re
+from typing import Iterable, List
+
+# Words ending with a period that don't end a sentence
+ABBREVIATIONS = (
+    "Dr.",
+    "Mr.",
+    "Ms.",
+    "Mrs.",
+    "Jr.",
+    "Sr.",
+    "St.",
+    "Ave.",
+    "Rd.",
+    "Blvd.",
+    "Dept.",
+    "Univ.",
+    "Prof.",
+    "Ph.D.",
+    "M.D.",
+    "U.S.",
+    "U.K.",
+    "U.N.",
+    "E.U.",
+    "U.S.A.",
+    "U.S.S.R.",
+    "U.A.E.",
+)
+
+# Characters that end a sentence, Latin and CJK
+TERMINALS = frozenset(".?!。；？！…〰〜～")
+
+# Characters that belong to the sentence when they follow its terminal punctuation, like closing quotes
+CLOSERS = frozenset("\"')]}”’」』）】》")
+
+# Characters that end a clause, used for the first chunk of a response with `first_clause` on
+CLAUSE_BREAKS = frozenset(",;:，、；：—–")
+
+ELLIPSIS = "..."
+
+
+def _abbreviation_pattern(abbreviations: Iterable[str]) -> re.Pattern:
+    alternatives = "|".join(
+        re.escape(abbreviation) for abbreviation in sorted(abbreviations, key=len, reverse=True)
+    )
+    return re.compile(rf"(?:^|[^\w.])(?:{alternatives})$")
+
+
+_DEFAULT_ABBREVIATION_RE = _abbreviation_pattern(ABBREVIATIONS)
+
+
+class SentenceSegmenter:
+    """
+    Splits a stream of LLM tokens into sentences for TTS.
+
+    `feed` takes the next chunk of text and returns the sentences it completed, `flush` returns
+    what is left at the end of the response. Only the new characters are looked at, so the work
+    per token doesn't grow with the length of the sentence.
+
+    A sentence ends after a run of terminal punctuation (and closing quotes or brackets). After
+    Latin punctuation the next character has to be a space, so "3.14" and "Ph.D." are not split,
+    which means the sentence is returned when the character after it arrives, or by `flush`.
+    Known abbreviations like "Dr." and the ellipsis "..." don't end a sentence.
+
+    With `first_clause` on, the first chunk of the response already ends at a clause break
+    (comma, dash...) or after `first_clause_max_words` words, so the TTS can start on it before
+    the LLM has finished a long first sentence. The rest is split into sentences as usual.
+    """
+
+    def __init__(
+        self,
+        min_length: int = 0,
+        abbreviations: Iterable[str] = ABBREVIATIONS,
+        first_clause: bool = False,
+        first_clause_max_words: int = 8,
+    ):
+        """
+        Parameters:
+        - min_length (int): Sentences shorter than this (in characters, without surrounding spaces)
+          are merged into the next sentence, so the TTS doesn't get tiny fragments like "Oh!". Defaults to 0.
+        - abbreviations (Iterable[str]): Words ending with a period that don't end a sentence.
+        - first_clause (bool): End the first chunk at the first clause break. Defaults to False.
+        - first_clause_max_words (int): With `first_clause` on, end the first chunk after this many words
+          if there is no clause break before. Defaults to 8.
+        """
+        abbreviations = tuple(abbreviations)
+        self.min_length = min_length
+        self.first_clause = first_clause
+        self.first_clause_max_words = first_clause_max_words
+        self._abbreviation_re = _abbreviation_pattern(abbreviations)
+        # the abbreviation check only needs this many characters before the period
+        self._tail_length = max((len(a) for a in abbreviations), default=0) + 1
+        self._parts: List[str] = []
+        self._tail = ""
+        self._candidate = False  # the text so far ends with terminal punctuation
+        self._candidate_needs_space = False
+        self._in_first_clause = first_clause  # nothing was returned yet
+        self._words = 0
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Parameters:
+        - chunk (str): The next piece of the streamed text.
+
+        Returns:
+        - List[str]: The sentences completed by this chunk, in order. Usually empty or one sentence.
+        """
+        sentences = []
+        if not self._candidate and not self._in_first_clause and TERMINALS.isdisjoint(chunk):
+            self._append(chunk)  # most tokens: nothing to look at
+            return sentences
+        for char in chunk:
+            if self._candidate:
+                if char in TERMINALS or char in CLOSERS:
+                    self._append(char)
+                    if char in TERMINALS:
+                        self._candidate_needs_space = char.isascii()
+                        if self._tail.endswith(ELLIPSIS):
+                            self._candidate = False
+                    continue
+                if char.isspace() or not self._candidate_needs_space:
+                    self._end_sentence(sentences)
+                else:
+                    self._candidate = False
+            if self._in_first_clause and char.isspace() and self._parts and not self._tail[-1:].isspace():
+                self._words += 1
+                if self._words >= self.first_clause_max_words:
+                    self._end_sentence(sentences)
+            self._append(char)
+            if char in TERMINALS and not self._is_abbreviation():
+                self._candidate = True
+                self._candidate_needs_space = char.isascii()
+            elif self._in_first_clause and char in CLAUSE_BREAKS:
+                self._candidate = True
+                self._candidate_needs_space = char.isascii()
+        return sentences
+
+    def flush(self) -> str:
+        """
+        Returns:
+        - str: The rest of the text that hasn't been returned as a sentence yet (may be empty). The segmenter is reset.
+        """
+        rest = "".join(self._parts)
+        self.reset()
+        return rest
+
+    def reset(self) -> None:
+        """Drop the pending text, like when the response was interrupted."""
+        self._parts = []
+        self._tail = ""
+        self._candidate = False
+        self._in_first_clause = self.first_clause
+        self._words = 0
+
+    def _append(self, text: str) -> None:
+        self._parts.append(text)
+        self._tail = (self._tail + text)[-self._tail_length :]
+
+    def _is_abbreviation(self) -> bool:
+        return self._tail.endswith(ELLIPSIS) or bool(self._abbreviation_re.search(self._tail))
+
+    def _end_sentence(self, sentences: List[str]) -> None:
+        self._candidate = False
+        sentence = "".join(self._parts)
+        if len(sentence.strip()) < max(self.min_length, 1):
+            return  # too short, keep it for the next sentence
+        self._parts = []
+        self._in_first_clause = False
+        sentences.append(sentence)
+
+
+def is_complete_sentence(text: str) -> bool:
+    """
+    Check if the text ends like a complete sentence: with terminal punctuation that is not part of
+    a known abbreviation or an ellipsis. For streamed text, use `SentenceSegmenter` instead.
+    """
+    text = text.strip()
+    if not text or text[-1] not in TERMINALS:
+        return False
+    if text.endswith(ELLIPSIS):
+        return False
+    return not _DEFAULT_ABBREVIATION_RE.search(text)
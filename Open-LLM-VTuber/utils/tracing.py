@@ -0,0 +1,239 @@
+import bisect
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from loguru import logger
+
+# Upper bounds of the histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class Tracer:
+    """
+    Records the time spent in the stages of conversation turns (ASR, LLM, TTS, sending...).
+
+    Each span has a name, a duration, the session id and the turn id. Spans are aggregated into
+    one histogram per name, exported in the Prometheus text format by `prometheus_text`, and
+    written as JSON lines to `jsonl_path` if it is set. The durations of a turn are recorded through
+    the TurnTrace returned by `start_turn`. Totals (like the LLM tokens) are kept with `count`.
+
+    One tracer is shared by all the sessions of a process.
+    """
+
+    def __init__(
+        self,
+        jsonl_path: str | None = None,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        namespace: str = "vtuber",
+    ):
+        """
+        Parameters:
+        - jsonl_path (str | None): File the spans are appended to, one JSON object per line. None to only keep histograms.
+        - buckets (Tuple[float, ...]): Upper bounds of the histogram buckets, in seconds.
+        - namespace (str): Prefix of the Prometheus metric names.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.namespace = namespace
+        self._histograms: Dict[str, _Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._lock = threading.Lock()
+        self._jsonl = None
+        if jsonl_path:
+            try:
+                self._jsonl = open(jsonl_path, "a", encoding="utf-8", buffering=1)
+            except OSError as e:
+                logger.error(f"Cannot write traces to {jsonl_path}: {e}")
+
+    def start_turn(self, session_id: str | None = None) -> "TurnTrace":
+        """
+        Parameters:
+        - session_id (str | None): The session the turn belongs to.
+
+        Returns:
+        - TurnTrace: The trace of a new turn, starting now.
+        """
+        return TurnTrace(self, session_id, uuid.uuid4().hex[:12])
+
+    def record(
+        self,
+        name: str,
+        duration: float,
+        session_id: str | None = None,
+        turn_id: str | None = None,
+        **attributes,
+    ) -> None:
+        """
+        Record one span.
+
+        Parameters:
+        - name (str): The name of the span, like "tts_synthesis".
+        - duration (float): Its duration, in seconds.
+        - session_id (str | None): The session.
+        - turn_id (str | None): The turn.
+        - attributes: More fields for the JSON line, like the sentence length.
+        """
+        index = bisect.bisect_left(self.buckets, duration)
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram(self.buckets)
+            histogram.counts[index] += 1
+            histogram.sum += duration
+            histogram.count += 1
+            if self._jsonl is not None:
+                span = {
+                    "ts": time.time(),
+                    "span": name,
+                    "duration_ms": round(duration * 1000, 3),
+                    "session_id": session_id,
+                    "turn_id": turn_id,
+                    **attributes,
+                }
+                try:
+                    self._jsonl.write(json.dumps(span, default=str) + "\n")
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Failed to write trace: {e}")
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Add to a counter.
+
+        Parameters:
+        - name (str): The name of the counter, like "llm_prompt_tokens". Exported as `<namespace>_<name>_total`.
+        - value (float): What to add.
+        - labels: The Prometheus labels of the counter, like cache="read".
+        """
+        key = (name, tuple(sorted((label, str(label_value)) for label, label_value in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+        - dict: The histograms and counters, JSON serializable, to merge into the `prometheus_text` of
+          another worker process.
+        """
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "histograms": {
+                    name: [list(histogram.counts), histogram.sum, histogram.count]
+                    for name, histogram in self._histograms.items()
+                },
+                "counters": [
+                    [name, [list(label) for label in labels], value]
+                    for (name, labels), value in self._counters.items()
+                ],
+            }
+
+    def prometheus_text(self, others: Iterable[dict] = ()) -> str:
+        """
+        Parameters:
+        - others (Iterable[dict]): Snapshots of the tracers of the other worker processes (see `snapshot`),
+          added to the histograms and counters of this one.
+
+        Returns:
+        - str: The histograms in the Prometheus text exposition format, one `<namespace>_span_seconds`
+          histogram with a `span` label, then the counters.
+        """
+        histograms: Dict[str, Tuple[List[int], float, int]] = {}
+        counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        for snapshot in [self.snapshot(), *others]:
+            if tuple(snapshot["buckets"]) != self.buckets:
+                logger.warning("Skipping the spans of a worker with other histogram buckets.")
+                continue
+            for name, (counts, total, count) in snapshot["histograms"].items():
+                merged = histograms.setdefault(name, ([0] * len(counts), 0.0, 0))
+                histograms[name] = (
+                    [a + b for a, b in zip(merged[0], counts)],
+                    merged[1] + total,
+                    merged[2] + count,
+                )
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(tuple(label) for label in labels))
+                counters[key] = counters.get(key, 0) + value
+
+        metric = f"{self.namespace}_span_seconds"
+        lines: List[str] = [
+            f"# HELP {metric} Duration of the stages of conversation turns.",
+            f"# TYPE {metric} histogram",
+        ]
+        for name, (counts, total, count) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{span="{name}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{span="{name}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'{metric}_count{{span="{name}"}} {count}')
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            counter = f"{self.namespace}_{name}_total"
+            if counter not in typed:
+                lines.append(f"# TYPE {counter} counter")
+                typed.add(counter)
+            label_text = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+            lines.append(f"{counter}{{{label_text}}} {value:g}" if label_text else f"{counter} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def close(self) -> None:
+        """Close the JSON lines file."""
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+
+
+class TurnTrace:
+    """
+    The spans of one conversation turn. Can be used from several threads (the TTS workers, the sender...).
+    """
+
+    def __init__(self, tracer: Tracer, session_id: str | None, turn_id: str):
+        self.tracer = tracer
+        self.session_id = session_id
+        self.turn_id = turn_id
+        self.start = time.perf_counter()
+        self._marked: set = set()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, duration: float, **attributes) -> None:
+        """Record a span of this turn, see `Tracer.record`."""
+        self.tracer.record(name, duration, self.session_id, self.turn_id, **attributes)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[None]:
+        """Record the time spent in the `with` block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, **attributes)
+
+    def mark(self, name: str, since: float | None = None, at: float | None = None, **attributes) -> bool:
+        """
+        Record the time from `since` to `at` (`time.perf_counter()` values, from the start of the turn
+        to now by default), the first time `name` is marked in this turn. Later marks of the same name
+        are ignored, so this is for milestones like the first token or the first audio.
+
+        Returns:
+        - bool: True if the mark was recorded.
+        """
+        now = time.perf_counter() if at is None else at
+        with self._lock:
+            if name in self._marked:
+                return False
+            self._marked.add(name)
+        self.record(name, now - (self.start if since is None else since), **attributes)
+        return True
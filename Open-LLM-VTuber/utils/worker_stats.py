@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+import shutil
+from typing import Callable, Dict
+
+from loguru import logger
+
+
+class WorkerStats:
+    """
+    Stats shared by the server worker processes, through files in a directory.
+
+    With several workers, a request to /metrics or /scheduler-stats reaches one of them, so every
+    worker writes snapshots of its stats (the tracer, the scheduler) to `<directory>/<name>-<pid>.json`
+    every `interval` seconds, and the worker that answers merges its own stats with the snapshots of
+    the others. The others' stats are at most `interval` seconds old.
+
+    The snapshots of the workers that exited are kept (their spans still happened), the caller can
+    skip them with `alive_only`.
+    """
+
+    def __init__(self, directory: str, interval: float = 1.0):
+        """
+        Parameters:
+        - directory (str): The directory shared by the workers. Made if it doesn't exist.
+        - interval (float): Seconds between two snapshots of a worker.
+        """
+        self.directory = directory
+        self.interval = interval
+        os.makedirs(directory, exist_ok=True)
+
+    async def publish(self, sources: Dict[str, Callable[[], dict]]) -> None:
+        """
+        Write the snapshots of this worker every `interval` seconds, until cancelled (then once more).
+        The snapshots are taken on the event loop, so the sources don't need to be thread safe.
+
+        Parameters:
+        - sources (Dict[str, Callable[[], dict]]): Snapshot functions by name, like {"tracer": tracer.snapshot}.
+        """
+        try:
+            while True:
+                await self._write_all(sources)
+                await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            await self._write_all(sources)
+            raise
+
+    async def _write_all(self, sources: Dict[str, Callable[[], dict]]) -> None:
+        snapshots = {name: source() for name, source in sources.items()}
+        await asyncio.to_thread(self._write_files, snapshots)
+
+    def _write_files(self, snapshots: Dict[str, dict]) -> None:
+        pid = os.getpid()
+        for name, snapshot in snapshots.items():
+            path = os.path.join(self.directory, f"{name}-{pid}.json")
+            try:
+                with open(path + ".tmp", "w", encoding="utf-8") as file:
+                    json.dump(snapshot, file)
+                os.replace(path + ".tmp", path)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Failed to write the {name} stats of worker {pid}: {e}")
+
+    def read(self, name: str, alive_only: bool = False) -> Dict[int, dict]:
+        """
+        Parameters:
+        - name (str): The name of the snapshots.
+        - alive_only (bool): Skip the snapshots of the workers that exited.
+
+        Returns:
+        - Dict[int, dict]: The last snapshot of every other worker, by pid.
+        """
+        prefix = f"{name}-"
+        snapshots: Dict[int, dict] = {}
+        try:
+            file_names = os.listdir(self.directory)
+        except OSError as e:
+            logger.warning(f"Failed to read the worker stats in {self.directory}: {e}")
+            return snapshots
+        for file_name in file_names:
+            pid_text = file_name[len(prefix):-len(".json")]
+            if not (file_name.startswith(prefix) and file_name.endswith(".json") and pid_text.isdigit()):
+                continue
+            pid = int(pid_text)
+            if pid == os.getpid() or (alive_only and not _alive(pid)):
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name), "r", encoding="utf-8") as file:
+                    snapshots[pid] = json.load(file)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to read the {name} stats of worker {pid}: {e}")
+        return snapshots
+
+    def remove(self) -> None:
+        """Remove the directory and the snapshots in it."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
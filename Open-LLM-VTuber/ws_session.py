@@ -0,0 +1,258 @@
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterable, List
+
+from fastapi import WebSocket
+from loguru import logger
+
+
+class FrameStream:
+    """
+    The rest of the frames of an OutboundMessage, produced while the message is being sent,
+    like audio that is streamed while the TTS synthesizes it.
+
+    A worker thread adds frames with `put_threadsafe` and must call `end_threadsafe` when it is done
+    (`put` and `end` from the event loop), the sender task forwards every frame as soon as it is there.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.duration = 0.0  # playback duration of the audio in the frames, known at the end
+        self._loop = loop
+        self._queue: asyncio.Queue[str | bytes | None] = asyncio.Queue()
+
+    def put(self, frame: str | bytes) -> None:
+        """Add a frame from the event loop."""
+        self._queue.put_nowait(frame)
+
+    def end(self, duration: float, last_frames: Iterable[str | bytes] = ()) -> None:
+        """End the stream from the event loop, see `end_threadsafe`."""
+        self._end(duration, list(last_frames))
+
+    def put_threadsafe(self, frame: str | bytes) -> None:
+        """Add a frame from a worker thread."""
+        self._call_threadsafe(self._queue.put_nowait, frame)
+
+    def end_threadsafe(self, duration: float, last_frames: Iterable[str | bytes] = ()) -> None:
+        """
+        End the stream from a worker thread.
+
+        Parameters:
+            duration (float): Playback duration of the audio in all the frames, in seconds.
+            last_frames (Iterable[str | bytes]): Frames to send after the others, like a closing message.
+        """
+        self._call_threadsafe(self._end, duration, list(last_frames))
+
+    async def frames(self) -> AsyncIterator[str | bytes]:
+        while True:
+            frame = await self._queue.get()
+            if frame is None:
+                return
+            yield frame
+
+    def _end(self, duration: float, last_frames: List[str | bytes]) -> None:
+        self.duration = duration
+        for frame in last_frames:
+            self._queue.put_nowait(frame)
+        self._queue.put_nowait(None)
+
+    def _call_threadsafe(self, callback, *args) -> None:
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # the loop is closed, nobody is sending anymore
+
+
+@dataclass
+class OutboundMessage:
+    """
+    One item of the outbound queue of a WebSocketSession.
+
+    Attributes:
+        frames (List[str | bytes]): The frames to send, in order, with nothing in between.
+            str frames are sent as text, bytes frames as binary.
+        duration (float): Playback duration of the audio in the frames, in seconds. 0 for non-audio messages.
+        after_playback (bool): If True, the message is held until the audio sent before it has finished playing.
+        stream (FrameStream | None): More frames that are sent after `frames` as they are produced.
+            A message with a stream is audio, its duration is the one of the stream.
+        on_sent (Callable[[float, float], None] | None): Called on the event loop once the frames were sent,
+            with the `time.perf_counter()` at which sending started and ended, like for tracing.
+    """
+
+    frames: List[str | bytes]
+    duration: float = 0.0
+    after_playback: bool = False
+    stream: FrameStream | None = None
+    on_sent: Callable[[float, float], None] | None = None
+    is_audio: bool = field(init=False)
+
+    def __post_init__(self):
+        self.is_audio = self.duration > 0 or self.stream is not None
+
+
+class WebSocketSession:
+    """
+    Owns the sending side of one WebSocket connection.
+
+    Everything sent to the client goes through one bounded asyncio queue that is drained by a
+    sender task on the server event loop, so the socket is only ever written from the loop that owns it.
+    Worker threads (like the conversation chain) enqueue with `send_threadsafe`, which blocks them
+    when the queue is full (backpressure) instead of sleeping for the audio duration themselves.
+
+    Audio is paced by the sender task: an audio message is sent at most `audio_lead` seconds before
+    the previous one has finished playing on the client.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session_id: str | None = None,
+        max_queue_size: int = 32,
+        audio_lead: float = 0.5,
+    ):
+        """
+        Must be called from the event loop that serves the websocket.
+
+        Parameters:
+            websocket (WebSocket): The connection to send to.
+            session_id (str | None): The id of the session, chosen by the client. A random one is generated if None.
+            max_queue_size (int): Capacity of the outbound queue.
+            audio_lead (float): How long (in seconds) before the end of the current audio the next one may be sent.
+        """
+        self.websocket = websocket
+        self.session_id = session_id or uuid.uuid4().hex
+        self.resumable = session_id is not None  # the client can reconnect to this session
+        self.audio_lead = audio_lead
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[OutboundMessage | None] = asyncio.Queue(maxsize=max_queue_size)
+        self._playback_end: float = 0.0  # loop time at which the audio sent so far ends playing
+        self._closed = False
+        self._sender_task = asyncio.create_task(self._sender())
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def send(self, message: OutboundMessage) -> None:
+        """Enqueue a message from the event loop. Waits if the queue is full."""
+        if self._closed:
+            return
+        await self._queue.put(message)
+
+    async def send_json(self, data: dict, after_playback: bool = False) -> None:
+        """Enqueue a JSON text message from the event loop."""
+        await self.send(OutboundMessage([json.dumps(data)], after_playback=after_playback))
+
+    def send_threadsafe(self, message: OutboundMessage, timeout: float | None = None) -> None:
+        """
+        Enqueue a message from a thread that is not the event loop (like the conversation worker).
+        Blocks the calling thread while the queue is full.
+
+        Parameters:
+            message (OutboundMessage): The message to send.
+            timeout (float | None): How long to wait for room in the queue. None waits forever.
+
+        Raises:
+            TimeoutError if the queue stayed full for `timeout` seconds.
+        """
+        if self._closed:
+            return
+        future = asyncio.run_coroutine_threadsafe(self.send(message), self._loop)
+        try:
+            future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def send_json_threadsafe(self, data: dict, after_playback: bool = False) -> None:
+        """Enqueue a JSON text message from a worker thread."""
+        self.send_threadsafe(OutboundMessage([json.dumps(data)], after_playback=after_playback))
+
+    def open_stream(self) -> FrameStream:
+        """A FrameStream for an OutboundMessage of this session, to fill from a worker thread."""
+        return FrameStream(self._loop)
+
+    def clear_pending_audio(self) -> int:
+        """
+        Drop the audio messages that are still in the queue (like after the user interrupted).
+        Must be called from the event loop.
+
+        Returns:
+            int: The number of audio messages dropped.
+        """
+        kept = []
+        dropped = 0
+        while not self._queue.empty():
+            message = self._queue.get_nowait()
+            if message is not None and message.is_audio:
+                dropped += 1
+            else:
+                kept.append(message)
+        for message in kept:
+            self._queue.put_nowait(message)
+        self._playback_end = self._loop.time()
+        return dropped
+
+    async def close(self) -> None:
+        """Stop the sender task. Messages still in the queue are dropped."""
+        if self._closed:
+            return
+        self._closed = True
+        self._sender_task.cancel()
+        try:
+            await self._sender_task
+        except asyncio.CancelledError:
+            pass
+        self._drop_queued()
+
+    def _drop_queued(self) -> None:
+        # frees the room producers blocked in `send` are waiting for
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    async def _send_frame(self, frame: str | bytes) -> None:
+        if isinstance(frame, bytes):
+            await self.websocket.send_bytes(frame)
+        else:
+            await self.websocket.send_text(frame)
+
+    async def _sender(self) -> None:
+        try:
+            while True:
+                message = await self._queue.get()
+                if message is None:
+                    return
+                now = self._loop.time()
+                if message.after_playback:
+                    wait = self._playback_end - now
+                elif message.is_audio:
+                    wait = self._playback_end - self.audio_lead - now
+                else:
+                    wait = 0
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                send_start = time.perf_counter()
+                for frame in message.frames:
+                    await self._send_frame(frame)
+                if message.stream is not None:
+                    async for frame in message.stream.frames():
+                        await self._send_frame(frame)
+                    message.duration = message.stream.duration
+                if message.on_sent is not None:
+                    try:
+                        message.on_sent(send_start, time.perf_counter())
+                    except Exception as e:
+                        logger.warning(f"on_sent callback failed: {e}")
+
+                if message.is_audio:
+                    self._playback_end = max(self._playback_end, self._loop.time()) + message.duration
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # the client is gone, nothing else can be sent
+            logger.error(f"WebSocket sender stopped: {e}")
+            self._closed = True
+            self._drop_queued()